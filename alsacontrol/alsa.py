@@ -22,11 +22,13 @@
 """Helperfunctions to talk to alsa and further simplify pyalsaaudio."""
 
 
-import numpy as np
+from contextlib import contextmanager
 
 import alsaaudio
 
+from alsacontrol.config import get_config
 from alsacontrol.logger import logger
+from alsacontrol.resources import get_resource_tracker
 
 
 INPUT_VOLUME = 'alsacontrol-input-volume'
@@ -34,6 +36,24 @@ INPUT_MUTE = 'alsacontrol-input-mute'
 OUTPUT_VOLUME = 'alsacontrol-output-volume'
 OUTPUT_MUTE = 'alsacontrol-output-mute'
 
+# the direction of each softvol control of alsacontrol
+SOFTVOL_CONTROLS = {
+    OUTPUT_VOLUME: alsaaudio.PCM_PLAYBACK,
+    OUTPUT_MUTE: alsaaudio.PCM_PLAYBACK,
+    INPUT_VOLUME: alsaaudio.PCM_CAPTURE,
+    INPUT_MUTE: alsaaudio.PCM_CAPTURE
+}
+
+# elements of the card itself that are used instead of softvol if it is
+# disabled, in the order in which they are tried
+HARDWARE_MIXERS = {
+    alsaaudio.PCM_PLAYBACK: ['Master', 'PCM', 'Speaker', 'Headphone'],
+    alsaaudio.PCM_CAPTURE: ['Capture', 'Mic']
+}
+
+# maps (card, card index, pcm type) to the found element or None
+_hardware_mixers = {}
+
 
 def to_perceived_volume(volume):
     """For a mixer volume of 0.5, figure out the perceived volume."""
@@ -47,6 +67,10 @@ def to_mixer_volume(volume):
 
 def get_level(pcm):
     """Get the current level of recording."""
+    # numpy is not needed for anything else in here, so the daemon
+    # doesn't have to load it
+    import numpy as np
+
     length, data = pcm.read()
     if length > 0:
         samples = np.frombuffer(data, dtype=np.int16)
@@ -56,22 +80,142 @@ def get_level(pcm):
     return None
 
 
-def play_silence():
+@contextmanager
+def open_pcm(**kwargs):
+    """Open a pcm for a with statement, which closes it afterwards.
+
+    Pcms that are not closed keep the device busy until the garbage
+    collector gets to them. Takes the keyword arguments of alsaaudio.PCM.
+    """
+    device = kwargs.get('device', 'default')
+    pcm = alsaaudio.PCM(**kwargs)
+    tracker = get_resource_tracker()
+    tracker.opened('pcm', device)
+    try:
+        yield pcm
+    finally:
+        pcm.close()
+        tracker.closed('pcm', device)
+
+
+def get_mixers(cardindex=None):
+    """List the mixer controls of a card or of the default device."""
+    if cardindex is None:
+        return alsaaudio.mixers()
+    try:
+        return alsaaudio.mixers(cardindex=cardindex)
+    except alsaaudio.ALSAAudioError as error:
+        logger.error(
+            'Could not list the mixers of card %s: %s', cardindex, error
+        )
+        return []
+
+
+def find_hardware_mixer(card, pcm_type):
+    """Find the volume element of a card.
+
+    Returns a tuple of (mixer name, card index), or (None, None) if the
+    card doesn't exist or has none of the HARDWARE_MIXERS.
+
+    Parameters
+    ----------
+    card : string
+        "Generic", ...
+    pcm_type : int
+        0 for output (PCM_PLAYBACK), 1 for input (PCM_CAPTURE)
+    """
+    cards = alsaaudio.cards()
+    if card not in cards:
+        return None, None
+
+    cardindex = cards.index(card)
+    key = (card, cardindex, pcm_type)
+    if key not in _hardware_mixers:
+        mixers = get_mixers(cardindex)
+        _hardware_mixers[key] = next(
+            (name for name in HARDWARE_MIXERS[pcm_type] if name in mixers),
+            None
+        )
+        logger.debug(
+            'Using the hardware mixer %s of "%s"',
+            _hardware_mixers[key],
+            card
+        )
+
+    if _hardware_mixers[key] is None:
+        return None, None
+    return _hardware_mixers[key], cardindex
+
+
+def resolve_mixer(mixer_name):
+    """Get the (mixer name, card index) of the control to use.
+
+    If softvol is disabled, the softvol controls of alsacontrol don't
+    exist and the hardware mixer of the selected card is used instead,
+    without any plugin in the audio path. The card index is None for
+    controls of the default device.
+    """
+    pcm_type = SOFTVOL_CONTROLS.get(mixer_name)
+    if pcm_type is None:
+        return mixer_name, None
+
+    direction = 'output' if pcm_type == alsaaudio.PCM_PLAYBACK else 'input'
+    if get_config().get(f'{direction}_use_softvol'):
+        return mixer_name, None
+
+    # cards imports this module
+    from alsacontrol.cards import get_card
+    card = get_card(get_config().get(f'pcm_{direction}'))
+    hardware_mixer, cardindex = find_hardware_mixer(card, pcm_type)
+    if hardware_mixer is None:
+        return mixer_name, None
+    return hardware_mixer, cardindex
+
+
+@contextmanager
+def open_mixer(mixer_name, cardindex=None):
+    """Open a mixer for a with statement, which closes it afterwards.
+
+    Parameters
+    ----------
+    mixer_name : string
+    cardindex : int or None
+        None for the default device
+    """
+    if cardindex is None:
+        mixer = alsaaudio.Mixer(mixer_name)
+    else:
+        mixer = alsaaudio.Mixer(mixer_name, cardindex=cardindex)
+    tracker = get_resource_tracker()
+    tracker.opened('mixer', mixer_name)
+    try:
+        yield mixer
+    finally:
+        mixer.close()
+        tracker.closed('mixer', mixer_name)
+
+
+def play_silence(device='default'):
     """In order to make alsa see the mixers, play some silent audio.
 
     Otherwise 'Unable to find mixer control alsacontrol-output-mute'
     will be thrown at the start.
+
+    Parameters
+    ----------
+    device : string
+        The pcm that contains the softvol controls
     """
     logger.debug('Trying to play sound to make the output mixers visible')
     try:
-        pcm = alsaaudio.PCM(
-            type=alsaaudio.PCM_PLAYBACK,
-            channels=1,
-            periodsize=32,
-            device='default'
-        )
-        data = b'\x00' * 32
-        pcm.write(data)
+        with open_pcm(
+                type=alsaaudio.PCM_PLAYBACK,
+                channels=1,
+                periodsize=32,
+                device=device
+        ) as pcm:
+            data = b'\x00' * 32
+            pcm.write(data)
     except alsaaudio.ALSAAudioError as error:
         error = str(error)
         logger.error(error)
@@ -93,11 +237,8 @@ def record_to_nowhere():
     """
     logger.debug('Trying to capture sound to make the input mixers visible')
     try:
-        pcm = alsaaudio.PCM(
-            type=alsaaudio.PCM_CAPTURE,
-            device='default'
-        )
-        pcm.read()
+        with open_pcm(type=alsaaudio.PCM_CAPTURE, device='default') as pcm:
+            pcm.read()
     except alsaaudio.ALSAAudioError as error:
         error = str(error)
         logger.error(error)
@@ -131,7 +272,25 @@ def set_volume(volume, pcm_type, nonlinear=False):
     else:
         raise ValueError(f'Unsupported PCM {pcm_type}')
 
-    if mixer_name not in alsaaudio.mixers():
+    set_mixer_volume(mixer_name, volume, pcm_type, nonlinear)
+
+
+def set_mixer_volume(mixer_name, volume, pcm_type, nonlinear=False):
+    """Change the volume of a specific mixer.
+
+    Parameters
+    ----------
+    mixer_name : string
+        For example 'alsacontrol-app-mpv-volume'
+    volume : float
+        New value between 0 and 1
+    pcm_type : int
+        0 for output (PCM_PLAYBACK), 1 for input (PCM_CAPTURE)
+    nonlinear : bool
+        if True, will apply to_mixer_volume
+    """
+    mixer_name, cardindex = resolve_mixer(mixer_name)
+    if mixer_name not in get_mixers(cardindex):
         logger.error('Could not find mixer %s', mixer_name)
         return
 
@@ -140,13 +299,12 @@ def set_volume(volume, pcm_type, nonlinear=False):
 
     mixer_volume = min(100, max(0, round(volume * 100)))
 
-    mixer = alsaaudio.Mixer(mixer_name)
-
-    current_mixer_volume = mixer.getvolume(pcm_type)[0]
-    if mixer_volume == current_mixer_volume:
-        return
+    with open_mixer(mixer_name, cardindex) as mixer:
+        current_mixer_volume = mixer.getvolume(pcm_type)[0]
+        if mixer_volume == current_mixer_volume:
+            return
 
-    mixer.setvolume(mixer_volume)
+        mixer.setvolume(mixer_volume)
 
 
 def get_volume(pcm, nonlinear=False):
@@ -166,13 +324,29 @@ def get_volume(pcm, nonlinear=False):
     else:
         raise ValueError(f'Unsupported PCM {pcm}')
 
-    if mixer_name not in alsaaudio.mixers():
+    return get_mixer_volume(mixer_name, pcm, nonlinear)
+
+
+def get_mixer_volume(mixer_name, pcm, nonlinear=False):
+    """Get the volume of a specific mixer between 0 and 1.
+
+    Parameters
+    ----------
+    mixer_name : string
+        For example 'alsacontrol-app-mpv-volume'
+    pcm : int
+        0 for output (PCM_PLAYBACK), 1 for input (PCM_CAPTURE)
+    nonlinear : bool
+        if True, will apply to_perceived_volume
+    """
+    mixer_name, cardindex = resolve_mixer(mixer_name)
+    if mixer_name not in get_mixers(cardindex):
         logger.error('Could not find mixer %s', mixer_name)
         # might be due to configuration
-        return 100
+        return 1
 
-    mixer = alsaaudio.Mixer(mixer_name)
-    mixer_volume = mixer.getvolume(pcm)[0] / 100
+    with open_mixer(mixer_name, cardindex) as mixer:
+        mixer_volume = mixer.getvolume(pcm)[0] / 100
 
     if nonlinear:
         return to_perceived_volume(mixer_volume)
@@ -180,37 +354,78 @@ def get_volume(pcm, nonlinear=False):
     return mixer_volume
 
 
+def _resolve_switch(mixer_name):
+    """Like resolve_mixer, and if the capture switch has to be used.
+
+    Hardware capture elements usually don't have a playback switch, so
+    getmute and setmute of pyalsaaudio don't work for them.
+    """
+    pcm_type = SOFTVOL_CONTROLS.get(mixer_name)
+    mixer_name, cardindex = resolve_mixer(mixer_name)
+    capture = cardindex is not None and pcm_type == alsaaudio.PCM_CAPTURE
+    return mixer_name, cardindex, capture
+
+
+def _get_muted(mixer, capture):
+    """Read the switch of the mixer."""
+    if capture:
+        # the capture switch is on while recording
+        return mixer.getrec()[0] == 0
+    return mixer.getmute()[0] == 1
+
+
+def _set_muted(mixer, muted, capture):
+    """Write the switch of the mixer."""
+    if capture:
+        mixer.setrec(0 if muted else 1)
+    else:
+        mixer.setmute(1 if muted else 0)
+
+
 def toggle_mute(mixer_name):
     """Mute or unmute.
 
     Returns None if it fails.
     """
-    if mixer_name not in alsaaudio.mixers():
+    mixer_name, cardindex, capture = _resolve_switch(mixer_name)
+    if mixer_name not in get_mixers(cardindex):
         logger.error('Could not find mixer %s', mixer_name)
         return None
 
-    mixer = alsaaudio.Mixer(mixer_name)
-    if mixer.getmute()[0]:
-        mixer.setmute(0)
-        return False
-    mixer.setmute(1)
-    return True
+    try:
+        with open_mixer(mixer_name, cardindex) as mixer:
+            muted = not _get_muted(mixer, capture)
+            _set_muted(mixer, muted, capture)
+            return muted
+    except alsaaudio.ALSAAudioError as error:
+        # some hardware mixers can't be muted
+        logger.error('Could not mute %s: %s', mixer_name, error)
+        return None
 
 
 def set_mute(mixer_name, state):
     """Set if the mixer should be muted or not."""
-    if mixer_name not in alsaaudio.mixers():
+    mixer_name, cardindex, capture = _resolve_switch(mixer_name)
+    if mixer_name not in get_mixers(cardindex):
         logger.error('Could not find mixer %s', mixer_name)
         return
-    mixer = alsaaudio.Mixer(mixer_name)
-    mixer.setmute(state)
+    try:
+        with open_mixer(mixer_name, cardindex) as mixer:
+            _set_muted(mixer, state, capture)
+    except alsaaudio.ALSAAudioError as error:
+        logger.error('Could not mute %s: %s', mixer_name, error)
 
 
 def is_muted(mixer_name=OUTPUT_MUTE):
     """Figure out if the output is muted or not."""
-    if mixer_name not in alsaaudio.mixers():
+    mixer_name, cardindex, capture = _resolve_switch(mixer_name)
+    if mixer_name not in get_mixers(cardindex):
         logger.error('Could not find mixer %s', mixer_name)
         return False
 
-    mixer = alsaaudio.Mixer(mixer_name)
-    return mixer.getmute()[0] == 1
+    try:
+        with open_mixer(mixer_name, cardindex) as mixer:
+            return _get_muted(mixer, capture)
+    except alsaaudio.ALSAAudioError:
+        # can't be muted
+        return False
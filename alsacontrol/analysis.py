@@ -0,0 +1,200 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Find problems with inputs in the buffers that are read for levels.
+
+Flags clipping, prolonged silence and DC offset, which usually mean that
+the gain of a microphone is too high, that it is muted in hardware or
+that it is broken. The buffers are analyzed one after the other, runs of
+clipped or silent samples may span multiple buffers.
+"""
+
+
+import time
+
+import numpy as np
+
+
+CLIPPING = 'clipping'
+SILENCE = 'silence'
+DC_OFFSET = 'dc-offset'
+
+# what alsaaudio.PCM opens with by default
+RATE = 44100
+CHANNELS = 2
+
+FULL_SCALE = 2 ** 15 - 1
+# consecutive full scale frames that count as clipping. A single one
+# might be a loud but fine transient
+MIN_CLIPPING_RUN = 3
+# how many seconds a clipping input stays flagged
+CLIPPING_HOLD = 2
+
+# peak below which an input is considered silent, about -66 dBFS
+SILENCE_THRESHOLD = 16
+# seconds until a silent input is flagged
+SILENCE_DURATION = 5
+
+# mean between -1 and 1 above which the input is flagged. It is cleared
+# again below half of that to avoid flickering
+DC_OFFSET_THRESHOLD = 0.02
+# time constant in seconds of the moving average of the mean
+DC_OFFSET_SMOOTHING = 1
+
+
+def get_longest_run(mask, carry=0):
+    """Get the longest and the trailing run of True in a boolean array.
+
+    Parameters
+    ----------
+    mask : np.ndarray
+    carry : int
+        Length of the trailing run of the previous array, which is
+        continued if the mask starts with True.
+    """
+    if len(mask) == 0:
+        return carry, carry
+
+    # +1 where a run starts, -1 after it ends
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask, [0]))))
+    starts = edges[::2]
+    lengths = edges[1::2] - starts
+    if len(lengths) == 0:
+        return 0, 0
+
+    if starts[0] == 0:
+        lengths[0] += carry
+
+    trailing = lengths[-1] if mask[-1] else 0
+    return int(np.max(lengths)), int(trailing)
+
+
+class InputAnalysis:
+    """The state of problems of a single input."""
+    def __init__(self, rate=RATE, channels=CHANNELS):
+        """Start without any flagged problems.
+
+        Parameters
+        ----------
+        rate : int
+            Frames per second of the analyzed buffers
+        channels : int
+            Samples per frame, interleaved
+        """
+        self.rate = rate
+        self.channels = channels
+        self.problems = set()
+
+        self._clipping_run = 0
+        self._seconds_since_clipping = None
+        self._silent_seconds = 0
+        self._dc_offset = 0
+        self._last_analyzed = None
+
+    def _set(self, problem, active, changes):
+        """Flag or clear a problem and remember if that changed anything."""
+        if active == (problem in self.problems):
+            return
+        if active:
+            self.problems.add(problem)
+        else:
+            self.problems.remove(problem)
+        changes.append((problem, active))
+
+    def _get_elapsed(self, num_frames, now):
+        """Seconds that the buffer covers.
+
+        Nonblocking pcms only keep a few periods, so frames that were not
+        read in time are lost and the buffers cover less than the time
+        between two reads.
+        """
+        elapsed = num_frames / self.rate
+        if self._last_analyzed is not None:
+            elapsed = max(elapsed, now - self._last_analyzed)
+        self._last_analyzed = now
+        return elapsed
+
+    def analyze(self, samples, now=None):
+        """Continue the analysis with the next buffer.
+
+        Parameters
+        ----------
+        samples : np.ndarray
+            int16 samples as read from the pcm
+        now : float or None
+            time.monotonic() of the read, if None uses the current time
+
+        Returns a list of (problem, active) for each problem that was
+        flagged or cleared.
+        """
+        num_frames = len(samples) // self.channels
+        if num_frames == 0:
+            return []
+
+        if now is None:
+            now = time.monotonic()
+        elapsed = self._get_elapsed(num_frames, now)
+
+        frames = samples[:num_frames * self.channels].reshape(
+            num_frames, self.channels
+        )
+        # int32 so that abs(-32768) doesn't overflow
+        magnitudes = np.abs(frames.astype(np.int32))
+        changes = []
+
+        # any channel at full scale clips the frame
+        clipped = np.max(magnitudes, axis=1) >= FULL_SCALE
+        longest, self._clipping_run = get_longest_run(
+            clipped,
+            self._clipping_run
+        )
+        if longest >= MIN_CLIPPING_RUN:
+            self._seconds_since_clipping = 0
+        elif self._seconds_since_clipping is not None:
+            self._seconds_since_clipping += elapsed
+            if self._seconds_since_clipping > CLIPPING_HOLD:
+                self._seconds_since_clipping = None
+        self._set(
+            CLIPPING,
+            self._seconds_since_clipping is not None,
+            changes
+        )
+
+        if np.max(magnitudes) < SILENCE_THRESHOLD:
+            self._silent_seconds += elapsed
+        else:
+            self._silent_seconds = 0
+        self._set(
+            SILENCE,
+            self._silent_seconds >= SILENCE_DURATION,
+            changes
+        )
+
+        mean = float(np.mean(frames)) / (FULL_SCALE + 1)
+        weight = np.exp(-elapsed / DC_OFFSET_SMOOTHING)
+        self._dc_offset = self._dc_offset * weight + mean * (1 - weight)
+        if DC_OFFSET in self.problems:
+            threshold = DC_OFFSET_THRESHOLD / 2
+        else:
+            threshold = DC_OFFSET_THRESHOLD
+        self._set(DC_OFFSET, bool(abs(self._dc_offset) > threshold), changes)
+
+        return changes
@@ -0,0 +1,85 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Named slots with their own volume for single applications.
+
+Each slot is a pcm called alsacontrol-app-<slot> with its own softvol
+control, stacked on top of the shared output. Applications are
+configured to play on it, for example with
+`mpv --audio-device=alsa/alsacontrol-app-mpv`.
+"""
+
+
+import re
+
+from alsacontrol.config import get_config
+from alsacontrol.logger import logger
+
+
+# ALSA control names have at most 44 bytes, see get_app_mixer
+MAX_SLOT_NAME_LENGTH = 44 - len('alsacontrol-app-') - len('-volume')
+
+
+def is_valid_slot_name(slot):
+    """Check if the slot name can be used in pcm and control names."""
+    if len(slot) > MAX_SLOT_NAME_LENGTH:
+        return False
+    return re.fullmatch(r'[a-zA-Z0-9_-]+', slot) is not None
+
+
+def get_app_slots():
+    """Get the names of all configured slots."""
+    slots = []
+    for slot in str(get_config().get('app_slots')).split():
+        if not is_valid_slot_name(slot):
+            logger.error('Invalid application slot name "%s"', slot)
+            continue
+        slots.append(slot)
+    return slots
+
+
+def get_app_pcm(slot):
+    """Get the pcm name that applications of this slot should play on."""
+    return f'alsacontrol-app-{slot}'
+
+
+def get_app_mixer(slot):
+    """Get the name of the softvol control of this slot."""
+    return f'alsacontrol-app-{slot}-volume'
+
+
+def add_app_slot(slot):
+    """Add a new slot to the config. Return False if that's not possible."""
+    if not is_valid_slot_name(slot):
+        logger.error('Invalid application slot name "%s"', slot)
+        return False
+    slots = get_app_slots()
+    if slot not in slots:
+        get_config().set('app_slots', ' '.join(slots + [slot]))
+    return True
+
+
+def remove_app_slot(slot):
+    """Remove a slot from the config."""
+    slots = get_app_slots()
+    if slot in slots:
+        slots.remove(slot)
+        get_config().set('app_slots', ' '.join(slots))
@@ -23,14 +23,26 @@
 
 import os
 
+import alsaaudio
+
 from alsacontrol.data import get_data_path
 from alsacontrol.config import get_config
 from alsacontrol.logger import logger
-from alsacontrol.cards import get_pcms
+from alsacontrol.cards import get_pcms, get_output_pcms
+from alsacontrol.latency import get_tuning
+from alsacontrol.appslots import get_app_slots, get_app_mixer
+# don't import is_jack_running directly to make patching this in tests
+# possible
+from alsacontrol import services
 
 
 alsactl_asoundrc = os.path.expanduser('~/.config/alsacontrol/asoundrc')
 
+# the ipc_key of the dmix fragment, dmix-card ones count up from there
+DMIX_IPC_KEY = 92882631
+
+_fragments = {}
+
 
 def setup_asoundrc():
     """Sets up the .asoundrc include and files in home."""
@@ -104,55 +116,201 @@ def should_use_dsnoop(pcm_input):
     return hardware_device and input_use_dmix and input_plugin_hw
 
 
-def create_asoundrc():
-    """Create and populate ~/.config/alsacontrol/asoundrc."""
-    pcm_input, pcm_output = get_pcms()
+def get_fragment(name):
+    """Get the template of a single pcm definition for the asoundrc.
+
+    Each fragment is read only once and then kept in memory.
+
+    Parameters
+    ----------
+    name : string
+        Filename in the data/asoundrc directory, like "dmix"
+    """
+    if name not in _fragments:
+        path = os.path.join(get_data_path(), 'asoundrc', name)
+        with open(path, 'r') as fragment_file:
+            _fragments[name] = fragment_file.read()
+    return _fragments[name]
+
+
+def render_fragment(name, **values):
+    """Fill the template of a pcm definition with values."""
+    return get_fragment(name).format(**values)
+
+
+def get_multi_output_chain(pcm_outputs):
+    """Play on multiple outputs at once by splitting the audio in alsa.
+
+    Each card gets its own softvol control. A route duplicates the
+    channels for each card, which multi then sends to the cards.
+
+    Returns a tuple of (fragments, last_output_step) with the fragments
+    being the rendered definitions.
+    """
+    fragments = []
+    channels = get_config().get('output_channels')
+    slaves = []
+    bindings = []
+    ttable = []
+
+    for index, pcm_output in enumerate(pcm_outputs):
+        if should_use_dmix(pcm_output):
+            card_slave = f'alsacontrol-dmix-{index}'
+            fragments.append(render_fragment(
+                'dmix-card',
+                index=index,
+                ipc_key=DMIX_IPC_KEY + 1 + index,
+                output_pcm=pcm_output,
+                output_channels=channels,
+                output_tuning=get_tuning(pcm_output, alsaaudio.PCM_PLAYBACK)
+            ))
+        else:
+            card_slave = pcm_output
+
+        fragments.append(render_fragment(
+            'output-card-softvol',
+            index=index,
+            slave=card_slave
+        ))
+
+        slaves.append(
+            f'\n    slaves.{index}.pcm "alsacontrol-output-{index}"'
+            f'\n    slaves.{index}.channels {channels}'
+        )
+        for channel in range(channels):
+            multi_channel = index * channels + channel
+            bindings.append(
+                f'\n    bindings.{multi_channel}.slave {index}'
+                f'\n    bindings.{multi_channel}.channel {channel}'
+            )
+            ttable.append(f'\n    ttable.{channel}.{multi_channel} 1')
+
+    fragments.append(render_fragment(
+        'multi',
+        slaves=''.join(slaves),
+        bindings=''.join(bindings)
+    ))
+    fragments.append(render_fragment(
+        'route',
+        channels=channels * len(pcm_outputs),
+        ttable=''.join(ttable)
+    ))
+
+    return fragments, 'alsacontrol-route'
+
+
+def get_output_chain(pcm_outputs):
+    """Figure out which pcms are needed to play on the outputs.
+
+    Returns a tuple of (fragments, output_pcm_asym) with the fragments
+    being the rendered definitions.
 
-    if pcm_output == 'jack':
+    Parameters
+    ----------
+    pcm_outputs : list
+        The primary output first, followed by others that play the
+        same audio.
+    """
+    pcm_output = pcm_outputs[0]
+    fragments = []
+
+    if len(pcm_outputs) > 1:
+        fragments, last_output_step = get_multi_output_chain(pcm_outputs)
+    elif pcm_output == 'jack':
         last_output_step = 'alsacontrol-plug'
+        fragments.append(render_fragment('plug', output_pcm=pcm_output))
     elif should_use_dmix(pcm_output):
         last_output_step = 'alsacontrol-dmix'
+        fragments.append(render_fragment(
+            'dmix',
+            output_pcm=pcm_output,
+            output_channels=get_config().get('output_channels'),
+            output_tuning=get_tuning(pcm_output, alsaaudio.PCM_PLAYBACK)
+        ))
     else:
         last_output_step = pcm_output
+
     # either from asym directly to the last step, or over softvol
-    if get_config().get('output_use_softvol'):
-        output_pcm_asym = 'alsacontrol-output-softvol'
-        output_pcm_softvol = last_output_step
-    else:
-        output_pcm_asym = last_output_step
-        output_pcm_softvol = 'null'
+    # dmix and dsnoop always have to be the last step
+    if get_config().get('output_use_softvol') and pcm_output != 'null':
+        fragments.append(render_fragment(
+            'output-softvol',
+            output_pcm_softvol=last_output_step
+        ))
+        return fragments, 'alsacontrol-output-softvol'
+
+    return fragments, last_output_step
+
+
+def get_input_chain(pcm_input):
+    """Figure out which pcms are needed to record from the input.
+
+    Returns a tuple of (fragments, input_pcm_asym) with the fragments
+    being the rendered definitions.
+    """
+    fragments = []
 
     if pcm_input == 'jack':
-        last_input_step = 'alsacontrol-plug'
+        last_input_step = 'alsacontrol-jack-input'
     elif should_use_dsnoop(pcm_input):
         last_input_step = 'alsacontrol-dsnoop'
+        fragments.append(render_fragment(
+            'dsnoop',
+            input_pcm=pcm_input,
+            input_tuning=get_tuning(pcm_input, alsaaudio.PCM_CAPTURE)
+        ))
     else:
         last_input_step = pcm_input
+
     # either from asym directly to the last step, or over softvol
-    if get_config().get('input_use_softvol'):
-        input_pcm_asym = 'alsacontrol-input-softvol'
-        input_pcm_softvol = last_input_step
-    else:
-        input_pcm_asym = last_input_step
-        input_pcm_softvol = 'null'
+    if get_config().get('input_use_softvol') and pcm_input != 'null':
+        fragments.append(render_fragment(
+            'input-softvol',
+            input_pcm_softvol=last_input_step
+        ))
+        return fragments, 'alsacontrol-input-softvol'
 
-    # dmix and dsnoop always have to be the last step
-    asoundrc_config = {
-        'output_pcm_asym': output_pcm_asym,
-        'output_pcm_softvol': output_pcm_softvol,
-        'output_pcm': pcm_output,
-        'output_channels': get_config().get('output_channels'),
-
-        'input_pcm_asym': input_pcm_asym,
-        'input_pcm_softvol': input_pcm_softvol,
-        'input_pcm': pcm_input,
-    }
-
-    template_path = os.path.join(get_data_path(), 'asoundrc-template')
-    with open(template_path, 'r') as template_file:
-        template = template_file.read()
-
-    asoundrc_content = template.format(**asoundrc_config)
+    return fragments, last_input_step
+
+
+def create_asoundrc():
+    """Create and populate ~/.config/alsacontrol/asoundrc.
+
+    Only the pcms that are actually used are written, because every
+    application parses this file each time it opens a pcm.
+    """
+    pcm_input, _ = get_pcms()
+
+    output_fragments, output_pcm_asym = get_output_chain(get_output_pcms())
+    input_fragments, input_pcm_asym = get_input_chain(pcm_input)
+
+    fragments = [render_fragment('header')]
+    fragments += output_fragments + input_fragments
+    if output_pcm_asym != 'null':
+        for slot in get_app_slots():
+            fragments.append(render_fragment(
+                'app-softvol',
+                slot=slot,
+                mixer=get_app_mixer(slot),
+                slave=output_pcm_asym
+            ))
+    if pcm_input == 'jack' or services.is_jack_running():
+        # used to monitor the level of jack
+        fragments.append(render_fragment('jack-input'))
+    fragments.append(render_fragment(
+        'default',
+        output_pcm_asym=output_pcm_asym,
+        input_pcm_asym=input_pcm_asym
+    ))
+
+    asoundrc_content = '\n'.join(fragments)
+
+    if os.path.exists(alsactl_asoundrc):
+        with open(alsactl_asoundrc, 'r') as asoundrc_file:
+            if asoundrc_file.read() == asoundrc_content:
+                # keep the mtime, so that alsa doesn't need to reload it
+                logger.debug('%s is up to date', alsactl_asoundrc)
+                return
 
     with open(alsactl_asoundrc, 'w+') as asoundrc_file:
         logger.info('Writing file %s', alsactl_asoundrc)
@@ -0,0 +1,198 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Find an input volume that results in a good recording level.
+
+The selected input is recorded through the default pcm, so that the
+softvol plugin is applied. The volume is then searched with bisection,
+so only a few mixer writes and short recordings are needed.
+"""
+
+
+import time
+
+import numpy as np
+
+import alsaaudio
+
+from alsacontrol.alsa import get_volume, set_volume, open_pcm
+from alsacontrol.cards import only_with_existing_input
+from alsacontrol.config import get_config
+from alsacontrol.logger import logger
+
+
+# desired loudness of the input in dBFS, which leaves room for louder
+# parts without clipping
+TARGET_DB = -20
+# close enough to stop searching
+TOLERANCE_DB = 1.5
+# peaks between 0 and 1 above this are too loud, no matter the loudness
+MAX_PEAK = 0.9
+# inputs that are quieter than that at the current volume can't be
+# calibrated, nobody is speaking into it
+SILENCE_DB = -60
+
+# seconds to record at the start and for each step of the search
+MEASURE_SECONDS = 2
+STEP_SECONDS = 0.5
+MAX_STEPS = 7
+# seconds after which the search is stopped with the best volume so far
+MAX_DURATION = 10
+
+# samples of the blocks whose rms is computed, 50ms of 44100Hz stereo
+BLOCK_SIZE = 4410
+# the louder parts determine the loudness, pauses in speech don't
+PERCENTILE = 90
+
+
+def to_db(value):
+    """Convert a level between 0 and 1 to dBFS."""
+    return 20 * np.log10(max(value, 1e-9))
+
+
+def record(seconds, device='default'):
+    """Record int16 samples through the pcm for a few seconds.
+
+    Returns None if the pcm can't be opened or read.
+    """
+    chunks = []
+    try:
+        with open_pcm(
+                type=alsaaudio.PCM_CAPTURE,
+                device=device,
+                mode=alsaaudio.PCM_NONBLOCK
+        ) as pcm:
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                length, data = pcm.read()
+                if length > 0:
+                    chunks.append(data)
+                else:
+                    time.sleep(0.005)
+    except alsaaudio.ALSAAudioError as error:
+        logger.error('Could not record for calibration: %s', error)
+        return None
+
+    return np.frombuffer(b''.join(chunks), dtype=np.int16)
+
+
+def get_loudness(samples, block_size=BLOCK_SIZE):
+    """Get the loudness in dBFS and the peak between 0 and 1.
+
+    Returns None if there are not enough samples.
+    """
+    if samples is None:
+        return None
+
+    num_blocks = len(samples) // block_size
+    if num_blocks == 0:
+        return None
+
+    blocks = samples[:num_blocks * block_size].reshape(
+        num_blocks, block_size
+    ).astype(np.float32)
+    rms = np.sqrt(np.mean(blocks * blocks, axis=1)) / (2 ** 15)
+    peak = np.max(np.abs(blocks)) / (2 ** 15)
+    return to_db(np.percentile(rms, PERCENTILE)), float(peak)
+
+
+def calibrate(target_db=TARGET_DB):
+    """Set and remember the input volume that reaches the loudness.
+
+    Takes up to MAX_DURATION seconds and blocks while doing so. Something
+    should be recorded during that time, for example the user speaking.
+
+    Returns the new volume between 0 and 1 or None if not possible.
+    """
+    start = time.monotonic()
+
+    volume = get_volume(alsaaudio.PCM_CAPTURE)
+    measurement = get_loudness(record(MEASURE_SECONDS))
+    if measurement is None:
+        return None
+    loudness, peak = measurement
+    if loudness < SILENCE_DB:
+        logger.error('The input is silent, can\'t calibrate')
+        return None
+
+    logger.info('Calibrating the input volume to %sdBFS', target_db)
+    low = 0
+    high = 1
+    best = None
+    # the last iteration only evaluates the last step
+    for step in range(MAX_STEPS + 1):
+        too_loud = peak > MAX_PEAK or loudness > target_db
+        logger.debug(
+            'Volume %.3f: %.1fdBFS, peak %.2f',
+            volume, loudness, peak
+        )
+
+        error = abs(loudness - target_db)
+        if peak <= MAX_PEAK and (best is None or error < best[1]):
+            best = (volume, error)
+            if error <= TOLERANCE_DB:
+                break
+
+        if step == MAX_STEPS:
+            break
+
+        if too_loud:
+            high = volume
+        else:
+            low = volume
+
+        if time.monotonic() - start + STEP_SECONDS > MAX_DURATION:
+            logger.error('Calibrating the input takes too long')
+            break
+
+        volume = (low + high) / 2
+        set_volume(volume, alsaaudio.PCM_CAPTURE)
+        measurement = get_loudness(record(STEP_SECONDS))
+        if measurement is None:
+            break
+        loudness, peak = measurement
+
+    if best is None:
+        logger.error('Could not find an input volume that doesn\'t clip')
+        volume = low
+    else:
+        volume = best[0]
+
+    volume = max(0.01, round(volume, 3))
+    set_volume(volume, alsaaudio.PCM_CAPTURE)
+    get_config().set('input_calibrated_volume', volume)
+    logger.info('Calibrated the input volume to %s', volume)
+    return volume
+
+
+def forget_calibration():
+    """Don't apply the calibrated volume anymore on the next start."""
+    if get_config().get('input_calibrated_volume') != 0:
+        get_config().set('input_calibrated_volume', 0)
+
+
+@only_with_existing_input
+def apply_calibration():
+    """Set the input volume that was found by calibrate, if any."""
+    volume = get_config().get('input_calibrated_volume')
+    if volume > 0:
+        logger.debug('Applying the calibrated input volume %s', volume)
+        set_volume(volume, alsaaudio.PCM_CAPTURE)
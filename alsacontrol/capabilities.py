@@ -0,0 +1,244 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Remember what cards can do, without opening their pcms.
+
+The information is read from /proc/asound and /sys and stored in
+~/.cache/alsacontrol, so that the GUI knows which cards can't record
+before trying to open them.
+"""
+
+
+import os
+import re
+import json
+
+from alsacontrol.logger import logger
+
+
+_index = None
+
+
+def get_card_path(card, proc_path='/proc/asound'):
+    """Get the /proc/asound/cardN path of a card or None if not found."""
+    # /proc/asound/Generic is a symlink to card0
+    path = os.path.join(proc_path, card)
+    if not os.path.exists(path):
+        return None
+    return os.path.realpath(path)
+
+
+def _read(path):
+    """Get the stripped contents of a file or None if it doesn't exist."""
+    try:
+        with open(path, 'r') as file:
+            return file.read().strip()
+    except OSError:
+        return None
+
+
+def get_card_identity(card_path):
+    """Figure out the USB or PCI ids of the card behind the path.
+
+    Used to tell apart different devices that got the same card id.
+    """
+    usbid = _read(os.path.join(card_path, 'usbid'))
+    if usbid is not None:
+        return f'usb:{usbid}'
+
+    card_number = os.path.basename(card_path)
+    device_path = os.path.join('/sys/class/sound', card_number, 'device')
+    vendor = _read(os.path.join(device_path, 'vendor'))
+    device = _read(os.path.join(device_path, 'device'))
+    if vendor is not None and device is not None:
+        return f'pci:{vendor}:{device}'
+
+    return ''
+
+
+def parse_stream(contents):
+    """Get channels, rates and formats from a /proc/asound stream file.
+
+    Those files only exist for USB devices.
+    """
+    channels = set()
+    rates = set()
+    formats = set()
+    for line in contents.split('\n'):
+        line = line.strip()
+        if line.startswith('Format:'):
+            formats.add(line.split(':', 1)[1].strip())
+        elif line.startswith('Channels:'):
+            channels.add(int(line.split(':', 1)[1]))
+        elif line.startswith('Rates:'):
+            for rate in re.findall(r'\d+', line):
+                rates.add(int(rate))
+    return sorted(channels), sorted(rates), sorted(formats)
+
+
+def probe_card(card, proc_path='/proc/asound'):
+    """Find out what a card can do.
+
+    Returns a dict. 'playback' and 'capture' are None if unknown.
+    """
+    capabilities = {
+        'identity': '',
+        'playback': None,
+        'capture': None,
+        'channels': [],
+        'rates': [],
+        'formats': []
+    }
+
+    card_path = get_card_path(card, proc_path)
+    if card_path is None:
+        # for example jack, which is not an actual card
+        return capabilities
+
+    capabilities['identity'] = get_card_identity(card_path)
+
+    devices = os.listdir(card_path)
+    # for example pcm0p for playback, pcm0c for capture
+    capabilities['playback'] = any(
+        re.fullmatch(r'pcm\d+p', device) for device in devices
+    )
+    capabilities['capture'] = any(
+        re.fullmatch(r'pcm\d+c', device) for device in devices
+    )
+
+    for device in devices:
+        if not device.startswith('stream'):
+            continue
+        stream = _read(os.path.join(card_path, device))
+        if stream is None:
+            continue
+        channels, rates, formats = parse_stream(stream)
+        capabilities['channels'] = sorted(
+            set(capabilities['channels'] + channels)
+        )
+        capabilities['rates'] = sorted(set(capabilities['rates'] + rates))
+        capabilities['formats'] = sorted(
+            set(capabilities['formats'] + formats)
+        )
+
+    return capabilities
+
+
+class CapabilityIndex:
+    """Cards that were seen before and what they can do."""
+    def __init__(self, path=None, proc_path='/proc/asound'):
+        """Load the index from the disk.
+
+        Parameters
+        ----------
+        path : string or None
+            If none, will default to '~/.cache/alsacontrol/cards.json'
+        """
+        if path is None:
+            path = os.path.expanduser('~/.cache/alsacontrol/cards.json')
+
+        self._path = path
+        self._proc_path = proc_path
+        self._cards = {}
+        # cards that might have been swapped since they were probed
+        self._stale = set()
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as index_file:
+                    self._cards = json.load(index_file)
+            except ValueError:
+                logger.error('Could not read the card index %s', path)
+            # the cards might have changed while alsacontrol wasn't running
+            self._stale = set(self._cards)
+
+    def get(self, card):
+        """Get the capabilities of a card, probing it if needed."""
+        if card in self._cards and card not in self._stale:
+            return self._cards[card]
+
+        if card in self._stale:
+            self._stale.remove(card)
+            card_path = get_card_path(card, self._proc_path)
+            if card_path is not None:
+                identity = get_card_identity(card_path)
+                if identity == self._cards[card]['identity']:
+                    return self._cards[card]
+
+        logger.debug('Probing the capabilities of "%s"', card)
+        capabilities = probe_card(card, self._proc_path)
+        if self._cards.get(card) != capabilities:
+            self._cards[card] = capabilities
+            self.save()
+
+        return capabilities
+
+    def can_capture(self, card):
+        """Check if the card can record. False only if known for sure."""
+        return self.get(card)['capture'] is not False
+
+    def can_play(self, card):
+        """Check if the card can play. False only if known for sure."""
+        return self.get(card)['playback'] is not False
+
+    def get_latency(self, card, key):
+        """Get the latency profile that was probed before, or None.
+
+        See alsacontrol.latency.probe_profile. Forgotten together with
+        the other capabilities once another card gets the same name.
+        """
+        return self.get(card).get('latency', {}).get(key)
+
+    def set_latency(self, card, key, profile):
+        """Remember the latency profile that the hardware supports."""
+        self.get(card)
+        self._cards[card].setdefault('latency', {})[key] = profile
+        self.save()
+
+    def invalidate(self, cards=None):
+        """Revalidate those cards the next time they are needed.
+
+        Parameters
+        ----------
+        cards : list or None
+            If None, all of them will be revalidated.
+        """
+        if cards is None:
+            cards = self._cards.keys()
+        self._stale.update(card for card in cards if card in self._cards)
+
+    def save(self):
+        """Write the index to the disk."""
+        if not os.path.exists(os.path.dirname(self._path)):
+            os.makedirs(os.path.dirname(self._path))
+        with open(self._path, 'w') as index_file:
+            json.dump(self._cards, index_file, indent=4)
+
+
+def get_capability_index(*args, **kwargs):
+    """Ask for the card index. Initialize it if not yet done so.
+
+    Will pass any parameters to the constructor. Only needed in tests.
+    """
+    global _index
+    if _index is None:
+        _index = CapabilityIndex(*args, **kwargs)
+    return _index
@@ -0,0 +1,262 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Read input levels in a separate thread.
+
+A device that stalls or recovers from an xrun would otherwise freeze the
+user interface. The user interface only ever talks to the worker with
+commands and receives the latest level of each card.
+"""
+
+
+import time
+import queue
+import threading
+
+from alsacontrol.levels import LevelMeter, get_peak
+from alsacontrol.spectrum import Spectrum
+from alsacontrol.logger import logger
+
+
+class CaptureWorker(threading.Thread):
+    """Reads the levels of multiple cards, each with its own rate.
+
+    Results are handed over in a mailbox with one slot per card, in which
+    newer levels overwrite older ones. Whenever the mailbox gets new
+    contents while nobody is about to collect them, notify is called, so
+    that a toolkit can schedule collecting them once for a whole batch.
+    """
+    def __init__(self, notify):
+        """Create the worker. Call start() to run it.
+
+        Parameters
+        ----------
+        notify : callable
+            Called from the worker thread without arguments when new
+            levels can be collected. Should not do more than scheduling
+            collect() in the thread of the user interface, for example
+            using GLib.idle_add.
+        """
+        super().__init__(daemon=True)
+        self._notify = notify
+        self._commands = queue.Queue()
+
+        # guards the mailbox, the pending flag and the spectrum slot,
+        # which are shared between the worker and the user interface
+        self._lock = threading.Lock()
+        # written by the worker, read by collect. Maps each card to a
+        # tuple of (peak, valid, problems)
+        self._mailbox = {}
+        self._pending = False
+        # (card, bands) of the latest spectrum. The next one is only
+        # computed after this one was taken
+        self._spectrum_slot = None
+
+        # only touched by the worker thread
+        self._meters = {}
+        self._rates = {}
+        self._due = {}
+        self._spectrum = None
+        self._spectrum_card = None
+
+    def monitor(self, card, rate):
+        """Start reading the card or change how often it is read.
+
+        Parameters
+        ----------
+        card : string
+        rate : float
+            How many times per second the level is read
+        """
+        self._commands.put(('monitor', card, rate))
+
+    def stop_monitoring(self, card):
+        """Stop reading the card and close its pcm."""
+        self._commands.put(('stop', card, None))
+
+    def analyze_spectrum(self, card):
+        """Also compute the spectrum of a card that is monitored.
+
+        Parameters
+        ----------
+        card : string or None
+            None to stop computing spectrums
+        """
+        self._commands.put(('spectrum', card, None))
+
+    def quit(self):
+        """Close all pcms and end the thread."""
+        self._commands.put(('quit', None, None))
+
+    def collect(self):
+        """Get a list of (card, (peak, valid, problems)) of the latest levels.
+
+        The peak is None if the card didn't produce new data yet. Cards
+        that are not valid have been closed and stopped. problems is a
+        frozenset of what alsacontrol.analysis currently flags for the
+        card. Doesn't block.
+        """
+        # levels that arrive afterwards will schedule a new collect
+        with self._lock:
+            mailbox = self._mailbox
+            self._mailbox = {}
+            self._pending = False
+        return list(mailbox.items())
+
+    def take_spectrum(self):
+        """Get (card, bands) of the latest spectrum or None.
+
+        Bands are between 0 and 1, see alsacontrol.spectrum. Taking it
+        allows the worker to compute the next one, so spectrums are
+        computed only as fast as they are painted.
+        """
+        with self._lock:
+            spectrum = self._spectrum_slot
+            self._spectrum_slot = None
+        return spectrum
+
+    def _publish(self, card, peak, valid, problems=frozenset()):
+        """Put a result into the mailbox and notify if needed."""
+        with self._lock:
+            self._mailbox[card] = (peak, valid, problems)
+            notify = self._set_pending()
+        if notify:
+            self._notify()
+
+    def _set_pending(self):
+        """Return True if nobody was notified about new results yet.
+
+        Needs to be called with the lock held.
+        """
+        if self._pending:
+            return False
+        self._pending = True
+        return True
+
+    def _handle(self, command):
+        """Apply a command from the user interface.
+
+        Returns False if the worker should end.
+        """
+        action, card, rate = command
+
+        if action == 'monitor':
+            self._rates[card] = rate
+            if card not in self._meters:
+                meter = LevelMeter(card)
+                if not meter.open():
+                    self._publish(card, None, False)
+                    del self._rates[card]
+                    return True
+                self._meters[card] = meter
+                self._due[card] = time.monotonic()
+
+        if action == 'stop':
+            self._close(card)
+
+        if action == 'spectrum':
+            self._spectrum_card = card
+            self._spectrum = None if card is None else Spectrum()
+
+        if action == 'quit':
+            for card_to_close in list(self._meters):
+                self._close(card_to_close)
+            return False
+
+        return True
+
+    def _close(self, card):
+        """Close the pcm of the card and forget about it."""
+        meter = self._meters.pop(card, None)
+        if meter is not None:
+            meter.close()
+        self._rates.pop(card, None)
+        self._due.pop(card, None)
+
+    def _read_due(self):
+        """Read all cards that are due."""
+        now = time.monotonic()
+        for card in list(self._meters):
+            if self._due[card] > now:
+                continue
+
+            meter = self._meters[card]
+            samples = meter.read()
+            if not meter.valid:
+                self._close(card)
+                self._publish(card, None, False)
+                continue
+
+            if samples is not None and card == self._spectrum_card:
+                self._analyze_spectrum(card, samples)
+
+            if samples is not None:
+                self._publish(
+                    card,
+                    float(get_peak(samples)),
+                    True,
+                    frozenset(meter.analysis.problems)
+                )
+
+            interval = 1 / self._rates[card]
+            self._due[card] += interval
+            if self._due[card] < now:
+                # don't try to catch up after a stall
+                self._due[card] = now + interval
+
+    def _analyze_spectrum(self, card, samples):
+        """Feed the samples and compute the spectrum if it was taken."""
+        self._spectrum.feed(samples)
+        with self._lock:
+            if self._spectrum_slot is not None:
+                # not painted yet
+                return
+        if not self._spectrum.compute():
+            return
+
+        with self._lock:
+            self._spectrum_slot = (card, self._spectrum.bands.copy())
+            notify = self._set_pending()
+        if notify:
+            self._notify()
+
+    def _get_timeout(self):
+        """How long to wait for commands until the next card is due."""
+        if len(self._due) == 0:
+            return None
+        return max(0, min(self._due.values()) - time.monotonic())
+
+    def run(self):
+        """Read levels until quit is called."""
+        logger.debug('Starting the capture worker')
+        while True:
+            try:
+                command = self._commands.get(timeout=self._get_timeout())
+            except queue.Empty:
+                command = None
+
+            if command is not None:
+                if not self._handle(command):
+                    break
+                continue
+
+            self._read_due()
+        logger.debug('Stopped the capture worker')
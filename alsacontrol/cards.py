@@ -89,6 +89,26 @@ def get_pcms():
     return pcm_input, pcm_output
 
 
+def get_output_pcms():
+    """Return a list of all pcms that should play, the primary one first.
+
+    Returns ['null'] if no output is configured. Additional outputs
+    whose card is missing are left out, because multi can't open any
+    of its slaves otherwise.
+    """
+    pcm_outputs = [get_config().get('pcm_output')]
+    for pcm_output in get_config().get('pcm_output_extra').split():
+        if pcm_output in pcm_outputs:
+            continue
+        if not card_exists(pcm_output):
+            logger.debug('Skipping missing output "%s"', pcm_output)
+            continue
+        pcm_outputs.append(pcm_output)
+    if pcm_outputs[0] == 'null':
+        return ['null']
+    return pcm_outputs
+
+
 def get_card(pcm):
     """Split the card from a pcm string.
 
@@ -180,6 +200,25 @@ def only_with_existing_output(func):
     return inner
 
 
+def get_output_pcm_name(card, plugin=None):
+    """Get the pcm that is written to the config for an output card.
+
+    Parameters
+    ----------
+    card : string or None
+    plugin : string or None
+        If None, uses the configured output_plugin
+    """
+    # figure out if this is an actual hardware device or not
+    if card is None:
+        return 'null'
+    if card in alsaaudio.cards():
+        if plugin is None:
+            plugin = get_config().get('output_plugin')
+        return f'{plugin}:CARD={card}'
+    return card  # otherwise probably jack
+
+
 def select_output_pcm(card):
     """Write this pcm to the configuration.
 
@@ -188,16 +227,38 @@ def select_output_pcm(card):
     card : string
         "Generic", "jack", ...
     """
-    # figure out if this is an actual hardware device or not
-    cards = alsaaudio.cards()
-    if card is None:
-        card = 'null'
-    if card in cards:
-        plugin = get_config().get('output_plugin')
-        pcm_name = f'{plugin}:CARD={card}'
-    else:
-        pcm_name = card  # otherwise probably jack
-    get_config().set('pcm_output', pcm_name)
+    get_config().set('pcm_output', get_output_pcm_name(card))
+
+
+def select_output_pcms(cards):
+    """Play on multiple cards at once.
+
+    Parameters
+    ----------
+    cards : list
+        "Generic", "HDMI", ... The first one is the primary output,
+        that is also used when only a single output is possible.
+    """
+    if len(cards) == 0:
+        cards = [None]
+    pcm_names = [get_output_pcm_name(card) for card in cards]
+    get_config().set('pcm_output', pcm_names[0])
+    get_config().set('pcm_output_extra', ' '.join(pcm_names[1:]))
+
+
+def get_output_card_mixer(card):
+    """Get the softvol control of a card of select_output_pcms.
+
+    Returns None if the card is not one of multiple outputs, because
+    those controls only exist when playing on more than one card.
+    """
+    pcm_outputs = get_output_pcms()
+    if len(pcm_outputs) < 2:
+        return None
+    for index, pcm_output in enumerate(pcm_outputs):
+        if get_card(pcm_output) == card:
+            return f'alsacontrol-output-{index}-volume'
+    return None
 
 
 def select_input_pcm(card):
@@ -22,30 +22,58 @@
 """Keep track of added or removed cards."""
 
 
+from collections import namedtuple
+
 from alsacontrol.cards import get_cards
 from alsacontrol.logger import logger
 
 
+# sets of card names. Empty if nothing changed
+CardChanges = namedtuple('CardChanges', ['added', 'removed'])
+
+
 class CardsTracker:
     """To keep track of added or removed cards."""
-    def __init__(self):
-        """Create it without doing anything yet."""
+    def __init__(self, list_cards=get_cards):
+        """Create it without doing anything yet.
+
+        Parameters
+        ----------
+        list_cards : callable
+            Returns the names of the current cards. alsaaudio.cards
+            is cheaper than the default if jack doesn't matter, because
+            it doesn't ask D-Bus if jack is running.
+        """
         self.cards = None
+        self._list_cards = list_cards
 
-    def log_new_pcms(self):
-        """Write to the console if new cards are added. Return True if so."""
+    def update(self):
+        """Check which cards were added or removed since the last call.
+
+        Returns CardChanges and logs them. When called for the first
+        time, all cards count as added without being logged.
+        """
         # using .cards() isntead of .pcms() is MUCH faster
-        cards = set(get_cards())
-        changes = 0
+        cards = set(self._list_cards())
         if self.cards is None:
-            # first time running, don't log yet
-            pass
-        else:
-            for card in self.cards.difference(cards):
-                logger.info('Card "%s" was removed', card)
-                changes += 1
-            for card in cards.difference(self.cards):
-                logger.info('Found new card "%s"', card)
-                changes += 1
+            self.cards = cards
+            return CardChanges(cards, set())
+
+        changes = CardChanges(
+            cards.difference(self.cards),
+            self.cards.difference(cards)
+        )
+        for card in changes.removed:
+            logger.info('Card "%s" was removed', card)
+        for card in changes.added:
+            logger.info('Found new card "%s"', card)
         self.cards = cards
-        return changes > 0
+        return changes
+
+    def log_new_pcms(self):
+        """Write to the console if new cards are added. Return True if so."""
+        first_time = self.cards is None
+        changes = self.update()
+        if first_time:
+            return False
+        return len(changes.added) + len(changes.removed) > 0
@@ -23,6 +23,7 @@
 
 
 import os
+from types import MappingProxyType
 
 from alsacontrol.logger import logger
 
@@ -39,10 +40,102 @@ _defaults = {
     'output_use_dmix': True,
     'output_use_softvol': True,
     'output_channels': 2,
-    'output_plugin': 'hw'
+    'output_plugin': 'hw',
+    # space separated pcms that play the same audio as pcm_output
+    'pcm_output_extra': '',
+    # space separated cards that are used in this order when the
+    # selected output card is removed
+    'output_fallbacks': '',
+    # the card that was selected before failing over to a fallback, it
+    # is selected again once it comes back. Empty if not failed over
+    'output_preferred': '',
+    # space separated names of applications that get their own volume
+    'app_slots': '',
+    # one of alsacontrol.latency.PROFILES, for dmix and dsnoop
+    'latency_profile': 'default',
+    # how many times per second the daemon writes levels into the
+    # shared memory for widgets, 0 to only export the volume
+    'export_levels_rate': 0,
+    # input volume found by alsacontrol.calibration, 0 if not calibrated
+    'input_calibrated_volume': 0.0,
+    # seconds without volume changes after which the daemon exits, it is
+    # started again by D-Bus when needed. 0 to keep it running
+    'daemon_idle_timeout': 0,
+    # tcp port of the remote control of the daemon, 0 to disable it.
+    # See alsacontrol.remote
+    'remote_port': 0,
+    # 0.0.0.0 to allow clients of other machines
+    'remote_address': '127.0.0.1'
 }
 
 
+def _parse_bool(value):
+    """Parse booleans the way Config.set writes them."""
+    if value == 'True':
+        return True
+    if value == 'False':
+        return False
+    raise ValueError(f'expected True or False, got "{value}"')
+
+
+def _parse_int(value):
+    """Parse an int without accepting floats."""
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'expected an integer, got "{value}"') from None
+
+
+def _parse_float(value):
+    """Parse a float or an int."""
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f'expected a number, got "{value}"') from None
+
+
+# the type of each default decides how values of the setting are parsed.
+# bool before int, because bools are ints as well
+_converters = {
+    key: (
+        _parse_bool if isinstance(default, bool) else
+        _parse_int if isinstance(default, int) else
+        _parse_float if isinstance(default, float) else
+        str
+    )
+    for key, default in _defaults.items()
+}
+
+
+def _parse_config(config_contents, path):
+    """Get a dict of the settings in the contents of a config file.
+
+    Malformed lines and unknown settings are logged with their line
+    number and skipped, so that their defaults are used instead.
+    """
+    config = {}
+    for line_number, line in enumerate(config_contents.split('\n'), 1):
+        line = line.strip()
+        if line == '' or line.startswith('#'):
+            continue
+
+        if '=' not in line:
+            logger.error('%s:%d: Expected key=value', path, line_number)
+            continue
+
+        key, value = line.split('=', 1)
+        key = key.strip()
+        if key not in _converters:
+            logger.error('%s:%d: Unknown setting %s', path, line_number, key)
+            continue
+
+        try:
+            config[key] = _converters[key](value.strip())
+        except ValueError as error:
+            logger.error('%s:%d: %s: %s', path, line_number, key, error)
+    return config
+
+
 def _modify_config(config_contents, key, value):
     """Return a string representing the modified contents of the config file.
 
@@ -95,7 +188,11 @@ class Config:
         logger.debug('Using config file at %s', path)
 
         self._path = path
+        # settings of the file
         self._config = {}
+        # complete and read-only, including defaults
+        self._snapshot = MappingProxyType(dict(_defaults))
+        self._contents = None
         self.mtime = 0
 
         self.create_config_file()
@@ -113,64 +210,93 @@ class Config:
     def load_config(self):
         """Read the config file."""
         logger.debug('Loading configuration')
-        self._config = {}
-        # load config
-        self.mtime = os.path.getmtime(self._path)
+        self.mtime = os.stat(self._path).st_mtime_ns
         with open(self._path, 'r') as config_file:
-            for line in config_file:
-                line = line.strip()
-                if not line.startswith('#'):
-                    split = line.split('=', 1)
-                    if len(split) == 2:
-                        key = split[0]
-                        value = split[1]
-                    else:
-                        key = split[0]
-                        value = None
-                if value.isdigit():
-                    value = int(value)
-                else:
-                    try:
-                        value = float(value)
-                    except ValueError:
-                        pass
-                if value == 'True':
-                    value = True
-                if value == 'False':
-                    value = False
-                self._config[key] = value
+            contents = config_file.read()
+
+        if contents == self._contents:
+            # touched or rewritten with the same settings
+            return
+
+        self._contents = contents
+        self._update(_parse_config(contents, self._path))
+
+    def _update(self, config):
+        """Replace the settings and create a new snapshot of them.
+
+        Snapshots are never modified, so they can be handed to other
+        threads without copying.
+        """
+        self._config = config
+        self._snapshot = MappingProxyType({**_defaults, **config})
 
     def check_mtime(self):
         """Check if the config file has been modified and reload if needed."""
-        if os.path.getmtime(self._path) != self.mtime:
+        if os.stat(self._path).st_mtime_ns != self.mtime:
             logger.info('Config changed, reloading')
             self.load_config()
 
+    def snapshot(self):
+        """Get a read-only mapping of all settings, including defaults.
+
+        It doesn't change when settings change later.
+        """
+        self.check_mtime()
+        return self._snapshot
+
     def get(self, key):
         """Read a value from the configuration or get the default."""
         self.check_mtime()
         if key not in _defaults:
             logger.error('Unknown setting %s', key)
             return None
-        return self._config.get(key, _defaults[key])
+        return self._snapshot[key]
 
     def set(self, key, value):
         """Write a setting into memory and ~/.config/alsacontrol/config."""
-        if key not in _defaults:
-            logger.error('Unknown setting %s', key)
-            return None
+        return self.set_many({key: value})
+
+    def set_many(self, settings):
+        """Write multiple settings at once, with a single write to the disk.
+
+        Returns None without changing anything if one of them is invalid,
+        False if all of them already had the value and otherwise True.
+
+        Parameters
+        ----------
+        settings : dict
+            Maps keys to values
+        """
+        converted = {}
+        for key, value in settings.items():
+            if key not in _defaults:
+                logger.error('Unknown setting %s', key)
+                return None
+
+            try:
+                converted[key] = _converters[key](str(value))
+            except ValueError as error:
+                logger.error('Invalid value for %s: %s', key, error)
+                return None
 
         self.check_mtime()
 
-        if key in self._config and self._config[key] == value:
-            logger.debug('Setting "%s" is already "%s"', key, value)
+        changed = {}
+        for key, value in converted.items():
+            if key in self._config and self._config[key] == value:
+                logger.debug('Setting "%s" is already "%s"', key, value)
+                continue
+            changed[key] = value
+
+        if len(changed) == 0:
             return False
 
-        self._config[key] = value
+        self._update({**self._config, **changed})
 
         with open(self._path, 'r+') as config_file:
             config_contents = config_file.read()
-            config_contents = _modify_config(config_contents, key, value)
+            for key, value in changed.items():
+                config_contents = _modify_config(config_contents, key, value)
 
         # overwrite completely
         with open(self._path, 'w') as config_file:
@@ -178,7 +304,8 @@ class Config:
                 config_contents += '\n'
             config_file.write(config_contents)
 
-        self.mtime = os.path.getmtime(self._path)
+        self._contents = config_contents
+        self.mtime = os.stat(self._path).st_mtime_ns
         return True
 
 
@@ -0,0 +1,763 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""The volume service on the session bus.
+
+Shared by alsacontrol-daemon and alsacontrol-daemon-gtk, which only
+differ in how they show notifications.
+"""
+
+
+import os
+import json
+import time
+import signal
+
+from dbus import service
+from dbus.mainloop.glib import DBusGMainLoop
+import dbus.mainloop.glib
+import alsaaudio
+import gi
+gi.require_version('GLib', '2.0')
+from gi.repository import GLib
+
+from alsacontrol.asoundrc import setup_asoundrc
+from alsacontrol.cards import output_exists, get_current_card, \
+    only_with_existing_output, get_card, get_cards
+from alsacontrol.alsa import get_volume, set_volume, is_muted, toggle_mute, \
+    OUTPUT_MUTE, to_mixer_volume, to_perceived_volume, get_mixer_volume, \
+    set_mixer_volume, play_silence
+from alsacontrol.appslots import get_app_slots, get_app_mixer, get_app_pcm
+from alsacontrol.bindings import get_volume_icon
+from alsacontrol.logger import logger, log_info, debug_log_on
+from alsacontrol.dbus import set_bus
+from alsacontrol.services import is_daemon_running, is_pulse_running, \
+    is_xfce4_pulse_plugin_running
+from alsacontrol.cardstracker import CardsTracker
+from alsacontrol.sharedlevels import SharedLevelsWriter
+from alsacontrol.config import get_config
+from alsacontrol.capabilities import get_capability_index
+from alsacontrol.notifications import get_notifications
+from alsacontrol.failover import apply_failover
+from alsacontrol.resources import get_resource_tracker, REPORT_INTERVAL
+from alsacontrol.profiles import switch_output
+from alsacontrol.remote import RemoteServer, SENDER_PREFIX
+
+
+# subscriber name for the shared memory export, which is not a bus name
+SHARED_LEVELS = 'shared-levels'
+
+# where the state survives when the daemon exits while being idle
+STATE_PATH = '~/.cache/alsacontrol/daemon.json'
+
+# seconds between checks for removed or added output cards
+FAILOVER_INTERVAL = 2
+
+
+def load_state(path=STATE_PATH):
+    """Get the dict that save_state wrote, or an empty one."""
+    path = os.path.expanduser(path)
+    if not os.path.exists(path):
+        return {}
+
+    try:
+        with open(path, 'r') as state_file:
+            return json.load(state_file)
+    except ValueError:
+        logger.error('Could not read the daemon state %s', path)
+        return {}
+
+
+def save_state(state, path=STATE_PATH):
+    """Write a dict to restore it on the next start."""
+    path = os.path.expanduser(path)
+    if not os.path.exists(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, 'w') as state_file:
+        json.dump(state, state_file)
+
+
+class Daemon(service.Object):
+    """Waits for volume changes over alsacontrol and displays them.
+
+    This needs to be done by a daemon, so that it can hold a state and
+    replace the old notification with the outdated volume instead of
+    stacking them.
+    """
+    def __init__(self, notifications, quit_callback, *args, **kwargs):
+        """Take over the current volume and export it.
+
+        Parameters
+        ----------
+        notifications : Notifications
+            See alsacontrol.notifications
+        quit_callback : callable
+            Called without arguments to stop the main loop when the
+            daemon was idle for daemon_idle_timeout seconds.
+        """
+        self._notifications = notifications
+        self._quit_callback = quit_callback
+
+        # fine grained current mixer volume to better convert from linear
+        # to perceived volume without having to worry about rounding.
+        # Especially going down by 10% and up by 10% should end up at the
+        # initial volume. alsamixer only provides a resolution of 100
+        # and softvol of max 1048. Restored from the previous run, if the
+        # mixer wasn't changed in the meantime.
+        state = load_state()
+        if output_exists('Daemon', testcard=False):
+            self.perceived_volume = state.get(
+                'perceived_volume',
+                get_volume(alsaaudio.PCM_PLAYBACK, True)
+            )
+            self.check_volume_integrity()
+        else:
+            self.perceived_volume = 0
+
+        # requests that are applied in the next iteration of the main
+        # loop, after the client got its reply
+        self._pending_volume_change = 0
+        self._pending_app_volume_changes = {}
+        self._pending_mute_toggles = 0
+        self._scheduled = set()
+
+        # one metering loop for all clients that are interested in levels.
+        # Maps the unique bus name of each subscriber to its rate in Hz
+        self._level_subscribers = {}
+        self._level_watches = {}
+        # created once levels are needed, to not load numpy before
+        self._levels_monitor = None
+        self._levels_cards_tracker = CardsTracker()
+        self._levels_rate = None
+        self._levels_timeout = None
+        self._levels_cards_timeout = None
+
+        self._shared_levels = SharedLevelsWriter()
+
+        self._remote = None
+        remote_port = get_config().get('remote_port')
+        if remote_port > 0:
+            self._remote = RemoteServer(
+                self,
+                get_config().get('remote_address'),
+                remote_port
+            )
+            if not self._remote.start():
+                self._remote = None
+
+        self._last_activity = time.monotonic()
+        self._idle_timeout = None
+        idle_timeout = get_config().get('daemon_idle_timeout')
+        if idle_timeout > 0 and self._remote is not None:
+            # D-Bus doesn't start the daemon again for tcp clients
+            logger.warning(
+                'Ignoring daemon_idle_timeout, because remote_port is set'
+            )
+        elif idle_timeout > 0:
+            self._idle_timeout = get_resource_tracker().timeout_add(
+                max(1, idle_timeout // 10),
+                self._check_idle,
+                idle_timeout,
+                seconds=True
+            )
+
+        # switches the output when the card is removed
+        # jack can't be a failover target, so don't ask D-Bus about it
+        self._cards_tracker = CardsTracker(alsaaudio.cards)
+        self._check_output()
+        self._failover_timeout = get_resource_tracker().timeout_add(
+            FAILOVER_INTERVAL, self._check_output, seconds=True
+        )
+
+        self.export_volume()
+        export_levels_rate = get_config().get('export_levels_rate')
+        if export_levels_rate > 0:
+            self._level_subscribers[SHARED_LEVELS] = export_levels_rate
+            self._update_levels_loop()
+
+        super().__init__(*args, **kwargs)
+
+    @only_with_existing_output
+    def check_volume_integrity(self):
+        """If the internal volume is out of touch with the mixer, reset.
+
+        If the volume handling is broken, return None. Otherwise True.
+        """
+        expected_mixer_volume = to_mixer_volume(self.perceived_volume)
+        actual_mixer_volume = get_volume(alsaaudio.PCM_PLAYBACK)
+
+        if abs(expected_mixer_volume - actual_mixer_volume) > 0.01:
+            logger.debug(
+                'Resetting the internal volume '
+                '(%s) to the mixers actual value (%s)',
+                expected_mixer_volume,
+                actual_mixer_volume
+            )
+            self.perceived_volume = to_perceived_volume(actual_mixer_volume)
+        return True
+
+    @dbus.service.method(
+        'com.alsacontrol.Interface',
+        in_signature='d',
+        async_callbacks=('reply_handler', 'error_handler')
+    )
+    def change_volume(self, volume, reply_handler, error_handler):
+        """Change the volume and show it in a desktop notification.
+
+        Replies right away and applies the change in the next iteration
+        of the main loop. Changes that arrive until then are added up.
+
+        Parameters
+        ----------
+        volume : int
+            perceived volume change between -1 and +1
+        """
+        reply_handler()
+        logger.debug('Received volume change of %s', volume)
+        self._last_activity = time.monotonic()
+        self._pending_volume_change += volume
+        self._schedule(self._apply_volume_change)
+
+    def _apply_volume_change(self):
+        """Change the volume by what change_volume received."""
+        volume = self._pending_volume_change
+        self._pending_volume_change = 0
+
+        if not output_exists('change_volume', testcard=False):
+            self.error_notify('Mixer not found')
+            return
+
+        self.check_volume_integrity()
+
+        perceived_new = max(0, min(1, self.perceived_volume + volume))
+        mixer_new = to_mixer_volume(perceived_new)
+        self.perceived_volume = perceived_new
+        set_volume(mixer_new, alsaaudio.PCM_PLAYBACK)
+        muted = is_muted()
+        self._shared_levels.set_volume(perceived_new, muted)
+        self.notify(perceived_new, muted)
+
+    @dbus.service.method(
+        'com.alsacontrol.Interface',
+        in_signature='sd',
+        async_callbacks=('reply_handler', 'error_handler')
+    )
+    def change_app_volume(self, slot, volume, reply_handler, error_handler):
+        """Change the volume of an application slot and show it.
+
+        Replies right away, like change_volume.
+
+        Parameters
+        ----------
+        slot : string
+            One of the configured app_slots
+        volume : int
+            perceived volume change between -1 and +1
+        """
+        reply_handler()
+        logger.debug('Received volume change of %s for %s', volume, slot)
+        self._last_activity = time.monotonic()
+        self._pending_app_volume_changes[slot] = (
+            self._pending_app_volume_changes.get(slot, 0) + volume
+        )
+        self._schedule(self._apply_app_volume_changes)
+
+    def _apply_app_volume_changes(self):
+        """Change the volumes of slots by what change_app_volume received."""
+        changes = self._pending_app_volume_changes
+        self._pending_app_volume_changes = {}
+
+        for slot, volume in changes.items():
+            if slot not in get_app_slots():
+                self.error_notify(f'Unknown application "{slot}"')
+                continue
+
+            mixer_name = get_app_mixer(slot)
+            if mixer_name not in alsaaudio.mixers():
+                play_silence(get_app_pcm(slot))
+
+            perceived_old = get_mixer_volume(
+                mixer_name, alsaaudio.PCM_PLAYBACK, True
+            )
+            perceived_new = max(0, min(1, perceived_old + volume))
+            set_mixer_volume(
+                mixer_name, perceived_new, alsaaudio.PCM_PLAYBACK, True
+            )
+
+            self._notifications.show(
+                f'{slot} {int(perceived_new * 100)}%',
+                get_volume_icon(perceived_new, False),
+                int(perceived_new * 100),
+                short=True
+            )
+
+    @dbus.service.method(
+        'com.alsacontrol.Interface',
+        async_callbacks=('reply_handler', 'error_handler')
+    )
+    def toggle_muted(self, reply_handler, error_handler):
+        """Mute if unmuted, unmute if muted.
+
+        Replies right away, like change_volume.
+        """
+        reply_handler()
+        logger.debug('Received command to toggle mute')
+        self._last_activity = time.monotonic()
+        self._pending_mute_toggles += 1
+        self._schedule(self._apply_mute_toggles)
+
+    def _apply_mute_toggles(self):
+        """Toggle mute as often as toggle_muted was called."""
+        toggles = self._pending_mute_toggles
+        self._pending_mute_toggles = 0
+
+        if not output_exists('toggle_muted', testcard=False):
+            self.error_notify('Mixer not found')
+            return
+
+        if toggles % 2 == 1:
+            muted = toggle_mute(OUTPUT_MUTE)
+        else:
+            # toggled back and forth, still show that it happened
+            muted = is_muted()
+        self._shared_levels.set_volume(self.perceived_volume, bool(muted))
+        self.notify(self.perceived_volume, muted)
+
+    def _schedule(self, apply_function):
+        """Call the function once in the next iteration of the main loop.
+
+        Scheduling it again before it ran has no effect.
+        """
+        if apply_function.__name__ in self._scheduled:
+            return
+
+        def apply_once():
+            """Run the function and forget that it was scheduled."""
+            self._scheduled.remove(apply_function.__name__)
+            apply_function()
+            return GLib.SOURCE_REMOVE
+
+        self._scheduled.add(apply_function.__name__)
+        GLib.idle_add(apply_once)
+
+    @dbus.service.method(
+        'com.alsacontrol.Interface',
+        in_signature='d',
+        out_signature='d',
+        sender_keyword='sender'
+    )
+    def subscribe_levels(self, rate, sender=None):
+        """Start emitting LevelsChanged for this client.
+
+        Parameters
+        ----------
+        rate : float
+            Desired amount of LevelsChanged signals per second. All
+            subscribers share the fastest requested rate.
+
+        Returns the rate that will actually be used.
+        """
+        from alsacontrol.levels import clamp_rate
+        rate = clamp_rate(rate)
+        logger.debug('%s subscribed to levels with %sHz', sender, rate)
+        self._last_activity = time.monotonic()
+
+        if sender not in self._level_watches and \
+                not sender.startswith(SENDER_PREFIX):
+            def owner_changed(owner):
+                """Forget clients that disconnect without unsubscribing."""
+                if owner == '':
+                    self.unsubscribe_levels(sender)
+
+            self._level_watches[sender] = self.connection.watch_name_owner(
+                sender, owner_changed
+            )
+
+        self._level_subscribers[sender] = rate
+        self._update_levels_loop()
+        return self._levels_rate
+
+    @dbus.service.method(
+        'com.alsacontrol.Interface',
+        sender_keyword='sender'
+    )
+    def unsubscribe_levels(self, sender=None):
+        """Stop emitting LevelsChanged for this client."""
+        if sender not in self._level_subscribers:
+            return
+
+        logger.debug('%s unsubscribed from levels', sender)
+        del self._level_subscribers[sender]
+        watch = self._level_watches.pop(sender, None)
+        if watch is not None:
+            watch.cancel()
+        self._update_levels_loop()
+
+    @dbus.service.signal(
+        'com.alsacontrol.Interface',
+        signature='a{sd}'
+    )
+    def LevelsChanged(self, levels):
+        """Peak of each card between 0 and 1 since the previous signal."""
+        # the signal is emitted by the decorator
+
+    @dbus.service.signal(
+        'com.alsacontrol.Interface',
+        signature='ssb'
+    )
+    def InputProblemChanged(self, card, problem, active):
+        """An input started or stopped clipping, being silent, etc.
+
+        problem is one of 'clipping', 'silence' or 'dc-offset'. Only
+        emitted while someone is subscribed to levels.
+        """
+        # the signal is emitted by the decorator
+
+    @dbus.service.method(
+        'com.alsacontrol.Interface',
+        out_signature='a{sas}'
+    )
+    def get_input_problems(self):
+        """Get the currently flagged problems of each monitored input."""
+        if self._levels_monitor is None:
+            return {}
+
+        return {
+            card: sorted(meter.analysis.problems)
+            for card, meter in self._levels_monitor.meters.items()
+        }
+
+    def _update_levels_loop(self):
+        """Start, stop or change the rate of the metering loop."""
+        if len(self._level_subscribers) == 0:
+            rate = None
+        else:
+            rate = max(self._level_subscribers.values())
+
+        if rate == self._levels_rate:
+            return
+
+        tracker = get_resource_tracker()
+        if self._levels_timeout is not None:
+            tracker.source_remove(self._levels_timeout)
+            self._levels_timeout = None
+
+        self._levels_rate = rate
+
+        if rate is None:
+            logger.debug('Stopping to monitor levels')
+            tracker.source_remove(self._levels_cards_timeout)
+            self._levels_cards_timeout = None
+            self._levels_cards_tracker = CardsTracker()
+            self._levels_monitor.close()
+            return
+
+        logger.debug('Monitoring levels with %sHz', rate)
+        if self._levels_monitor is None:
+            from alsacontrol.levels import LevelsMonitor
+            self._levels_monitor = LevelsMonitor()
+        if self._levels_cards_timeout is None:
+            self._refresh_levels_cards()
+            self._levels_cards_timeout = tracker.timeout_add(
+                1000, self._refresh_levels_cards
+            )
+        self._levels_timeout = tracker.timeout_add(
+            int(1000 / rate), self._emit_levels
+        )
+
+    def _refresh_levels_cards(self):
+        """Meter newly added cards and stop metering removed ones."""
+        tracker = self._levels_cards_tracker
+        changes = tracker.update()
+        if len(changes.added) + len(changes.removed) > 0:
+            # meters of the other cards keep running
+            get_capability_index().invalidate(changes.added)
+            self._levels_monitor.update_cards(tracker.cards)
+        if SHARED_LEVELS in self._level_subscribers:
+            # the gui might have changed it in the meantime
+            self.export_volume()
+        return True
+
+    def _emit_levels(self):
+        """Read all cards once and send the batch to the subscribers."""
+        levels = self._levels_monitor.read_levels()
+
+        for card, problem, active in self._levels_monitor.pop_changes():
+            logger.info(
+                '%s %s on "%s"',
+                'Detected' if active else 'No more',
+                problem,
+                card
+            )
+            self.InputProblemChanged(card, problem, active)
+
+        if len(levels) == 0:
+            return True
+
+        if SHARED_LEVELS in self._level_subscribers:
+            self._shared_levels.set_levels(levels)
+
+        peaks = {
+            card: peak
+            for card, (peak, _) in levels.items()
+        }
+
+        if any(
+                subscriber != SHARED_LEVELS and
+                not subscriber.startswith(SENDER_PREFIX)
+                for subscriber in self._level_subscribers
+        ):
+            self.LevelsChanged(peaks)
+
+        if self._remote is not None and self._remote.has_level_subscribers():
+            self._remote.push({'event': 'levels', 'levels': peaks}, True)
+
+        return True
+
+    def _check_output(self):
+        """Fail over to another output card if needed, see failover.
+
+        Only does something when cards were added or removed. The cards
+        are only listed if failover or additional outputs are configured.
+        """
+        if not self._watches_cards():
+            return True
+
+        changes = self._cards_tracker.update()
+        if len(changes.added) + len(changes.removed) == 0:
+            return True
+
+        card = apply_failover(self._cards_tracker.cards)
+        if card is not None:
+            self.export_volume()
+            self._notifications.show(card, 'audio-card', short=True)
+            self._push_output(card)
+        elif self._changes_extra_outputs(changes):
+            # missing additional outputs are left out of the asoundrc
+            setup_asoundrc()
+
+        return True
+
+    def _watches_cards(self):
+        """Check if added or removed cards need to be noticed."""
+        return any(
+            get_config().get(key) != ''
+            for key in ['output_fallbacks', 'output_preferred',
+                        'pcm_output_extra']
+        )
+
+    def _changes_extra_outputs(self, changes):
+        """Check if any card of pcm_output_extra was added or removed."""
+        extra_cards = {
+            get_card(pcm_output)
+            for pcm_output in get_config().get('pcm_output_extra').split()
+        }
+        return len(extra_cards & (changes.added | changes.removed)) > 0
+
+    def _push_output(self, card):
+        """Tell remote clients about the new output and its volume."""
+        if self._remote is None:
+            return
+
+        state = self.remote_get_state(None)
+        self._remote.push({
+            'event': 'output',
+            'output': card,
+            'volume': state['volume'],
+            'muted': state['muted']
+        })
+
+    def remote_get_state(self, sender):
+        """Volume, mute state, output and cards for remote clients."""
+        if output_exists('remote_get_state', testcard=False):
+            self.check_volume_integrity()
+            muted = bool(is_muted())
+        else:
+            muted = False
+        return {
+            'volume': self.perceived_volume,
+            'muted': muted,
+            'output': get_card(get_config().get('pcm_output')),
+            'cards': sorted(get_cards())
+        }
+
+    def remote_change_volume(self, sender, volume):
+        """Like change_volume, for alsacontrol.remote."""
+        if isinstance(volume, bool) or not isinstance(volume, (int, float)):
+            raise ValueError('Expected a number')
+        logger.debug('%s changes the volume', sender)
+        self.change_volume(max(-1, min(1, volume)), lambda: None, None)
+
+    def remote_toggle_muted(self, sender):
+        """Like toggle_muted, for alsacontrol.remote."""
+        logger.debug('%s toggles mute', sender)
+        self.toggle_muted(lambda: None, None)
+
+    def remote_select_output(self, sender, card):
+        """Switch the output card and apply its profile."""
+        if card not in get_cards():
+            raise ValueError(f'Unknown card "{card}"')
+        logger.debug('%s selects the output %s', sender, card)
+        self._last_activity = time.monotonic()
+        switch_output(card)
+        self.export_volume()
+        self._push_output(card)
+
+    def remote_subscribe_levels(self, sender, rate):
+        """Like subscribe_levels, levels are pushed by the server."""
+        if isinstance(rate, bool) or not isinstance(rate, (int, float)):
+            raise ValueError('Expected a number')
+        return self.subscribe_levels(rate, sender)
+
+    def remote_unsubscribe_levels(self, sender):
+        """Like unsubscribe_levels, also called on disconnects."""
+        self.unsubscribe_levels(sender)
+
+    def export_volume(self):
+        """Write the current volume into the shared memory for widgets."""
+        if output_exists('export_volume', testcard=False):
+            self.check_volume_integrity()
+            muted = is_muted()
+        else:
+            muted = False
+        self._shared_levels.set_volume(self.perceived_volume, muted)
+
+    def notify(self, volume, muted):
+        """Display a pretty notification for volume and mute state."""
+        # various icons to visualize the volume
+        icon = get_volume_icon(volume, muted)
+
+        volume_string = f'{int(volume * 100)}%'
+
+        self._notifications.show(
+            volume_string,
+            icon,
+            int(volume * 100),
+            short=True
+        )
+
+        if self._remote is not None:
+            self._remote.push({
+                'event': 'volume',
+                'volume': volume,
+                'muted': bool(muted)
+            })
+
+        muted = 'muted' if muted else 'unmuted'
+        logger.info('Changing the volume to %s, %s', volume_string, muted)
+
+    def _check_idle(self, idle_timeout):
+        """Quit if nobody needed the daemon for idle_timeout seconds.
+
+        D-Bus starts it again on the next call.
+        """
+        subscribers = set(self._level_subscribers) - {SHARED_LEVELS}
+        if len(subscribers) > 0:
+            # levels are streamed, that is not being idle. Exporting
+            # them to shared memory doesn't count, it never stops
+            self._last_activity = time.monotonic()
+            return True
+
+        if time.monotonic() - self._last_activity < idle_timeout:
+            return True
+
+        logger.info('Quitting after %ss of inactivity', idle_timeout)
+        # the source is removed by returning False
+        self._idle_timeout = None
+        self.quit()
+        return False
+
+    def quit(self):
+        """Save the state and stop the main loop."""
+        save_state({'perceived_volume': self.perceived_volume})
+        get_resource_tracker().source_remove(self._failover_timeout)
+        if self._idle_timeout is not None:
+            get_resource_tracker().source_remove(self._idle_timeout)
+            self._idle_timeout = None
+        self._level_subscribers.clear()
+        self._update_levels_loop()
+        self._shared_levels.close()
+        if self._remote is not None:
+            self._remote.stop()
+        self._quit_callback()
+
+    def error_notify(self, error):
+        """Display a notification containing an error text."""
+        self._notifications.show(error, 'gnome-mixer', short=True)
+
+
+def run_daemon(notifications):
+    """Publish the volume service and run until the daemon is stopped.
+
+    Parameters
+    ----------
+    notifications : string
+        Notification backend, see alsacontrol.notifications
+    """
+    set_bus(DBusGMainLoop())
+
+    if is_xfce4_pulse_plugin_running():
+        logger.error('The xfce4 libpulseaudio-plugin is running')
+
+    if is_pulse_running():
+        logger.fatal('Pulseaudio is running')
+
+    if is_daemon_running():
+        logger.fatal('The daemon is already running')
+        raise SystemExit(1)
+
+    log_info()
+
+    # log some errors if the selected card doesn't exist
+    get_current_card('pcm_output')
+
+    # make sure alsacontrols asoundrc is included so that the mixer exists
+    setup_asoundrc()
+
+    if get_config().get('input_calibrated_volume') > 0:
+        # only load numpy if needed
+        from alsacontrol.calibration import apply_calibration
+        apply_calibration()
+
+    mainloop = GLib.MainLoop()
+
+    session_bus = dbus.SessionBus(mainloop=DBusGMainLoop())
+    name = dbus.service.BusName('com.alsacontrol.Volume', session_bus)
+    daemon = Daemon(
+        get_notifications(notifications),
+        mainloop.quit,
+        session_bus,
+        '/'
+    )
+
+    def on_signal():
+        """Keep the state when being stopped, for example by systemd."""
+        daemon.quit()
+        return GLib.SOURCE_REMOVE
+
+    for signal_number in [signal.SIGTERM, signal.SIGINT]:
+        GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signal_number, on_signal)
+
+    if debug_log_on():
+        tracker = get_resource_tracker()
+        tracker.timeout_add(REPORT_INTERVAL, tracker.report, seconds=True)
+
+    mainloop.run()
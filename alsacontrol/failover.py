@@ -0,0 +1,92 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Switch to another output when the selected card is removed.
+
+The cards of output_fallbacks are used in their order. Once the card
+that was selected before comes back, it is selected again.
+"""
+
+
+from alsacontrol.cards import get_card
+from alsacontrol.config import get_config
+from alsacontrol.profiles import switch_output
+from alsacontrol.logger import logger
+
+
+def get_fallback_cards():
+    """Get the configured fallback cards in the order of priority."""
+    return str(get_config().get('output_fallbacks')).split()
+
+
+def get_failover_target(cards):
+    """Get the card that should be selected instead, None to keep it.
+
+    Parameters
+    ----------
+    cards : set
+        All cards that currently exist
+    """
+    current = get_card(get_config().get('pcm_output'))
+    preferred = get_config().get('output_preferred')
+
+    if preferred != '' and preferred in cards:
+        if preferred == current:
+            return None
+        return preferred
+
+    # jack is not a card that can be removed
+    if current in (None, 'jack') or current in cards:
+        return None
+
+    for card in get_fallback_cards():
+        if card in cards and card != current:
+            return card
+
+    return None
+
+
+def apply_failover(cards):
+    """Switch the output if the selected card doesn't exist anymore.
+
+    Only reads the config as long as nothing needs to be done. Returns
+    the newly selected card or None if nothing changed.
+
+    Parameters
+    ----------
+    cards : set
+        All cards that currently exist
+    """
+    target = get_failover_target(cards)
+    if target is None:
+        return None
+
+    current = get_card(get_config().get('pcm_output'))
+    preferred = get_config().get('output_preferred')
+    if target == preferred:
+        logger.info('"%s" is back, switching to it again', target)
+        switch_output(target)
+    else:
+        logger.info('"%s" is missing, switching to "%s"', current, target)
+        # remember where to go back to, even after multiple failovers
+        switch_output(target, preferred=preferred or current)
+
+    return target
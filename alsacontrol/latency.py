@@ -0,0 +1,152 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Buffer and period settings for dmix and dsnoop."""
+
+
+import alsaaudio
+
+from alsacontrol.alsa import open_pcm
+from alsacontrol.cards import get_card
+from alsacontrol.config import get_config
+from alsacontrol.logger import logger
+from alsacontrol.capabilities import get_capability_index
+
+
+# sizes are in frames. 'default' leaves everything up to ALSA.
+PROFILES = {
+    'default': {},
+    'low-latency': {
+        'rate': 48000,
+        'format': 'S16_LE',
+        'period_size': 128,
+        'buffer_size': 512
+    },
+    'balanced': {
+        'rate': 48000,
+        'format': 'S16_LE',
+        'period_size': 512,
+        'buffer_size': 2048
+    },
+    'power-saving': {
+        'rate': 48000,
+        'format': 'S16_LE',
+        'period_size': 4096,
+        'buffer_size': 16384
+    }
+}
+
+
+def get_profile():
+    """Get the configured latency profile."""
+    name = get_config().get('latency_profile')
+    if name not in PROFILES:
+        logger.error('Unknown latency profile "%s"', name)
+        return PROFILES['default']
+    return PROFILES[name]
+
+
+def get_format(name):
+    """Get the alsaaudio constant of a format like "S16_LE", or None."""
+    return getattr(alsaaudio, f'PCM_FORMAT_{name}', None)
+
+
+def probe_profile(pcm_name, pcm_type, profile):
+    """Adjust the profile to what the hardware supports.
+
+    The device is opened with the rate, format, period size and amount
+    of periods of the profile. ALSA picks the closest values that the
+    hardware can do, which are then used instead.
+
+    The result is stored in the capability index, because devices that
+    are in use, for example by the currently generated dmix, can't be
+    probed again. If they were never probed, the profile is used
+    unchanged.
+
+    Parameters
+    ----------
+    pcm_name : string
+        hardware pcm like "hw:CARD=Generic"
+    pcm_type : int
+        alsaaudio.PCM_PLAYBACK or alsaaudio.PCM_CAPTURE
+    profile : dict
+        one of PROFILES
+    """
+    if len(profile) == 0:
+        return profile
+
+    card = get_card(pcm_name)
+    key = ' '.join(
+        [pcm_name, str(pcm_type)] +
+        [f'{name}={value}' for name, value in sorted(profile.items())]
+    )
+    if card is not None:
+        probed = get_capability_index().get_latency(card, key)
+        if probed is not None:
+            return probed
+
+    probed = dict(profile)
+    pcm_format = get_format(profile['format'])
+    if pcm_format is None:
+        logger.error('Unknown format "%s"', profile['format'])
+        probed['format'] = 'S16_LE'
+        pcm_format = get_format('S16_LE')
+
+    if not hasattr(alsaaudio.PCM, 'info'):
+        # periods and info need pyalsaaudio 0.10
+        logger.debug('Could not probe "%s", pyalsaaudio is too old', pcm_name)
+        return profile
+
+    try:
+        with open_pcm(
+                type=pcm_type,
+                device=pcm_name,
+                mode=alsaaudio.PCM_NONBLOCK,
+                rate=profile['rate'],
+                format=pcm_format,
+                periodsize=profile['period_size'],
+                periods=profile['buffer_size'] // profile['period_size']
+        ) as pcm:
+            # what the hardware actually uses
+            info = pcm.info()
+    except alsaaudio.ALSAAudioError as error:
+        logger.debug('Could not probe "%s": %s', pcm_name, error)
+        return profile
+
+    probed['rate'] = info.get('rate', profile['rate'])
+    probed['period_size'] = info.get('period_size', profile['period_size'])
+    probed['buffer_size'] = info.get('buffer_size', profile['buffer_size'])
+
+    if probed != profile:
+        logger.info('Adjusted the latency profile to %s', probed)
+
+    if card is not None:
+        get_capability_index().set_latency(card, key, probed)
+    return probed
+
+
+def get_tuning(pcm_name, pcm_type):
+    """Get the lines to add to a dmix or dsnoop slave definition."""
+    profile = probe_profile(pcm_name, pcm_type, get_profile())
+    return ''.join([
+        f'\n        {key} {value}'
+        for key, value in profile.items()
+    ])
@@ -0,0 +1,202 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Measure the input level of cards, independent of toolkit."""
+
+
+import numpy as np
+
+import alsaaudio
+
+from alsacontrol.logger import logger
+from alsacontrol.resources import get_resource_tracker
+from alsacontrol.capabilities import get_capability_index
+from alsacontrol.analysis import InputAnalysis
+
+
+# how many periods to read at most in one go, so that a device that
+# produces data faster than it is read doesn't block forever
+MAX_PERIODS = 16
+
+# slowest and fastest rate in Hz in which levels can be subscribed to
+MIN_RATE = 1
+MAX_RATE = 60
+
+
+def get_capture_device(card):
+    """Get the pcm name that is used to monitor the level of a card."""
+    if card == 'jack':
+        return 'alsacontrol-jack-input'
+    return f'sysdefault:CARD={card}'
+
+
+def get_peak(samples):
+    """Get the peak of int16 samples between 0 and 1."""
+    # int32 so that abs(-32768) doesn't overflow
+    return np.max(np.abs(samples.astype(np.int32))) / (2 ** 15)
+
+
+def get_rms(samples):
+    """Get the root mean square of int16 samples between 0 and 1."""
+    samples = samples.astype(np.float32)
+    return np.sqrt(np.mean(samples * samples)) / (2 ** 15)
+
+
+def clamp_rate(rate):
+    """Limit a requested level rate to something that makes sense."""
+    return max(MIN_RATE, min(MAX_RATE, rate))
+
+
+class LevelMeter:
+    """Keeps the capture pcm of a single card open to read its level."""
+    def __init__(self, card):
+        """Create the meter without opening the pcm yet."""
+        self.card = card
+        self.pcm = None
+        self.valid = True
+        self.analysis = InputAnalysis()
+        self.changes = []
+
+    def open(self):
+        """Open the capture pcm. Return False if that is not possible."""
+        if self.pcm is not None:
+            return True
+
+        if not get_capability_index().can_capture(self.card):
+            self.valid = False
+            return False
+
+        device = get_capture_device(self.card)
+        try:
+            self.pcm = alsaaudio.PCM(
+                type=alsaaudio.PCM_CAPTURE,
+                device=device,
+                # don't freeze when the device disappears
+                mode=alsaaudio.PCM_NONBLOCK
+            )
+        except alsaaudio.ALSAAudioError:
+            logger.error('Could not monitor the level of "%s"', device)
+            self.valid = False
+            return False
+
+        get_resource_tracker().opened('pcm', device)
+        self.valid = True
+        return True
+
+    def close(self):
+        """Close the capture pcm so that the device can go idle."""
+        if self.pcm is None:
+            return
+        self.pcm.close()
+        self.pcm = None
+        get_resource_tracker().closed(
+            'pcm', get_capture_device(self.card)
+        )
+
+    def read(self):
+        """Read all samples that arrived since the last call.
+
+        Returns an int16 array or None if nothing new is available.
+        Closes the pcm and marks the meter as invalid when reading fails.
+        The samples are fed into the analysis, whose changes can be
+        taken from self.changes afterwards.
+        """
+        self.changes = []
+        if self.pcm is None:
+            return None
+
+        chunks = []
+        try:
+            for _ in range(MAX_PERIODS):
+                length, data = self.pcm.read()
+                if length <= 0:
+                    break
+                chunks.append(data)
+        except alsaaudio.ALSAAudioError:
+            logger.error('Could not monitor the level of "%s"', self.card)
+            self.close()
+            self.valid = False
+            return None
+
+        if len(chunks) == 0:
+            return None
+
+        samples = np.frombuffer(b''.join(chunks), dtype=np.int16)
+        self.changes = self.analysis.analyze(samples)
+        return samples
+
+
+class LevelsMonitor:
+    """Meters the level of multiple cards, so that it can be shared."""
+    def __init__(self):
+        """Create the monitor without opening anything yet."""
+        self.meters = {}
+        # list of (card, problem, active) since the last pop_changes
+        self.changes = []
+
+    def update_cards(self, cards):
+        """Open meters for new cards and close those of removed ones."""
+        for card in list(self.meters):
+            if card not in cards:
+                self.meters.pop(card).close()
+
+        for card in cards:
+            if card not in self.meters:
+                meter = LevelMeter(card)
+                meter.open()
+                self.meters[card] = meter
+
+    def read_levels(self):
+        """Get the peak and rms of each card since the last call.
+
+        Returns a dict of card: (peak, rms), both between 0 and 1. Cards
+        that can't be monitored or that didn't produce new data are left
+        out.
+        """
+        levels = {}
+        for card, meter in self.meters.items():
+            samples = meter.read()
+            self.changes += [
+                (card, problem, active)
+                for problem, active in meter.changes
+            ]
+            if samples is not None:
+                levels[card] = (
+                    float(get_peak(samples)),
+                    float(get_rms(samples))
+                )
+        return levels
+
+    def pop_changes(self):
+        """Get and forget problems that were flagged or cleared.
+
+        Returns a list of (card, problem, active), see
+        alsacontrol.analysis.
+        """
+        changes = self.changes
+        self.changes = []
+        return changes
+
+    def close(self):
+        """Close all pcms."""
+        for meter in self.meters.values():
+            meter.close()
+        self.meters = {}
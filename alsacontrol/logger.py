@@ -19,48 +19,163 @@
 # along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
 
 
-"""Logging setup for ALSA-Control."""
+"""Logging setup for ALSA-Control.
+
+Records are put into a queue and written by a separate thread, so that
+logging doesn't slow down handling key presses, even with a log file.
+"""
 
 
 import os
+import copy
+import json
+import time
+import queue
+import atexit
 import logging
+from logging.handlers import QueueHandler, QueueListener, \
+    RotatingFileHandler
 import pkg_resources
 
 
+# the log file is rotated when it becomes larger than that, in bytes
+MAX_LOG_SIZE = 1024 * 1024
+LOG_BACKUPS = 3
+
+# seconds in which repeated warnings and errors are only logged once
+REPEAT_INTERVAL = 10
+
+# see https://en.wikipedia.org/wiki/ANSI_escape_code#3/4_bit
+# for those numbers
+COLORS = {
+    logging.WARNING: 33,
+    logging.ERROR: 31,
+    logging.FATAL: 31,
+    logging.DEBUG: 36,
+    logging.INFO: 32,
+}
+
+
+def _get_format(levelno, debug):
+    """Get the format string for records of that level."""
+    if levelno == logging.INFO and not debug:
+        # if not launched with --debug, then don't print "INFO:"
+        return '%(message)s'
+
+    color = COLORS.get(levelno, 0)
+    if debug:
+        return (
+            f'\033[{color}m%(levelname)s\033[0m: '
+            '%(filename)s, line %(lineno)d, %(message)s'
+        )
+    return f'\033[{color}m%(levelname)s\033[0m: %(message)s'
+
+
 class Formatter(logging.Formatter):
     """Overwritten Formatter to print nicer logs."""
+    def __init__(self):
+        """Prepare a formatter for each level and verbosity."""
+        super().__init__()
+        self._formatters = {
+            (levelno, debug): logging.Formatter(_get_format(levelno, debug))
+            for levelno in COLORS
+            for debug in [True, False]
+        }
+
     def format(self, record):
         debug = logger.level == logging.DEBUG
-        if record.levelno == logging.INFO and not debug:
-            # if not launched with --debug, then don't print "INFO:"
-            self._style._fmt = '%(message)s'  # noqa
-        else:
-            # see https://en.wikipedia.org/wiki/ANSI_escape_code#3/4_bit
-            # for those numbers
-            color = {
-                logging.WARNING: 33,
-                logging.ERROR: 31,
-                logging.FATAL: 31,
-                logging.DEBUG: 36,
-                logging.INFO: 32,
-            }.get(record.levelno, 0)
-            if debug:
-                self._style._fmt = (  # noqa
-                    f'\033[{color}m%(levelname)s\033[0m: '
-                    '%(filename)s, line %(lineno)d, %(message)s'
-                )
-            else:
-                self._style._fmt = (  # noqa
-                    f'\033[{color}m%(levelname)s\033[0m: %(message)s'
-                )
-        return super().format(record)
+        key = (record.levelno, debug)
+        formatter = self._formatters.get(key)
+        if formatter is None:
+            # custom levels
+            formatter = logging.Formatter(_get_format(*key))
+            self._formatters[key] = formatter
+        return formatter.format(record)
+
+
+class RepeatFilter(logging.Filter):
+    """Drops warnings and errors that were just logged with the same text.
+
+    Otherwise a removed card would log the same errors on every key
+    press. The first one after REPEAT_INTERVAL says how many were dropped.
+    """
+    def __init__(self):
+        """Start without having seen any message."""
+        super().__init__()
+        # maps messages to (when it was logged, how often it was dropped)
+        self._recent = {}
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING:
+            return True
+
+        message = record.getMessage()
+        now = time.monotonic()
+        logged, dropped = self._recent.get(message, (None, 0))
+        if logged is not None and now - logged < REPEAT_INTERVAL:
+            self._recent[message] = (logged, dropped + 1)
+            return False
+
+        if len(self._recent) > 100:
+            # forget messages that wouldn't be dropped anymore anyway
+            self._recent = {
+                recent: value for recent, value in self._recent.items()
+                if now - value[0] < REPEAT_INTERVAL
+            }
+
+        self._recent[message] = (now, 0)
+        if dropped > 0:
+            record.msg = f'{message} (repeated {dropped} times)'
+            record.args = None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Writes each record as a line of json, to be read by tools."""
+    def format(self, record):
+        entry = {
+            'time': record.created,
+            'level': record.levelname,
+            'file': record.filename,
+            'line': record.lineno,
+            'message': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+class RecordQueueHandler(QueueHandler):
+    """Puts records into the queue with their exception info.
+
+    QueueHandler merges the traceback into the message and removes
+    exc_info, so JsonFormatter couldn't write it into its own field.
+    """
+    def prepare(self, record):
+        # the arguments might be modified until the listener formats it
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
 
 
 logger = logging.getLogger()
 handler = logging.StreamHandler()
 handler.setFormatter(Formatter())
-logger.addHandler(handler)
 logger.setLevel(logging.INFO)
+logger.addFilter(RepeatFilter())
+
+# the actual handlers run in the thread of the listener
+_queue = queue.SimpleQueue()
+_listener = QueueListener(_queue, handler)
+logger.addHandler(RecordQueueHandler(_queue))
+_listener.start()
+
+
+@atexit.register
+def _stop_listener():
+    """Write what is left in the queue before exiting."""
+    _listener.stop()
 
 
 def log_info():
@@ -83,8 +198,18 @@ def debug_log_on():
     return logger.level == logging.DEBUG
 
 
-def add_filehandler():
-    """Clear the existing logfile and start logging to it."""
+def add_filehandler(json_lines=False):
+    """Start logging to ~/.log/alsacontrol/log as well.
+
+    Old logs are kept, the file is rotated when it gets too large.
+
+    Parameters
+    ----------
+    json_lines : bool
+        If True, write one json object per line instead of text.
+    """
+    global _listener
+
     # jack also logs to ~/.log
     log_path = os.path.expanduser('~/.log/alsacontrol')
     log_file = os.path.join(log_path, 'log')
@@ -92,10 +217,17 @@ def add_filehandler():
     if not os.path.exists(log_path):
         os.makedirs(log_path)
 
-    if os.path.exists(log_file):
-        # keep the log path small, start from scratch each time
-        os.remove(log_file)
+    file_handler = RotatingFileHandler(
+        log_file,
+        maxBytes=MAX_LOG_SIZE,
+        backupCount=LOG_BACKUPS
+    )
+    if json_lines:
+        file_handler.setFormatter(JsonFormatter())
+    else:
+        file_handler.setFormatter(Formatter())
 
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setFormatter(Formatter())
-    logger.addHandler(file_handler)
+    # restart the listener, because it doesn't expect new handlers
+    _listener.stop()
+    _listener = QueueListener(_queue, *_listener.handlers, file_handler)
+    _listener.start()
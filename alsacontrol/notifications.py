@@ -0,0 +1,165 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Ways for the daemon to show volume changes.
+
+None of them need GTK, so that the daemon can run on machines without a
+desktop. Plugins are only imported when they are used.
+"""
+
+
+import importlib
+
+import dbus
+
+from alsacontrol.dbus import get_bus
+from alsacontrol.logger import logger
+
+
+class Notifications:
+    """Doesn't show anything. Base class for backends."""
+    def show(self, text, icon, value=None, short=False):
+        """Show a notification that replaces the previous one.
+
+        Parameters
+        ----------
+        text : string
+        icon : string
+            Name of an icon from the icon theme
+        value : int or None
+            Between 0 and 100. Shows a progress bar instead of text if
+            the backend supports it. Useful for volume.
+        short : bool
+            If True, the notification will go away faster.
+        """
+        logger.debug('Notification: %s', text)
+
+
+class DesktopNotifications(Notifications):
+    """Shows notifications over the org.freedesktop.Notifications bus.
+
+    Calls are asynchronous, so a slow notification server can't stall the
+    daemon. While one call is in progress only the latest notification is
+    kept and sent after it was answered, which also makes sure that each
+    one replaces the previous one instead of stacking them.
+    """
+    def __init__(self):
+        """Connect to the notification server once it is needed."""
+        self._interface = None
+        self._notification_id = 0
+        self._in_progress = False
+        self._pending = None
+
+    def _get_interface(self):
+        """Get the interface of the notification server."""
+        if self._interface is None:
+            # no introspection, which would block until the server is up
+            remote_object = get_bus().get_object(
+                'org.freedesktop.Notifications',
+                '/org/freedesktop/Notifications',
+                introspect=False
+            )
+            self._interface = dbus.Interface(
+                remote_object,
+                'org.freedesktop.Notifications'
+            )
+        return self._interface
+
+    def show(self, text, icon, value=None, short=False):
+        """Show a notification that replaces the previous one."""
+        self._pending = (text, icon, value, short)
+        if not self._in_progress:
+            self._send()
+
+    def _send(self):
+        """Send the pending notification, if there is one."""
+        if self._pending is None:
+            return
+
+        text, icon, value, short = self._pending
+        self._pending = None
+
+        hints = {}
+        if value is not None:
+            # shows a progress bar in many notification servers
+            hints['value'] = dbus.Int32(value)
+
+        self._in_progress = True
+        self._get_interface().Notify(
+            'ALSA-Control',
+            dbus.UInt32(self._notification_id),
+            icon,
+            '',
+            text,
+            dbus.Array([], signature='s'),
+            dbus.Dictionary(hints, signature='sv'),
+            dbus.Int32(200 if short else -1),
+            reply_handler=self._on_reply,
+            error_handler=self._on_error
+        )
+
+    def _on_reply(self, notification_id):
+        """Remember the id to replace it and send the next one."""
+        self._notification_id = int(notification_id)
+        self._in_progress = False
+        self._send()
+
+    def _on_error(self, error):
+        """Log the error and send the next one."""
+        logger.error('Could not show the notification: %s', error)
+        self._in_progress = False
+        self._send()
+
+
+BACKENDS = {
+    'none': Notifications,
+    'desktop': DesktopNotifications
+}
+
+
+def get_notifications(backend):
+    """Create the notification backend.
+
+    Falls back to not showing notifications if the backend can't be
+    loaded.
+
+    Parameters
+    ----------
+    backend : string
+        One of BACKENDS or the path of a plugin class, for example
+        'mypackage.notifications.SpeechNotifications'. Plugins should
+        inherit from Notifications.
+    """
+    try:
+        if backend in BACKENDS:
+            notifications_class = BACKENDS[backend]
+        else:
+            module_name, class_name = backend.rsplit('.', 1)
+            module = importlib.import_module(module_name)
+            notifications_class = getattr(module, class_name)
+        return notifications_class()
+    except (ImportError, AttributeError, ValueError) as error:
+        logger.error(
+            'Could not load the notification backend "%s": %s',
+            backend,
+            error
+        )
+        return Notifications()
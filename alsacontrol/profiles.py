@@ -0,0 +1,176 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Remember the settings of each output card to switch between them.
+
+For example headphones might use a different volume and no dmix while
+speakers use four channels. Selecting a card applies all of its settings
+at once.
+"""
+
+
+import os
+import json
+
+import alsaaudio
+
+from alsacontrol.asoundrc import setup_asoundrc
+from alsacontrol.alsa import get_volume, set_volume, is_muted, set_mute, \
+    OUTPUT_MUTE
+from alsacontrol.cards import get_card, get_output_pcm_name, \
+    only_with_existing_output, output_exists
+from alsacontrol.config import get_config
+from alsacontrol.logger import logger
+
+
+PROFILES_PATH = '~/.config/alsacontrol/profiles.json'
+
+# settings that belong to the output card instead of being global
+PROFILE_SETTINGS = [
+    'output_plugin',
+    'output_channels',
+    'output_use_dmix',
+    'output_use_softvol'
+]
+
+
+class ProfileStore:
+    """The profiles of all cards that were used before, by card name."""
+    def __init__(self, path=PROFILES_PATH):
+        """Load the profiles from the disk."""
+        self._path = os.path.expanduser(path)
+        self._profiles = {}
+        if os.path.exists(self._path):
+            try:
+                with open(self._path, 'r') as profiles_file:
+                    self._profiles = json.load(profiles_file)
+            except ValueError:
+                logger.error('Could not read the profiles %s', self._path)
+
+    def get(self, card):
+        """Get the profile of a card or None if there is none.
+
+        A profile is a dict with the PROFILE_SETTINGS and optionally
+        'volume' and 'muted'.
+        """
+        return self._profiles.get(card)
+
+    def put(self, card, profile):
+        """Store the profile of a card and write all profiles to the disk."""
+        if self._profiles.get(card) == profile:
+            return
+        self._profiles[card] = profile
+        self.save()
+
+    def save(self):
+        """Write the profiles to the disk."""
+        if not os.path.exists(os.path.dirname(self._path)):
+            os.makedirs(os.path.dirname(self._path))
+        # replace it at once, so it can't be read half written
+        temporary_path = f'{self._path}.tmp'
+        with open(temporary_path, 'w') as profiles_file:
+            json.dump(self._profiles, profiles_file, indent=4)
+        os.replace(temporary_path, self._path)
+
+
+def get_current_profile():
+    """Get the profile of how the output is currently configured."""
+    profile = {key: get_config().get(key) for key in PROFILE_SETTINGS}
+    profile.update(_get_mixer_state() or {})
+    return profile
+
+
+@only_with_existing_output
+def _get_mixer_state():
+    """Get the volume and mute state of the output."""
+    return {
+        'volume': get_volume(alsaaudio.PCM_PLAYBACK, nonlinear=True),
+        'muted': is_muted(OUTPUT_MUTE)
+    }
+
+
+@only_with_existing_output
+def _set_mixer_state(profile):
+    """Set the volume and mute state of the output."""
+    if 'volume' in profile:
+        set_volume(profile['volume'], alsaaudio.PCM_PLAYBACK, nonlinear=True)
+    if 'muted' in profile:
+        set_mute(OUTPUT_MUTE, profile['muted'])
+
+
+def remember_output_profile():
+    """Store the current settings as the profile of the current card."""
+    card = get_card(get_config().get('pcm_output'))
+    if card is None:
+        return
+    store = get_profile_store()
+    # the volume is unknown if the card was removed, keep the old one
+    profile = {**(store.get(card) or {}), **get_current_profile()}
+    store.put(card, profile)
+
+
+def switch_output(card, preferred=None):
+    """Select the output card and apply its profile.
+
+    The profile of the previous card is remembered first. The settings
+    are written to the config at once and the asoundrc is created once.
+    Cards without a profile keep the current settings.
+
+    Parameters
+    ----------
+    card : string
+        "Generic", "jack", ...
+    preferred : string or None
+        The card to switch back to once it exists again, see
+        alsacontrol.failover. None when the user selected the card.
+    """
+    remember_output_profile()
+
+    profile = get_profile_store().get(card) or {}
+    settings = {
+        key: value
+        for key, value in profile.items()
+        if key in PROFILE_SETTINGS
+    }
+    settings['pcm_output'] = get_output_pcm_name(
+        card, settings.get('output_plugin')
+    )
+    settings['output_preferred'] = preferred or ''
+    logger.info('Switching the output to "%s"', card)
+    get_config().set_many(settings)
+    setup_asoundrc()
+    # plays silence if needed, so that the softvol mixer exists
+    output_exists('switch_output')
+    _set_mixer_state(profile)
+
+
+_store = None
+
+
+def get_profile_store(*args, **kwargs):
+    """Ask for the profile store. Initialize it if not yet done so.
+
+    Will pass any parameters to the constructor. Only needed in tests.
+    """
+    global _store
+    if _store is None:
+        _store = ProfileStore(*args, **kwargs)
+    return _store
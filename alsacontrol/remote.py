@@ -0,0 +1,493 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Control the daemon over TCP, for example from a phone or another PC.
+
+The protocol consists of one json object per line. The first line of a
+client has to be {"token": "..."} with the contents of TOKEN_PATH.
+Afterwards it sends {"id": 1, "command": "change_volume", "args": [0.05]}
+and gets {"id": 1, "result": null} or {"id": 1, "error": "..."} back.
+
+Changes are pushed to all clients as {"event": "volume", ...},
+{"event": "output", ...} and, after subscribe_levels,
+{"event": "levels", ...}, so that they don't need to poll.
+
+The server runs an asyncio loop in its own thread. Commands are handed
+over to the GLib main loop, so the daemon doesn't need any locks.
+"""
+
+
+import os
+import json
+import secrets
+import asyncio
+import threading
+import concurrent.futures
+
+from alsacontrol.logger import logger
+
+
+TOKEN_PATH = '~/.config/alsacontrol/remote-token'
+
+# prefix of the level subscribers of the daemon that are remote clients
+SENDER_PREFIX = 'remote:'
+
+# commands that clients may call, each of them is a method of the
+# handler with the 'remote_' prefix, which gets the sender and the args
+COMMANDS = [
+    'get_state',
+    'change_volume',
+    'toggle_muted',
+    'select_output',
+    'subscribe_levels',
+    'unsubscribe_levels'
+]
+
+# the connection is closed if the token doesn't arrive in time
+AUTH_TIMEOUT = 5
+
+# seconds to wait for running commands when stopping the server
+STOP_TIMEOUT = 1
+
+MAX_CLIENTS = 16
+
+# lines longer than that close the connection
+MAX_LINE_LENGTH = 4096
+
+# levels are skipped for clients that don't read fast enough, once that
+# many bytes wait to be sent to them. Other events are always sent
+MAX_PENDING_BYTES = 64 * 1024
+
+
+def get_token(path=TOKEN_PATH):
+    """Read the token of the remote control, create it if needed.
+
+    Only the user can read the file.
+    """
+    path = os.path.expanduser(path)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        logger.info('Creating remote control token "%s"', path)
+        descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(descriptor, 'w') as token_file:
+            token_file.write(secrets.token_hex(32))
+
+    with open(path, 'r') as token_file:
+        return token_file.read().strip()
+
+
+def encode(message):
+    """Turn a message into a line of compact json."""
+    return json.dumps(message, separators=(',', ':')).encode() + b'\n'
+
+
+def run_in_main_loop(function, *args):
+    """Call the function in the GLib main loop.
+
+    Returns a concurrent.futures.Future for its result.
+    """
+    from gi.repository import GLib
+
+    future = concurrent.futures.Future()
+
+    def run():
+        """Pass the result or the exception to the future."""
+        try:
+            future.set_result(function(*args))
+        except Exception as error:
+            future.set_exception(error)
+        return GLib.SOURCE_REMOVE
+
+    GLib.idle_add(run)
+    return future
+
+
+class _Client:
+    """A connected client, from the view of the server."""
+    def __init__(self, number, writer):
+        """Remember where to write to."""
+        self.sender = f'{SENDER_PREFIX}{number}'
+        self.writer = writer
+        self.levels = False
+
+    def send(self, message, droppable=False):
+        """Write a message without waiting for it to be sent."""
+        transport = self.writer.transport
+        if transport.is_closing():
+            return
+        pending = transport.get_write_buffer_size()
+        if droppable and pending > MAX_PENDING_BYTES:
+            return
+        self.writer.write(encode(message))
+
+
+class RemoteServer:
+    """Persistent connections of remote clients to the daemon."""
+    def __init__(
+            self, handler, address, port, token=None,
+            call=run_in_main_loop
+    ):
+        """Prepare the server without starting it.
+
+        Parameters
+        ----------
+        handler : object
+            Has a remote_<command> method for each of COMMANDS, usually
+            the Daemon.
+        address : string
+            Where to listen, 127.0.0.1 to only allow local clients
+        port : int
+            0 to let the system pick a free port, see self.port
+        token : string or None
+            If None, uses get_token()
+        call : callable
+            Gets the function and the arguments, and returns a
+            concurrent.futures.Future. Decides in which thread the
+            handler runs.
+        """
+        self._handler = handler
+        self._address = address
+        self.port = port
+        self._token = token if token is not None else get_token()
+        self._call = call
+
+        self._clients = set()
+        # writers of all connections, also those without a token yet
+        self._connections = set()
+        self._next_number = 0
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._stopping = False
+
+    def start(self):
+        """Listen in a separate thread and wait until it is ready.
+
+        Returns False if it can't listen on the address and port.
+        """
+        ready = concurrent.futures.Future()
+        self._loop = asyncio.new_event_loop()
+
+        def run():
+            """Run the event loop of the server until stopped."""
+            asyncio.set_event_loop(self._loop)
+            try:
+                self._server = self._loop.run_until_complete(
+                    asyncio.start_server(
+                        self._handle_client,
+                        self._address,
+                        self.port,
+                        limit=MAX_LINE_LENGTH
+                    )
+                )
+            except OSError as error:
+                ready.set_exception(error)
+                self._loop.close()
+                return
+
+            self.port = self._server.sockets[0].getsockname()[1]
+            ready.set_result(None)
+            self._loop.run_forever()
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        try:
+            ready.result()
+        except OSError as error:
+            logger.error(
+                'Could not listen on %s:%s: %s',
+                self._address, self.port, error
+            )
+            self._thread.join()
+            self._thread = None
+            return False
+
+        logger.info(
+            'Remote control listening on %s:%s', self._address, self.port
+        )
+        return True
+
+    def stop(self):
+        """Close all connections and stop the thread."""
+        if self._thread is None:
+            return
+
+        async def close():
+            """Stop accepting clients and disconnect the existing ones."""
+            self._stopping = True
+            self._server.close()
+            for writer in list(self._connections):
+                writer.close()
+            tasks = asyncio.all_tasks() - {asyncio.current_task()}
+            if len(tasks) > 0:
+                _, pending = await asyncio.wait(tasks, timeout=STOP_TIMEOUT)
+                for task in pending:
+                    task.cancel()
+            await self._server.wait_closed()
+            self._loop.stop()
+
+        asyncio.run_coroutine_threadsafe(close(), self._loop)
+        self._thread.join()
+        self._thread = None
+        logger.debug('Remote control stopped')
+
+    def push(self, message, levels=False):
+        """Send an event to all clients. Can be called from any thread.
+
+        Parameters
+        ----------
+        message : dict
+            Contains at least "event"
+        levels : bool
+            If True, only sends it to clients that subscribed to levels
+            and skips those that are too slow to read them.
+        """
+        if self._thread is None:
+            return
+
+        def send():
+            """Write it to the clients in the thread of the server."""
+            for client in self._clients:
+                if levels and not client.levels:
+                    continue
+                client.send(message, droppable=levels)
+
+        self._loop.call_soon_threadsafe(send)
+
+    async def _close(self, writer):
+        """Close the connection and wait until it is closed."""
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    def has_level_subscribers(self):
+        """If any client wants to receive levels."""
+        return any(client.levels for client in list(self._clients))
+
+    async def _authenticate(self, reader):
+        """Check if the first line of the client contains the token."""
+        try:
+            line = await asyncio.wait_for(reader.readline(), AUTH_TIMEOUT)
+            token = json.loads(line)['token']
+        except (
+                asyncio.TimeoutError, ValueError, KeyError, TypeError,
+                ConnectionError
+        ):
+            return False
+        # not vulnerable to timing attacks
+        return isinstance(token, str) and secrets.compare_digest(
+            token.encode(), self._token.encode()
+        )
+
+    async def _handle_client(self, reader, writer):
+        """Serve one client until it disconnects or the server stops."""
+        self._connections.add(writer)
+        try:
+            await self._serve(reader, writer)
+        finally:
+            self._connections.discard(writer)
+
+    async def _serve(self, reader, writer):
+        """Authenticate the client and run its commands."""
+        peer = writer.get_extra_info('peername')
+        if len(self._connections) > MAX_CLIENTS:
+            logger.error('Rejecting %s, too many remote clients', peer)
+            writer.write(encode({'error': 'Too many clients'}))
+            await self._close(writer)
+            return
+
+        if not await self._authenticate(reader):
+            logger.error('Remote client %s failed to authenticate', peer)
+            writer.write(encode({'error': 'Authentication failed'}))
+            await self._close(writer)
+            return
+
+        self._next_number += 1
+        client = _Client(self._next_number, writer)
+        self._clients.add(client)
+        logger.debug('Remote client %s connected as %s', peer, client.sender)
+
+        try:
+            state = await self._run('get_state', client, [])
+            client.send({'event': 'hello', **state})
+            while True:
+                line = await reader.readline()
+                if line == b'':
+                    break
+                await self._handle_request(client, line)
+        except (ConnectionError, ValueError) as error:
+            # ValueError if the line was too long
+            logger.debug('Remote client %s: %s', client.sender, error)
+        finally:
+            self._clients.discard(client)
+            await self._close(writer)
+            logger.debug('Remote client %s disconnected', client.sender)
+            # the main loop might not run anymore when stopping
+            if client.levels and not self._stopping:
+                await self._run('unsubscribe_levels', client, [])
+
+    async def _handle_request(self, client, line):
+        """Run a command of the client and send the reply."""
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            command = request['command']
+            args = request.get('args', [])
+        except (ValueError, KeyError, TypeError, AttributeError):
+            client.send({'error': 'Malformed request'})
+            return
+
+        if command not in COMMANDS or not isinstance(args, list):
+            client.send({'id': request_id, 'error': 'Unknown command'})
+            return
+
+        try:
+            result = await self._run(command, client, args)
+        except (TypeError, ValueError) as error:
+            client.send({'id': request_id, 'error': str(error)})
+            return
+        except Exception as error:
+            # keep the connection, the next command might work
+            logger.error('Remote command %s failed: %s', command, error)
+            client.send({'id': request_id, 'error': 'Internal error'})
+            return
+
+        if command == 'subscribe_levels':
+            client.levels = True
+        elif command == 'unsubscribe_levels':
+            client.levels = False
+
+        client.send({'id': request_id, 'result': result})
+
+    async def _run(self, command, client, args):
+        """Call the method of the handler that belongs to the command."""
+        method = getattr(self._handler, f'remote_{command}')
+        return await asyncio.wrap_future(
+            self._call(method, client.sender, *args)
+        )
+
+
+class RemoteClient:
+    """Keeps one connection to the remote control of a daemon open.
+
+    It is reused for all requests and reconnects if it was lost. Events
+    that the daemon pushes are passed to the callback.
+    """
+    def __init__(self, address, port, token=None, on_event=None):
+        """Prepare the client without connecting yet.
+
+        Parameters
+        ----------
+        token : string or None
+            If None, uses get_token()
+        on_event : callable or None
+            Gets each pushed event as dict
+        """
+        self._address = address
+        self._port = port
+        self._token = token if token is not None else get_token()
+        self._on_event = on_event
+
+        self._reader = None
+        self._writer = None
+        self._receiver = None
+        self._replies = {}
+        self._next_id = 0
+        self.state = None
+
+    async def connect(self):
+        """Connect and authenticate unless already connected.
+
+        Raises ConnectionError if the token is wrong.
+        """
+        if self._writer is not None and not self._writer.is_closing():
+            return
+
+        self._reader, self._writer = await asyncio.open_connection(
+            self._address, self._port, limit=MAX_LINE_LENGTH
+        )
+        self._writer.write(encode({'token': self._token}))
+        hello = json.loads(await self._reader.readline() or b'{}')
+        if hello.get('event') != 'hello':
+            self._writer.close()
+            await self._writer.wait_closed()
+            self._writer = None
+            raise ConnectionError(hello.get('error', 'Connection closed'))
+
+        self.state = hello
+        self._receiver = asyncio.ensure_future(self._receive())
+
+    async def _receive(self):
+        """Read replies and events until the connection closes."""
+        try:
+            while True:
+                line = await self._reader.readline()
+                if line == b'':
+                    break
+                message = json.loads(line)
+                if 'id' in message:
+                    future = self._replies.pop(message['id'], None)
+                    if future is not None and not future.done():
+                        future.set_result(message)
+                elif self._on_event is not None:
+                    self._on_event(message)
+        except (ConnectionError, ValueError) as error:
+            logger.debug('Remote connection lost: %s', error)
+        finally:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except ConnectionError:
+                pass
+            for future in self._replies.values():
+                if not future.done():
+                    future.set_exception(ConnectionError('Connection lost'))
+            self._replies = {}
+
+    async def request(self, command, *args):
+        """Run a command in the daemon and return its result.
+
+        Raises ValueError if the daemon replied with an error.
+        """
+        await self.connect()
+        self._next_id += 1
+        future = asyncio.get_event_loop().create_future()
+        self._replies[self._next_id] = future
+        self._writer.write(encode({
+            'id': self._next_id,
+            'command': command,
+            'args': list(args)
+        }))
+        reply = await future
+        if 'error' in reply:
+            raise ValueError(reply['error'])
+        return reply['result']
+
+    async def close(self):
+        """Disconnect from the daemon."""
+        if self._writer is None:
+            return
+        self._writer.close()
+        await self._receiver
+        self._writer = None
@@ -0,0 +1,187 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Keep count of open pcms, mixers and GLib sources.
+
+A long running window or daemon should not accumulate them. Run with
+--debug to periodically log what is open.
+"""
+
+
+import os
+import threading
+from collections import Counter
+
+from alsacontrol.logger import logger
+
+
+# seconds between reports in debug mode
+REPORT_INTERVAL = 60
+
+
+def get_open_file_descriptors():
+    """Count the file descriptors of this process, None if unknown."""
+    try:
+        return len(os.listdir('/proc/self/fd'))
+    except OSError:
+        return None
+
+
+def get_resident_memory():
+    """Get the resident memory of this process in KiB, None if unknown."""
+    try:
+        with open('/proc/self/statm', 'r') as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+class ResourceTracker:
+    """Counts what was opened and not closed yet, by kind and name.
+
+    Pcms are opened by the capture worker thread, so this is thread safe.
+    """
+    def __init__(self):
+        """Start with nothing open."""
+        self._lock = threading.Lock()
+        # maps kinds like 'pcm' to a Counter of names
+        self._open = {}
+        # maps ids of GLib sources to the name of their callback
+        self._sources = {}
+
+    def opened(self, kind, name):
+        """Remember that a resource was opened.
+
+        Parameters
+        ----------
+        kind : string
+            For example 'pcm', 'mixer' or 'tick callback'
+        name : string
+            For example the device or the card
+        """
+        with self._lock:
+            self._open.setdefault(kind, Counter())[name] += 1
+
+    def closed(self, kind, name):
+        """Remember that a resource was closed."""
+        with self._lock:
+            names = self._open.get(kind)
+            if names is None or names[name] == 0:
+                logger.error('Closed %s "%s" that was not open', kind, name)
+                return
+            names[name] -= 1
+            if names[name] == 0:
+                del names[name]
+
+    def timeout_add(self, interval, callback, *args, seconds=False):
+        """Like GLib.timeout_add, but counted until the source is removed.
+
+        The source is removed when the callback returns False or when
+        source_remove of the tracker is called.
+
+        Parameters
+        ----------
+        interval : int
+            Milliseconds, or seconds if seconds is True
+        """
+        from gi.repository import GLib
+
+        name = callback.__name__
+        source = {}
+
+        def tracked_callback(*args):
+            """Forget the source once the callback stops it."""
+            if callback(*args):
+                return True
+            self._forget_source(source['id'])
+            return False
+
+        if seconds:
+            source_id = GLib.timeout_add_seconds(
+                interval, tracked_callback, *args
+            )
+        else:
+            source_id = GLib.timeout_add(interval, tracked_callback, *args)
+
+        source['id'] = source_id
+        with self._lock:
+            self._sources[source_id] = name
+        self.opened('glib source', name)
+        return source_id
+
+    def source_remove(self, source_id):
+        """Remove a source of timeout_add."""
+        from gi.repository import GLib
+
+        GLib.source_remove(source_id)
+        self._forget_source(source_id)
+
+    def _forget_source(self, source_id):
+        """Stop counting a source."""
+        with self._lock:
+            name = self._sources.pop(source_id, None)
+        if name is None:
+            logger.error('Removed unknown GLib source %s', source_id)
+            return
+        self.closed('glib source', name)
+
+    def get_open(self, kind=None):
+        """Get a dict of name: count of what is still open.
+
+        Parameters
+        ----------
+        kind : string or None
+            If None, returns a dict of kind: {name: count}
+        """
+        with self._lock:
+            if kind is not None:
+                return dict(self._open.get(kind, {}))
+            return {
+                kind: dict(names)
+                for kind, names in self._open.items()
+                if len(names) > 0
+            }
+
+    def report(self):
+        """Log what is open, for example in a GLib timeout."""
+        counts = ', '.join(
+            f'{sum(names.values())} {kind}'
+            for kind, names in sorted(self.get_open().items())
+        )
+        logger.debug(
+            'Open resources: %s; %s file descriptors, %s KiB memory',
+            counts or 'none',
+            get_open_file_descriptors(),
+            get_resident_memory()
+        )
+        return True
+
+
+_tracker = None
+
+
+def get_resource_tracker():
+    """Ask for the tracker. Initialize it if not yet done so."""
+    global _tracker
+    if _tracker is None:
+        _tracker = ResourceTracker()
+    return _tracker
@@ -71,13 +71,12 @@ def is_jack_running():
 
 
 def is_daemon_running():
-    """Test if the alsacontrol daemon is running."""
+    """Test if the alsacontrol daemon is running.
+
+    Doesn't start it, even if it can be started by D-Bus.
+    """
     try:
-        get_bus().get_object(
-            'com.alsacontrol.Volume',
-            '/'
-        )
-        return True
+        return bool(get_bus().name_has_owner('com.alsacontrol.Volume'))
     except dbus.exceptions.DBusException:
         return False
 
@@ -99,8 +98,17 @@ def stop_daemon():
 
 
 def start_daemon(debug=True):
-    """Start the alsacontrol daemon."""
+    """Start the alsacontrol daemon.
+
+    If the D-Bus service file is installed, D-Bus or systemd start it.
+    """
     logger.info('Starting the alsacontrol daemon')
+    try:
+        get_bus().start_service_by_name('com.alsacontrol.Volume')
+        return
+    except dbus.exceptions.DBusException as error:
+        logger.debug('Could not activate the daemon: %s', error)
+
     cmd = ['alsacontrol-daemon-gtk']
     if debug:
         cmd.append('-d')
@@ -0,0 +1,213 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Export levels and the volume in a memory mapped file for widgets.
+
+The daemon writes, any number of readers can read without talking to it.
+Consistency is ensured with a seqlock: the writer increments the sequence
+number before and after writing, so it is odd while a write is in progress.
+A reader retries if the number was odd or changed while it was reading.
+
+Example for a widget:
+
+    reader = SharedLevelsReader()
+    shared = reader.read()
+    if shared is not None:
+        peak, rms = shared.levels.get('Generic', (0, 0))
+"""
+
+
+import os
+import mmap
+import struct
+from collections import namedtuple
+
+from alsacontrol.logger import logger
+
+
+MAGIC = b'ALSC'
+VERSION = 1
+MAX_CARDS = 16
+
+# magic, version, sequence, volume, muted, number of cards
+HEADER = struct.Struct('<4sIIf?3xI')
+# card name, peak, rms
+ENTRY = struct.Struct('<32sff')
+SEQUENCE_OFFSET = 8
+SIZE = HEADER.size + ENTRY.size * MAX_CARDS
+
+# how often a reader tries again when the writer is busy
+MAX_RETRIES = 100
+
+
+SharedLevels = namedtuple('SharedLevels', ['volume', 'muted', 'levels'])
+
+
+def get_shared_levels_path():
+    """Get the path of the memory mapped file."""
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir is None:
+        runtime_dir = f'/tmp/alsacontrol-{os.getuid()}'
+    return os.path.join(runtime_dir, 'alsacontrol', 'levels')
+
+
+class SharedLevelsWriter:
+    """Publishes levels and the volume. Only one writer should exist."""
+    def __init__(self, path=None):
+        """Create or reuse the file and map it.
+
+        Reusing keeps the mappings of already running readers valid
+        when the daemon restarts.
+        """
+        if path is None:
+            path = get_shared_levels_path()
+
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path), mode=0o700)
+
+        logger.debug('Exporting levels to %s', path)
+        self._path = path
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, SIZE)
+            self._mmap = mmap.mmap(fd, SIZE)
+        finally:
+            os.close(fd)
+
+        self._sequence = HEADER.unpack_from(self._mmap)[2]
+        if self._sequence % 2 == 1:
+            # a previous writer crashed while writing
+            self._sequence += 1
+
+        self.volume = 0
+        self.muted = False
+        self.levels = {}
+        self._write()
+
+    def set_volume(self, volume, muted):
+        """Publish the perceived volume between 0 and 1 and mute state."""
+        self.volume = volume
+        self.muted = muted
+        self._write()
+
+    def set_levels(self, levels):
+        """Publish a dict of card: (peak, rms)."""
+        self.levels = levels
+        self._write()
+
+    def close(self):
+        """Tell readers that there are no levels anymore and unmap."""
+        self.levels = {}
+        self._write()
+        self._mmap.close()
+
+    def _write(self):
+        """Write the whole state, guarded by the sequence number."""
+        levels = list(self.levels.items())[:MAX_CARDS]
+
+        self._sequence += 1
+        struct.pack_into('<I', self._mmap, SEQUENCE_OFFSET, self._sequence)
+
+        for i, (card, (peak, rms)) in enumerate(levels):
+            ENTRY.pack_into(
+                self._mmap,
+                HEADER.size + ENTRY.size * i,
+                card.encode()[:32],
+                peak,
+                rms
+            )
+
+        HEADER.pack_into(
+            self._mmap,
+            0,
+            MAGIC,
+            VERSION,
+            self._sequence,
+            self.volume,
+            self.muted,
+            len(levels)
+        )
+
+        # only after everything else is written, readers may accept it
+        self._sequence += 1
+        struct.pack_into('<I', self._mmap, SEQUENCE_OFFSET, self._sequence)
+
+
+class SharedLevelsReader:
+    """Reads levels and the volume without any IPC."""
+    def __init__(self, path=None):
+        """Prepare reading. The file is mapped once it exists."""
+        if path is None:
+            path = get_shared_levels_path()
+        self._path = path
+        self._mmap = None
+
+    def _map(self):
+        """Map the file if the daemon created it. Return False if not."""
+        if self._mmap is not None:
+            return True
+
+        try:
+            fd = os.open(self._path, os.O_RDONLY)
+        except FileNotFoundError:
+            return False
+
+        try:
+            if os.fstat(fd).st_size < SIZE:
+                return False
+            self._mmap = mmap.mmap(fd, SIZE, access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
+
+        return True
+
+    def read(self):
+        """Get the current SharedLevels or None if nothing is exported."""
+        if not self._map():
+            return None
+
+        for _ in range(MAX_RETRIES):
+            magic, version, sequence, volume, muted, num_cards = \
+                HEADER.unpack_from(self._mmap)
+            if magic != MAGIC or version != VERSION:
+                return None
+            if sequence % 2 == 1:
+                continue
+
+            levels = {}
+            for i in range(min(num_cards, MAX_CARDS)):
+                card, peak, rms = ENTRY.unpack_from(
+                    self._mmap,
+                    HEADER.size + ENTRY.size * i
+                )
+                levels[card.rstrip(b'\x00').decode()] = (peak, rms)
+
+            if HEADER.unpack_from(self._mmap)[2] == sequence:
+                return SharedLevels(volume, muted, levels)
+
+        logger.debug('Gave up reading the shared levels, writer is busy')
+        return None
+
+    def close(self):
+        """Unmap the file."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
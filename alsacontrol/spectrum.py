@@ -0,0 +1,138 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Compute the spectrum of an input from the buffers read for levels.
+
+Samples are collected in a ring buffer and transformed with overlapping
+hann windows once enough new samples arrived, so feeding buffers is
+cheap and the fft only runs as often as someone wants to see it.
+"""
+
+
+import numpy as np
+
+from alsacontrol.analysis import RATE, CHANNELS, FULL_SCALE
+
+
+FFT_SIZE = 2048
+# half of the window, so windows overlap by 50%
+HOP_SIZE = 1024
+NUM_BANDS = 32
+MIN_FREQUENCY = 20
+# bands at this level or below are shown as empty
+MIN_DB = -80
+
+
+def get_band_starts(num_bands, size, rate):
+    """Get the first fft bin of each logarithmically spaced band.
+
+    Bands in the low frequencies that are narrower than a single bin are
+    merged, so there might be less than num_bands.
+    """
+    edges = np.geomspace(MIN_FREQUENCY, rate / 2, num_bands + 1)[:-1]
+    starts = np.round(edges * size / rate).astype(np.intp)
+    # bin 0 is the dc offset, which is not interesting here
+    return np.unique(np.maximum(starts, 1))
+
+
+class Spectrum:
+    """Incremental spectrum of a single input."""
+    def __init__(
+            self, rate=RATE, channels=CHANNELS, size=FFT_SIZE,
+            hop_size=HOP_SIZE, num_bands=NUM_BANDS
+    ):
+        """Allocate all buffers.
+
+        Parameters
+        ----------
+        rate : int
+            Frames per second of the fed buffers
+        channels : int
+            Samples per frame, interleaved. They are mixed down to mono.
+        size : int
+            Frames per fft
+        hop_size : int
+            How many new frames are needed to compute the next fft
+        num_bands : int
+            Maximum number of bands of the result
+        """
+        self.channels = channels
+        self.size = size
+        self.hop_size = hop_size
+
+        self.window = np.hanning(size)
+        self._ring = np.zeros(size)
+        self._windowed = np.empty(size)
+        self._magnitudes = np.empty(size // 2 + 1)
+        self._band_starts = get_band_starts(num_bands, size, rate)
+        self._new_frames = 0
+
+        # the hann window halves the amplitude, the fft of a full scale
+        # sine peaks at size / 2 times its amplitude
+        self._full_scale = (FULL_SCALE + 1) * size / 4
+
+        # between 0 and 1, where 0 is MIN_DB or less and 1 is full scale
+        self.bands = np.zeros(len(self._band_starts))
+
+    def feed(self, samples):
+        """Add int16 samples as read from the pcm."""
+        num_frames = len(samples) // self.channels
+        if num_frames == 0:
+            return
+
+        mono = samples[:num_frames * self.channels].reshape(
+            num_frames, self.channels
+        ).mean(axis=1)
+
+        if num_frames >= self.size:
+            self._ring[:] = mono[-self.size:]
+        else:
+            self._ring[:-num_frames] = self._ring[num_frames:]
+            self._ring[-num_frames:] = mono
+
+        self._new_frames += num_frames
+
+    def compute(self):
+        """Update self.bands if enough new frames arrived.
+
+        Returns True if bands were computed.
+        """
+        if self._new_frames < self.hop_size:
+            return False
+        self._new_frames = 0
+
+        np.multiply(self._ring, self.window, out=self._windowed)
+        np.abs(np.fft.rfft(self._windowed), out=self._magnitudes)
+        np.maximum.reduceat(
+            self._magnitudes,
+            self._band_starts,
+            out=self.bands
+        )
+
+        # to decibel, then to 0 - 1
+        bands = self.bands
+        np.divide(bands, self._full_scale, out=bands)
+        np.maximum(bands, 1e-12, out=bands)
+        np.log10(bands, out=bands)
+        bands *= 20 / -MIN_DB
+        bands += 1
+        np.clip(bands, 0, 1, out=bands)
+        return True
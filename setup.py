@@ -19,17 +19,62 @@
 # along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
 
 
+import os
+from distutils.command.install_data import install_data
+
 import DistUtilsExtra.auto
 
 
+# what the service files in data/ point to before they are installed
+DEFAULT_DAEMON = '/usr/bin/alsacontrol-daemon-gtk'
+
+
+class InstallData(install_data):
+    """Point the service files to where the daemon is installed to."""
+    def run(self):
+        super().run()
+
+        install = self.get_finalized_command('install')
+        bindir = install.install_scripts
+        if install.root is not None:
+            # staged for a package, the files are moved to / later
+            bindir = os.path.join('/', os.path.relpath(bindir, install.root))
+        daemon = os.path.join(bindir, 'alsacontrol-daemon-gtk')
+
+        for path in self.get_outputs():
+            if not path.endswith('.service'):
+                continue
+            with open(path, 'r') as service_file:
+                service = service_file.read()
+            with open(path, 'w') as service_file:
+                service_file.write(service.replace(DEFAULT_DAEMON, daemon))
+
+
 DistUtilsExtra.auto.setup(
     name='alsacontrol',
     version='0.1.0',
     description='ALSA configuration interface',
     license='GPL-3.0',
     data_files=[
-        ('share/alsacontrol/', ['data/asoundrc-template']),
+        ('share/alsacontrol/asoundrc/', [
+            'data/asoundrc/header',
+            'data/asoundrc/dmix',
+            'data/asoundrc/dmix-card',
+            'data/asoundrc/dsnoop',
+            'data/asoundrc/plug',
+            'data/asoundrc/output-softvol',
+            'data/asoundrc/output-card-softvol',
+            'data/asoundrc/multi',
+            'data/asoundrc/route',
+            'data/asoundrc/app-softvol',
+            'data/asoundrc/input-softvol',
+            'data/asoundrc/jack-input',
+            'data/asoundrc/default',
+        ]),
         ('share/applications/', ['data/alsacontrol.desktop']),
         ('/etc/xdg/autostart/', ['data/alsacontrol-daemon.desktop']),
+        ('share/dbus-1/services/', ['data/com.alsacontrol.Volume.service']),
+        ('lib/systemd/user/', ['data/alsacontrol-daemon.service']),
     ],
+    cmdclass={'install_data': InstallData},
 )
@@ -32,6 +32,8 @@ from alsacontrol.cards import get_card
 
 
 fake_config_path = '/tmp/alsacontrol-test-config'
+fake_capabilities_path = '/tmp/alsacontrol-test-cards.json'
+fake_profiles_path = '/tmp/alsacontrol-test-profiles.json'
 
 
 class FakeMixer:
@@ -58,6 +60,9 @@ class FakeMixer:
     def setvolume(self, volume):
         self.volume = volume
 
+    def close(self):
+        pass
+
 
 class FakePCM:
     def __init__(self, type, device, *args, **kwargs):
@@ -91,9 +96,15 @@ class FakePCM:
         # returned at some point.
         return 3, b'\x01\x00\x01\x00\x00\x00\xff\xff\xff\xff\xff\xff'
 
+    def close(self):
+        pass
+
 
 class UseFakes:
     """Provides fake functionality for alsaaudio and some services."""
+    PCM = FakePCM
+    Mixer = FakeMixer
+
     def __init__(self):
         self.patches = []
 
@@ -101,9 +112,9 @@ class UseFakes:
         """Replace the functions of alsaaudio with various fakes."""
         # alsaaudio patches
         self.patches.append(patch.object(alsaaudio, 'cards', self.cards))
-        self.patches.append(patch.object(alsaaudio, 'PCM', FakePCM))
+        self.patches.append(patch.object(alsaaudio, 'PCM', self.PCM))
         self.patches.append(patch.object(alsaaudio, 'mixers', self.mixers))
-        self.patches.append(patch.object(alsaaudio, 'Mixer', FakeMixer))
+        self.patches.append(patch.object(alsaaudio, 'Mixer', self.Mixer))
 
         # service patches
         self.patches.append(
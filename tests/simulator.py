@@ -0,0 +1,341 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Simulate ALSA to test for hours without sound hardware.
+
+Cards appear and disappear on a schedule, capture pcms produce a sine
+in real time and mixers remember their state between Mixer objects,
+optionally slowly. Errors and xruns can be injected randomly. Use it
+like UseFakes:
+
+    simulation = Simulation([SimulatedCard('Sim1', present=[(0, 5)])])
+    simulation.patch()
+    ...
+    simulation.restore()
+"""
+
+
+import time
+import random
+
+import numpy as np
+
+import alsaaudio
+
+from alsacontrol.cards import get_card
+from alsacontrol.config import get_config
+from fakes import UseFakes
+
+
+# what pyalsaaudio returns when the capture buffer overran
+EPIPE = 32
+
+# pyalsaaudio defaults
+PERIOD_SIZE = 32
+RATE = 44100
+CHANNELS = 2
+
+# periods that fit into the buffer of a pcm before it overruns
+BUFFER_PERIODS = 64
+
+# hardware elements that only have a capture switch, like on most cards
+CAPTURE_ELEMENTS = ['Capture', 'Mic']
+
+
+class SimulatedCard:
+    """Settings for a single card of the simulation."""
+    def __init__(
+            self, name, present=None, frequency=440, amplitude=0.5,
+            error_probability=0, xrun_probability=0,
+            hardware_mixers=('Master', 'Capture')
+    ):
+        """Describe the card.
+
+        Parameters
+        ----------
+        name : string
+        present : list or None
+            List of (start, end) in seconds since the start of the
+            simulation in which the card exists. The schedule repeats
+            after the last end. None if the card always exists.
+        frequency : float
+            Hz of the sine that the card records
+        amplitude : float
+            Between 0 and 1
+        error_probability : float
+            Chance of each read or write to raise an ALSAAudioError
+        xrun_probability : float
+            Chance of each read to overrun
+        hardware_mixers : iterable
+            Mixer elements of the card itself
+        """
+        self.name = name
+        self.present = present
+        self.frequency = frequency
+        self.amplitude = amplitude
+        self.error_probability = error_probability
+        self.xrun_probability = xrun_probability
+        self.hardware_mixers = list(hardware_mixers)
+
+    def is_present(self, elapsed):
+        """Check if the card exists at that time of the simulation."""
+        if self.present is None:
+            return True
+
+        period = max(end for _, end in self.present)
+        elapsed = elapsed % period
+        return any(start <= elapsed < end for start, end in self.present)
+
+
+class SimulatedPCM:
+    """A pcm of a simulated card. Created by Simulation.PCM."""
+    def __init__(self, simulation, type, device, mode=0):
+        self.simulation = simulation
+        self.type = type
+        self.mode = mode
+        self.period_size = PERIOD_SIZE
+        self.closed = False
+
+        config_key = {
+            alsaaudio.PCM_CAPTURE: 'pcm_input',
+            alsaaudio.PCM_PLAYBACK: 'pcm_output'
+        }[type]
+        if device is None or device == 'default':
+            device = get_config().get(config_key)
+        if device == 'alsacontrol-jack-input':
+            device = 'jack'
+
+        self.card = simulation.get_card(get_card(device))
+        if self.card is None:
+            raise alsaaudio.ALSAAudioError(f'No such device {device}')
+
+        self.opened_at = simulation.elapsed()
+        # frames that were read or written since opening
+        self.position = 0
+        simulation.open_pcms.add(self)
+
+    def _check(self):
+        """Raise errors like a pcm of a removed or broken card."""
+        if self.closed:
+            raise alsaaudio.ALSAAudioError('PCM is closed')
+        if not self.card.is_present(self.simulation.elapsed()):
+            raise alsaaudio.ALSAAudioError('No such device')
+        if self.simulation.random.random() < self.card.error_probability:
+            self.simulation.errors += 1
+            raise alsaaudio.ALSAAudioError('Input/output error')
+
+    def _get_elapsed_frames(self):
+        """How many frames the device processed since opening."""
+        return int((self.simulation.elapsed() - self.opened_at) * RATE)
+
+    def _get_available(self):
+        """How many frames the device produced that were not read yet."""
+        return self._get_elapsed_frames() - self.position
+
+    def setperiodsize(self, period_size):
+        self.period_size = period_size
+        return period_size
+
+    def read(self):
+        """Read a period of a sine. Like alsaaudio, returns (length, data).
+
+        Blocks until a period is available unless opened with
+        PCM_NONBLOCK.
+        """
+        if self.type == alsaaudio.PCM_PLAYBACK:
+            raise ValueError('tried to read on a playback PCM')
+        self._check()
+
+        available = self._get_available()
+        random_xrun = (
+            self.simulation.random.random() < self.card.xrun_probability
+        )
+        if available > self.period_size * BUFFER_PERIODS or random_xrun:
+            # too slow, the data that was not read is lost
+            self.simulation.xruns += 1
+            self.position += max(0, available)
+            return -EPIPE, b''
+
+        if available < self.period_size:
+            if self.mode == alsaaudio.PCM_NONBLOCK:
+                return 0, b''
+            time.sleep((self.period_size - available) / RATE)
+
+        time_axis = (self.position + np.arange(self.period_size)) / RATE
+        sine = np.sin(2 * np.pi * self.card.frequency * time_axis)
+        samples = (sine * self.card.amplitude * (2 ** 15 - 1)).astype(
+            np.int16
+        )
+        self.position += self.period_size
+        self.simulation.reads += 1
+        return self.period_size, np.repeat(samples, CHANNELS).tobytes()
+
+    def write(self, data):
+        """Play data, blocking if it is ahead of real time."""
+        if self.type == alsaaudio.PCM_CAPTURE:
+            raise ValueError('tried to write on a capture PCM')
+        self._check()
+        # two bytes per sample
+        self.position += len(data) // (2 * CHANNELS)
+        ahead = self.position - self._get_elapsed_frames()
+        if ahead > 0 and self.mode != alsaaudio.PCM_NONBLOCK:
+            time.sleep(ahead / RATE)
+        self.simulation.writes += 1
+        return len(data)
+
+    def close(self):
+        self.closed = True
+        self.simulation.open_pcms.discard(self)
+
+
+class SimulatedMixer:
+    """A mixer whose state is kept by the simulation."""
+    def __init__(self, simulation, control, cardindex=None):
+        if control not in simulation.mixers(cardindex=cardindex):
+            raise alsaaudio.ALSAAudioError(
+                f'Unable to find mixer control {control}'
+            )
+        self.simulation = simulation
+        # softvol controls by name, those of cards by (cardindex, name)
+        self.control = control if cardindex is None else (cardindex, control)
+        self.channels = 2
+
+    def _wait(self):
+        """Be slow like some hardware or a busy system."""
+        if self.simulation.mixer_latency > 0:
+            time.sleep(self.simulation.mixer_latency)
+
+    def getvolume(self, *_):
+        self._wait()
+        volume = self.simulation.volumes.get(self.control, 50)
+        return [volume] * self.channels
+
+    def setvolume(self, volume):
+        self._wait()
+        self.simulation.volumes[self.control] = int(volume)
+        self.simulation.mixer_writes += 1
+
+    def _check_switch(self, capture):
+        """Capture elements of cards only have a capture switch."""
+        is_capture = (
+            isinstance(self.control, tuple) and
+            self.control[1] in CAPTURE_ELEMENTS
+        )
+        if is_capture != capture:
+            raise alsaaudio.ALSAAudioError('Mixer has no such switch')
+
+    def getmute(self):
+        self._wait()
+        self._check_switch(False)
+        mute = self.simulation.mutes.get(self.control, False)
+        return [int(mute)] * self.channels
+
+    def setmute(self, mute):
+        self._wait()
+        self._check_switch(False)
+        self.simulation.mutes[self.control] = bool(mute)
+        self.simulation.mixer_writes += 1
+
+    def getrec(self):
+        self._wait()
+        self._check_switch(True)
+        mute = self.simulation.mutes.get(self.control, False)
+        return [int(not mute)] * self.channels
+
+    def setrec(self, capture):
+        self._wait()
+        self._check_switch(True)
+        self.simulation.mutes[self.control] = not capture
+        self.simulation.mixer_writes += 1
+
+    def close(self):
+        pass
+
+
+class Simulation(UseFakes):
+    """Patches alsaaudio with simulated cards."""
+    def __init__(self, cards, mixer_latency=0, seed=0):
+        """Prepare the simulation. It starts with patch().
+
+        Parameters
+        ----------
+        cards : list of SimulatedCard
+        mixer_latency : float
+            Seconds that each mixer call takes
+        seed : int
+            For the random errors and xruns, to be reproducible
+        """
+        super().__init__()
+        self.simulated_cards = cards
+        self.mixer_latency = mixer_latency
+        self.random = random.Random(seed)
+        self.start = None
+
+        self.volumes = {}
+        self.mutes = {}
+        self.open_pcms = set()
+
+        # statistics
+        self.reads = 0
+        self.writes = 0
+        self.xruns = 0
+        self.errors = 0
+        self.mixer_writes = 0
+
+    def patch(self):
+        """Start the simulation."""
+        self.start = time.monotonic()
+        super().patch()
+
+    def elapsed(self):
+        """Seconds since the simulation started."""
+        return time.monotonic() - self.start
+
+    def get_card(self, name):
+        """Get the SimulatedCard if it currently exists, otherwise None."""
+        elapsed = self.elapsed()
+        for card in self.simulated_cards:
+            if card.name == name and card.is_present(elapsed):
+                return card
+        return None
+
+    def cards(self):
+        elapsed = self.elapsed()
+        return [
+            card.name for card in self.simulated_cards
+            if card.name != 'jack' and card.is_present(elapsed)
+        ]
+
+    def mixers(self, cardindex=None, *_, **__):
+        cards = self.cards()
+        if cardindex is not None:
+            if cardindex >= len(cards):
+                raise alsaaudio.ALSAAudioError(f'No such card {cardindex}')
+            return list(self.get_card(cards[cardindex]).hardware_mixers)
+        if len(cards) == 0:
+            return []
+        return UseFakes.mixers()
+
+    def PCM(self, type, device=None, mode=0, *_, **__):
+        return SimulatedPCM(self, type, device, mode)
+
+    def Mixer(self, control='Master', id=0, cardindex=None, *_, **__):
+        return SimulatedMixer(self, control, cardindex)
@@ -27,18 +27,28 @@ import sys
 import unittest
 
 from alsacontrol.config import get_config
+from alsacontrol.capabilities import get_capability_index
 from alsacontrol.logger import update_verbosity
-from fakes import fake_config_path
+from alsacontrol.profiles import get_profile_store
+from fakes import fake_config_path, fake_capabilities_path, \
+    fake_profiles_path
 
 
 if __name__ == "__main__":
     update_verbosity(debug=True)
 
-    if os.path.exists(fake_config_path):
-        os.remove(fake_config_path)
+    for path in [
+            fake_config_path,
+            fake_capabilities_path,
+            fake_profiles_path
+    ]:
+        if os.path.exists(path):
+            os.remove(path)
 
     # don't overwrite the users settings in unittests
     get_config(fake_config_path)
+    get_capability_index(fake_capabilities_path)
+    get_profile_store(fake_profiles_path)
 
     modules = sys.argv[1:]
     # discoverer is really convenient, but it can't find a specific test
@@ -0,0 +1,102 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import os
+import unittest
+
+import alsaaudio
+
+from alsacontrol import alsa
+from alsacontrol.alsa import resolve_mixer, get_volume, set_volume, \
+    is_muted, toggle_mute, set_mute, OUTPUT_VOLUME, OUTPUT_MUTE, \
+    INPUT_VOLUME, INPUT_MUTE
+from alsacontrol.config import get_config
+from simulator import Simulation, SimulatedCard
+from fakes import fake_config_path
+
+
+class HardwareMixerTest(unittest.TestCase):
+    def setUp(self):
+        self.simulation = Simulation([
+            SimulatedCard('Onboard'),
+            SimulatedCard('USB', hardware_mixers=['Mic', 'PCM']),
+            SimulatedCard('HDMI', hardware_mixers=[])
+        ])
+        self.simulation.patch()
+        alsa._hardware_mixers.clear()
+        get_config().set_many({
+            'output_use_softvol': False,
+            'input_use_softvol': False,
+            'pcm_output': 'hw:CARD=USB',
+            'pcm_input': 'hw:CARD=Onboard'
+        })
+
+    def tearDown(self):
+        self.simulation.restore()
+        if os.path.exists(fake_config_path):
+            os.remove(fake_config_path)
+        config = get_config()
+        config.create_config_file()
+        config.load_config()
+
+    def test_resolve(self):
+        self.assertEqual(resolve_mixer(OUTPUT_VOLUME), ('PCM', 1))
+        self.assertEqual(resolve_mixer(OUTPUT_MUTE), ('PCM', 1))
+        self.assertEqual(resolve_mixer(INPUT_VOLUME), ('Capture', 0))
+        self.assertEqual(resolve_mixer('foo'), ('foo', None))
+
+        get_config().set('output_use_softvol', True)
+        self.assertEqual(resolve_mixer(OUTPUT_VOLUME), (OUTPUT_VOLUME, None))
+
+    def test_volume(self):
+        set_volume(0.3, alsaaudio.PCM_PLAYBACK)
+        self.assertEqual(self.simulation.volumes[(1, 'PCM')], 30)
+        self.assertAlmostEqual(get_volume(alsaaudio.PCM_PLAYBACK), 0.3)
+
+        set_volume(0.7, alsaaudio.PCM_CAPTURE)
+        self.assertEqual(self.simulation.volumes[(0, 'Capture')], 70)
+
+        self.assertFalse(is_muted())
+        self.assertTrue(toggle_mute(OUTPUT_MUTE))
+        self.assertTrue(is_muted())
+
+    def test_capture_switch(self):
+        # Capture of the Onboard card only has a capture switch
+        self.assertFalse(is_muted(INPUT_MUTE))
+        self.assertTrue(toggle_mute(INPUT_MUTE))
+        self.assertTrue(self.simulation.mutes[(0, 'Capture')])
+        self.assertTrue(is_muted(INPUT_MUTE))
+
+        set_mute(INPUT_MUTE, False)
+        self.assertFalse(self.simulation.mutes[(0, 'Capture')])
+        self.assertFalse(is_muted(INPUT_MUTE))
+
+        # the output still uses the playback switch
+        self.assertFalse(is_muted(OUTPUT_MUTE))
+
+    def test_no_hardware_mixer(self):
+        get_config().set('pcm_output', 'hw:CARD=HDMI')
+        self.assertEqual(resolve_mixer(OUTPUT_VOLUME), (OUTPUT_VOLUME, None))
+        self.assertEqual(get_volume(alsaaudio.PCM_PLAYBACK), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
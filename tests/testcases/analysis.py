@@ -0,0 +1,131 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import unittest
+
+import numpy as np
+
+from alsacontrol.analysis import InputAnalysis, get_longest_run, \
+    CLIPPING, SILENCE, DC_OFFSET, FULL_SCALE
+
+
+def get_buffer(value, frames=441, channels=2):
+    """Get int16 samples of a constant value."""
+    return np.full(frames * channels, value, dtype=np.int16)
+
+
+def get_noise(frames=441, channels=2):
+    """Get quiet int16 samples without any offset."""
+    samples = np.tile([1000, 1000, -1000, -1000], frames // 2 + 1)
+    return samples[:frames * channels].astype(np.int16)
+
+
+class AnalysisTest(unittest.TestCase):
+    def test_get_longest_run(self):
+        mask = np.array([True, False, True, True, False, True])
+        self.assertEqual(get_longest_run(mask), (2, 1))
+        # continues the run of the previous buffer
+        self.assertEqual(get_longest_run(mask, 5), (6, 1))
+        self.assertEqual(get_longest_run(np.array([False])), (0, 0))
+        self.assertEqual(get_longest_run(np.array([True, True]), 2), (4, 4))
+
+    def test_clipping(self):
+        analysis = InputAnalysis(rate=44100, channels=2)
+        self.assertEqual(analysis.analyze(get_noise()), [])
+
+        # a single loud frame is fine
+        samples = get_noise()
+        samples[10] = FULL_SCALE
+        self.assertEqual(analysis.analyze(samples), [])
+
+        # a run that spans two buffers clips
+        samples = get_noise()
+        samples[-4:] = FULL_SCALE
+        self.assertEqual(analysis.analyze(samples), [])
+        samples = get_noise()
+        samples[:2] = -FULL_SCALE - 1
+        self.assertEqual(analysis.analyze(samples), [(CLIPPING, True)])
+        self.assertIn(CLIPPING, analysis.problems)
+
+        # stays flagged for a while and is cleared afterwards
+        self.assertEqual(analysis.analyze(get_noise(44100)), [])
+        self.assertEqual(
+            analysis.analyze(get_noise(44100 * 2)),
+            [(CLIPPING, False)]
+        )
+
+    def test_silence(self):
+        analysis = InputAnalysis(rate=100, channels=2)
+        self.assertEqual(analysis.analyze(get_buffer(0, frames=400)), [])
+        self.assertEqual(
+            analysis.analyze(get_buffer(0, frames=100)),
+            [(SILENCE, True)]
+        )
+        self.assertEqual(analysis.analyze(get_noise(10)), [(SILENCE, False)])
+
+    def test_small_reads(self):
+        # like a LevelMeter that only gets the 32 frames of the last
+        # period on each read, 60 times per second
+        analysis = InputAnalysis(rate=44100, channels=2)
+        now = 1000
+        changes = []
+        for _ in range(60 * 4):
+            now += 1 / 60
+            changes += analysis.analyze(get_buffer(0, frames=32), now)
+        self.assertEqual(changes, [])
+        for _ in range(60 * 2):
+            now += 1 / 60
+            changes += analysis.analyze(get_buffer(0, frames=32), now)
+        self.assertEqual(changes, [(SILENCE, True)])
+
+        # clipping is cleared after CLIPPING_HOLD seconds as well
+        samples = get_noise(32)
+        samples[:8] = FULL_SCALE
+        samples[8:16] = -FULL_SCALE - 1
+        now += 1 / 2
+        self.assertEqual(
+            analysis.analyze(samples, now),
+            [(CLIPPING, True), (SILENCE, False)]
+        )
+        changes = []
+        for _ in range(4):
+            now += 1 / 2
+            changes += analysis.analyze(get_noise(32), now)
+        self.assertEqual(changes, [])
+        now += 1 / 2
+        changes = analysis.analyze(get_noise(32), now)
+        self.assertEqual(changes, [(CLIPPING, False)])
+
+    def test_dc_offset(self):
+        analysis = InputAnalysis(rate=100, channels=2)
+        changes = analysis.analyze(get_buffer(FULL_SCALE // 10, frames=200))
+        self.assertEqual(changes, [(DC_OFFSET, True)])
+        changes = analysis.analyze(get_noise(1000))
+        self.assertEqual(changes, [(DC_OFFSET, False)])
+
+    def test_odd_buffer(self):
+        # incomplete frames are ignored
+        analysis = InputAnalysis(rate=100, channels=2)
+        self.assertEqual(analysis.analyze(np.zeros(1, dtype=np.int16)), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
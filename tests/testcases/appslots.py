@@ -0,0 +1,64 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import unittest
+
+from alsacontrol.config import get_config
+from alsacontrol.appslots import get_app_slots, add_app_slot, \
+    remove_app_slot, is_valid_slot_name, get_app_mixer, \
+    MAX_SLOT_NAME_LENGTH
+
+
+class AppSlotsTest(unittest.TestCase):
+    def tearDown(self):
+        get_config().set('app_slots', '')
+
+    def test_add_remove(self):
+        self.assertEqual(get_app_slots(), [])
+        self.assertTrue(add_app_slot('mpv'))
+        self.assertTrue(add_app_slot('firefox'))
+        self.assertTrue(add_app_slot('mpv'))
+        self.assertEqual(get_app_slots(), ['mpv', 'firefox'])
+        self.assertEqual(get_config().get('app_slots'), 'mpv firefox')
+
+        remove_app_slot('mpv')
+        self.assertEqual(get_app_slots(), ['firefox'])
+
+    def test_invalid(self):
+        self.assertFalse(is_valid_slot_name('a b'))
+        self.assertFalse(is_valid_slot_name('a"b'))
+        self.assertTrue(is_valid_slot_name('Some_app-2'))
+        self.assertFalse(add_app_slot('{foo}'))
+        get_config().set('app_slots', 'mpv a"b')
+        self.assertEqual(get_app_slots(), ['mpv'])
+
+    def test_length(self):
+        self.assertEqual(MAX_SLOT_NAME_LENGTH, 21)
+        longest = 'a' * MAX_SLOT_NAME_LENGTH
+        self.assertTrue(is_valid_slot_name(longest))
+        self.assertEqual(len(get_app_mixer(longest)), 44)
+        self.assertFalse(is_valid_slot_name(longest + 'a'))
+        self.assertFalse(add_app_slot(longest + 'a'))
+        self.assertEqual(get_app_slots(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import os
+import unittest
+from unittest.mock import patch
+
+from alsacontrol import asoundrc as asoundrc_module
+from alsacontrol.config import get_config
+from alsacontrol.asoundrc import create_asoundrc
+from alsacontrol.cards import select_output_pcms, get_output_pcms
+from fakes import UseFakes, fake_config_path
+
+
+# never touch the asoundrc of the user that runs the tests
+asoundrc_path = '/tmp/alsacontrol-test-asoundrc'
+
+
+def read_asoundrc():
+    with open(asoundrc_path, 'r') as asoundrc_file:
+        return asoundrc_file.read()
+
+
+class AsoundrcTest(unittest.TestCase):
+    def setUp(self):
+        self.fakes = UseFakes()
+        self.fakes.patch()
+        self.asoundrc_patch = patch.object(
+            asoundrc_module,
+            'alsactl_asoundrc',
+            asoundrc_path
+        )
+        self.asoundrc_patch.start()
+
+    def tearDown(self):
+        self.asoundrc_patch.stop()
+        if os.path.exists(asoundrc_path):
+            os.remove(asoundrc_path)
+        self.fakes.restore()
+        if os.path.exists(fake_config_path):
+            os.remove(fake_config_path)
+        config = get_config()
+        config.create_config_file()
+        config.load_config()
+
+    def test_only_used_pcms(self):
+        config = get_config()
+        config.set('pcm_output', 'hw:CARD=FakeCard1')
+        config.set('pcm_input', 'null')
+        create_asoundrc()
+        asoundrc = read_asoundrc()
+        self.assertIn('pcm.alsacontrol-dmix', asoundrc)
+        self.assertIn('pcm.alsacontrol-output-softvol', asoundrc)
+        self.assertNotIn('pcm.alsacontrol-plug', asoundrc)
+        self.assertNotIn('pcm.alsacontrol-dsnoop', asoundrc)
+        self.assertNotIn('pcm.alsacontrol-input-softvol', asoundrc)
+
+        config.set('output_use_dmix', False)
+        config.set('output_use_softvol', False)
+        create_asoundrc()
+        asoundrc = read_asoundrc()
+        self.assertNotIn('pcm.alsacontrol-dmix', asoundrc)
+        self.assertNotIn('pcm.alsacontrol-output-softvol', asoundrc)
+        self.assertIn('slave.pcm "hw:CARD=FakeCard1"', asoundrc)
+
+    def test_latency_profile(self):
+        config = get_config()
+        config.set('pcm_output', 'hw:CARD=FakeCard1')
+        config.set('pcm_input', 'hw:CARD=FakeCard1')
+        create_asoundrc()
+        self.assertNotIn('period_size', read_asoundrc())
+
+        config.set('latency_profile', 'low-latency')
+        create_asoundrc()
+        asoundrc = read_asoundrc()
+        # once for dmix and once for dsnoop
+        self.assertEqual(asoundrc.count('period_size 128'), 2)
+        self.assertEqual(asoundrc.count('buffer_size 512'), 2)
+        self.assertEqual(asoundrc.count('rate 48000'), 2)
+        self.assertEqual(asoundrc.count('format S16_LE'), 2)
+
+    def test_multiple_outputs(self):
+        config = get_config()
+        select_output_pcms(['FakeCard1', 'FakeCard2'])
+        self.assertEqual(get_output_pcms(), [
+            'hw:CARD=FakeCard1',
+            'hw:CARD=FakeCard2'
+        ])
+        create_asoundrc()
+        asoundrc = read_asoundrc()
+        self.assertIn('pcm.alsacontrol-dmix-0', asoundrc)
+        self.assertIn('pcm.alsacontrol-dmix-1', asoundrc)
+        self.assertIn('name alsacontrol-output-0-volume', asoundrc)
+        self.assertIn('name alsacontrol-output-1-volume', asoundrc)
+        self.assertIn('slaves.1.pcm "alsacontrol-output-1"', asoundrc)
+        # two channels for each card
+        self.assertIn('slave.channels 4', asoundrc)
+        self.assertIn('ttable.1.3 1', asoundrc)
+        self.assertIn('slave.pcm "alsacontrol-route"', asoundrc)
+        self.assertNotIn('pcm.alsacontrol-dmix {', asoundrc)
+
+        # back to a single output
+        select_output_pcms(['FakeCard2'])
+        self.assertEqual(config.get('pcm_output_extra'), '')
+        create_asoundrc()
+        asoundrc = read_asoundrc()
+        self.assertNotIn('alsacontrol-multi', asoundrc)
+        self.assertIn('pcm.alsacontrol-dmix {', asoundrc)
+
+    def test_app_slots(self):
+        config = get_config()
+        config.set('pcm_output', 'hw:CARD=FakeCard1')
+        config.set('app_slots', 'mpv firefox')
+        create_asoundrc()
+        asoundrc = read_asoundrc()
+        self.assertIn('pcm.alsacontrol-app-mpv', asoundrc)
+        self.assertIn('name alsacontrol-app-firefox-volume', asoundrc)
+        # stacked on top of the output volume
+        self.assertEqual(
+            asoundrc.count('slave.pcm "alsacontrol-output-softvol"'),
+            3
+        )
+
+        config.set('pcm_output', 'null')
+        create_asoundrc()
+        self.assertNotIn('alsacontrol-app-mpv', read_asoundrc())
+
+    def test_jack_input(self):
+        config = get_config()
+        config.set('pcm_input', 'jack')
+        create_asoundrc()
+        asoundrc = read_asoundrc()
+        self.assertIn('pcm.alsacontrol-jack-input', asoundrc)
+        self.assertIn('slave.pcm "alsacontrol-jack-input"', asoundrc)
+        self.assertNotIn('pcm.alsacontrol-plug', asoundrc)
+
+    def test_unchanged(self):
+        create_asoundrc()
+        os.utime(asoundrc_path, (0, 0))
+        create_asoundrc()
+        # not written again
+        self.assertEqual(os.path.getmtime(asoundrc_path), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from alsacontrol import calibration
+from alsacontrol.calibration import calibrate, get_loudness, to_db, \
+    forget_calibration, TARGET_DB, TOLERANCE_DB, MAX_STEPS, BLOCK_SIZE
+from alsacontrol.config import get_config
+
+
+def get_sine(amplitude, samples=BLOCK_SIZE * 10):
+    """Get int16 samples of a sine with an amplitude between 0 and 1."""
+    sine = np.sin(np.arange(samples) / 10) * amplitude * (2 ** 15 - 1)
+    return sine.astype(np.int16)
+
+
+class FakeInput:
+    """Records louder the higher the volume is."""
+    def __init__(self, loudness):
+        self.volume = 0.5
+        self.loudness = loudness
+        self.volume_changes = 0
+
+    def get_volume(self, *_):
+        return self.volume
+
+    def set_volume(self, volume, *_):
+        self.volume = volume
+        self.volume_changes += 1
+
+    def record(self, *_):
+        return get_sine(min(1, self.loudness * self.volume))
+
+
+class CalibrationTest(unittest.TestCase):
+    def tearDown(self):
+        get_config().set('input_calibrated_volume', 0)
+
+    def patch(self, fake_input):
+        """Record from the fake input instead of alsa."""
+        patches = [
+            patch.object(calibration, name, getattr(fake_input, name))
+            for name in ['get_volume', 'set_volume', 'record']
+        ]
+        for p in patches:
+            p.__enter__()
+            self.addCleanup(p.__exit__, None, None, None)
+
+    def test_get_loudness(self):
+        loudness, peak = get_loudness(get_sine(0.5))
+        # the rms of a sine is its amplitude divided by sqrt(2)
+        self.assertAlmostEqual(loudness, to_db(0.5 / 2 ** 0.5), places=1)
+        self.assertAlmostEqual(peak, 0.5, places=2)
+        self.assertIsNone(get_loudness(get_sine(0.5, BLOCK_SIZE - 1)))
+        self.assertIsNone(get_loudness(None))
+
+    def test_calibrate(self):
+        fake_input = FakeInput(1)
+        self.patch(fake_input)
+        volume = calibrate()
+        self.assertIsNotNone(volume)
+        loudness, _ = get_loudness(fake_input.record())
+        self.assertLess(abs(loudness - TARGET_DB), TOLERANCE_DB * 2)
+        # bisection needs only a few writes
+        self.assertLessEqual(fake_input.volume_changes, MAX_STEPS + 1)
+        self.assertEqual(get_config().get('input_calibrated_volume'), volume)
+
+        forget_calibration()
+        self.assertEqual(get_config().get('input_calibrated_volume'), 0)
+
+    def test_clipping(self):
+        # even the lowest volume clips
+        fake_input = FakeInput(1000)
+        self.patch(fake_input)
+        volume = calibrate()
+        self.assertLess(volume, 0.01 + 1 / 2 ** MAX_STEPS)
+
+    def test_silent(self):
+        fake_input = FakeInput(0)
+        self.patch(fake_input)
+        self.assertIsNone(calibrate())
+        self.assertEqual(fake_input.volume_changes, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
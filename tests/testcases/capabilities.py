@@ -0,0 +1,105 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import os
+import shutil
+import unittest
+
+from alsacontrol.capabilities import CapabilityIndex, parse_stream
+
+
+fake_proc_path = '/tmp/alsacontrol-test/proc'
+fake_index_path = '/tmp/alsacontrol-test/cards.json'
+
+
+def add_fake_card(number, card, devices, usbid=None):
+    """Create a directory that looks like /proc/asound/cardN."""
+    card_path = os.path.join(fake_proc_path, f'card{number}')
+    os.makedirs(card_path)
+    os.symlink(card_path, os.path.join(fake_proc_path, card))
+    for device in devices:
+        os.makedirs(os.path.join(card_path, device))
+    if usbid is not None:
+        with open(os.path.join(card_path, 'usbid'), 'w') as usbid_file:
+            usbid_file.write(usbid)
+    return card_path
+
+
+stream = """USB Audio at usb-0000:00:14.0-2, full speed : USB Audio
+
+Capture:
+  Status: Stop
+  Interface 3
+    Altset 1
+    Format: S16_LE
+    Channels: 1
+    Endpoint: 0x86 (6 IN) (ASYNC)
+    Rates: 16000, 48000
+"""
+
+
+class CapabilitiesTest(unittest.TestCase):
+    def tearDown(self):
+        shutil.rmtree('/tmp/alsacontrol-test', ignore_errors=True)
+
+    def test_parse_stream(self):
+        self.assertEqual(
+            parse_stream(stream),
+            ([1], [16000, 48000], ['S16_LE'])
+        )
+
+    def test_probe_and_cache(self):
+        add_fake_card(0, 'Generic', ['pcm0p', 'pcm3p'])
+        mic_path = add_fake_card(1, 'Mic', ['pcm0c'], usbid='046d:0825')
+        with open(os.path.join(mic_path, 'stream0'), 'w') as stream_file:
+            stream_file.write(stream)
+
+        index = CapabilityIndex(fake_index_path, fake_proc_path)
+        self.assertFalse(index.can_capture('Generic'))
+        self.assertTrue(index.can_play('Generic'))
+        self.assertTrue(index.can_capture('Mic'))
+        self.assertFalse(index.can_play('Mic'))
+        self.assertEqual(index.get('Mic')['identity'], 'usb:046d:0825')
+        self.assertEqual(index.get('Mic')['rates'], [16000, 48000])
+        # unknown, so it should be tried
+        self.assertTrue(index.can_capture('jack'))
+        self.assertIsNone(index.get('jack')['capture'])
+
+        # loaded from the disk without probing
+        shutil.rmtree(fake_proc_path)
+        index = CapabilityIndex(fake_index_path, fake_proc_path)
+        self.assertEqual(index._cards['Mic']['channels'], [1])
+
+    def test_revalidate(self):
+        add_fake_card(0, 'Device', ['pcm0p'], usbid='1234:0001')
+        index = CapabilityIndex(fake_index_path, fake_proc_path)
+        self.assertFalse(index.can_capture('Device'))
+
+        # a different device with the same name is plugged in
+        shutil.rmtree(fake_proc_path)
+        add_fake_card(0, 'Device', ['pcm0p', 'pcm0c'], usbid='1234:0002')
+        self.assertFalse(index.can_capture('Device'))
+        index.invalidate(['Device'])
+        self.assertTrue(index.can_capture('Device'))
+
+
+if __name__ == "__main__":
+    unittest.main()
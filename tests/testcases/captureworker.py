@@ -0,0 +1,135 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import time
+import threading
+import unittest
+
+from alsacontrol.captureworker import CaptureWorker
+from fakes import UseFakes
+
+
+class CaptureWorkerTest(unittest.TestCase):
+    def setUp(self):
+        self.fakes = UseFakes()
+        self.fakes.patch()
+        self.notified = threading.Event()
+        self.worker = CaptureWorker(self.notified.set)
+        self.worker.start()
+
+    def tearDown(self):
+        self.worker.quit()
+        self.worker.join(1)
+        self.fakes.restore()
+
+    def wait_for(self, cards):
+        """Collect results until all cards reported something."""
+        results = {}
+        deadline = time.monotonic() + 1
+        while time.monotonic() < deadline:
+            if not self.notified.wait(0.1):
+                continue
+            self.notified.clear()
+            results.update(self.worker.collect())
+            if all(card in results for card in cards):
+                break
+        return results
+
+    def test_levels(self):
+        self.worker.monitor('FakeCard1', 60)
+        # FakeCard2 is configured to raise errors when reading
+        self.worker.monitor('FakeCard2', 60)
+        results = self.wait_for(['FakeCard1', 'FakeCard2'])
+        peak, valid, problems = results['FakeCard1']
+        self.assertTrue(valid)
+        self.assertAlmostEqual(peak, 1 / 2 ** 15)
+        self.assertEqual(problems, frozenset())
+        self.assertEqual(results['FakeCard2'], (None, False, frozenset()))
+
+    def test_latest_value_wins(self):
+        self.worker.monitor('FakeCard1', 60)
+        self.wait_for(['FakeCard1'])
+        # many reads without collecting leave only a single result
+        time.sleep(0.1)
+        self.assertEqual(len(self.worker.collect()), 1)
+        self.assertEqual(self.worker.collect(), [])
+
+    def test_stop_monitoring(self):
+        self.worker.monitor('FakeCard1', 60)
+        self.wait_for(['FakeCard1'])
+        self.worker.stop_monitoring('FakeCard1')
+        time.sleep(0.1)
+        self.worker.collect()
+        time.sleep(0.1)
+        self.assertEqual(self.worker.collect(), [])
+
+    def test_spectrum(self):
+        self.assertIsNone(self.worker.take_spectrum())
+        self.worker.analyze_spectrum('FakeCard1')
+        self.worker.monitor('FakeCard1', 60)
+        deadline = time.monotonic() + 1
+        spectrum = None
+        while spectrum is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+            spectrum = self.worker.take_spectrum()
+        card, bands = spectrum
+        self.assertEqual(card, 'FakeCard1')
+        self.assertGreater(len(bands), 0)
+
+    def test_publish_while_collecting(self):
+        worker = self.worker
+
+        class Mailbox(dict):
+            """Publishes from another thread right after being copied."""
+            def items(self):
+                copy = list(super().items())
+                publisher = threading.Thread(
+                    target=worker._publish,
+                    args=('FakeCard2', None, False)
+                )
+                publisher.start()
+                # blocks until collect is done, if collect is locked
+                publisher.join(0.1)
+                self.publisher = publisher
+                return copy
+
+        mailbox = Mailbox({'FakeCard1': (0.5, True, frozenset())})
+        worker._mailbox = mailbox
+        self.assertEqual(
+            worker.collect(),
+            [('FakeCard1', (0.5, True, frozenset()))]
+        )
+        mailbox.publisher.join(1)
+        # the removed card is not lost and notified again
+        self.assertEqual(
+            worker.collect(),
+            [('FakeCard2', (None, False, frozenset()))]
+        )
+        self.assertTrue(self.notified.is_set())
+
+    def test_quit(self):
+        self.worker.quit()
+        self.worker.join(1)
+        self.assertFalse(self.worker.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -22,10 +22,20 @@
 import unittest
 
 from alsacontrol.config import get_config
-from alsacontrol.cards import input_exists, get_current_card, get_card
+from alsacontrol.cards import input_exists, get_current_card, get_card, \
+    get_output_card_mixer, get_output_pcms
+from fakes import UseFakes
 
 
 class CardsTest(unittest.TestCase):
+    def setUp(self):
+        self.fakes = UseFakes()
+        self.fakes.patch()
+
+    def tearDown(self):
+        self.fakes.restore()
+        get_config().set('pcm_output_extra', '')
+
     def test_null_input(self):
         config = get_config()
         config.set('pcm_input', 'null')
@@ -44,6 +54,41 @@ class CardsTest(unittest.TestCase):
         self.assertIsNone(get_current_card('pcm_output')[1])
         self.assertIsNone(get_card(config.get('pcm_output')))
 
+    def test_output_card_mixer(self):
+        config = get_config()
+        config.set('pcm_output', 'hw:CARD=FakeCard1')
+        config.set('pcm_output_extra', '')
+        self.assertIsNone(get_output_card_mixer('FakeCard1'))
+
+        config.set('pcm_output_extra', 'hw:CARD=FakeCard2')
+        self.assertEqual(
+            get_output_card_mixer('FakeCard1'),
+            'alsacontrol-output-0-volume'
+        )
+        self.assertEqual(
+            get_output_card_mixer('FakeCard2'),
+            'alsacontrol-output-1-volume'
+        )
+        self.assertIsNone(get_output_card_mixer('FakeCard3'))
+
+    def test_missing_extra_output(self):
+        config = get_config()
+        config.set('pcm_output', 'hw:CARD=FakeCard1')
+        config.set('pcm_output_extra', 'hw:CARD=FakeCard3 hw:CARD=FakeCard2')
+        # FakeCard3 doesn't exist, so it can't be part of multi
+        self.assertEqual(
+            get_output_pcms(),
+            ['hw:CARD=FakeCard1', 'hw:CARD=FakeCard2']
+        )
+        self.assertEqual(
+            get_output_card_mixer('FakeCard2'),
+            'alsacontrol-output-1-volume'
+        )
+
+        config.set('pcm_output_extra', 'hw:CARD=FakeCard3')
+        self.assertEqual(get_output_pcms(), ['hw:CARD=FakeCard1'])
+        self.assertIsNone(get_output_card_mixer('FakeCard1'))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import unittest
+from unittest.mock import patch
+
+import alsaaudio
+
+from alsacontrol.cardstracker import CardsTracker
+from fakes import UseFakes
+
+
+class CardsTrackerTest(unittest.TestCase):
+    def setUp(self):
+        self.fakes = UseFakes()
+        self.fakes.patch()
+
+    def tearDown(self):
+        self.fakes.restore()
+
+    def test_update(self):
+        tracker = CardsTracker()
+        changes = tracker.update()
+        self.assertEqual(changes.added, {'FakeCard1', 'FakeCard2', 'jack'})
+        self.assertEqual(changes.removed, set())
+
+        self.assertEqual(tracker.update(), (set(), set()))
+
+        with patch.object(alsaaudio, 'cards', lambda: ['FakeCard1', 'USB']):
+            changes = tracker.update()
+        self.assertEqual(changes.added, {'USB'})
+        self.assertEqual(changes.removed, {'FakeCard2'})
+
+    def test_log_new_pcms(self):
+        tracker = CardsTracker()
+        self.assertFalse(tracker.log_new_pcms())
+        self.assertFalse(tracker.log_new_pcms())
+        with patch.object(alsaaudio, 'cards', lambda: ['FakeCard1']):
+            self.assertTrue(tracker.log_new_pcms())
+        self.assertTrue(tracker.log_new_pcms())
+
+
+if __name__ == "__main__":
+    unittest.main()
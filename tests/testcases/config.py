@@ -19,9 +19,13 @@
 # along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
 
 
+import os
 import unittest
 
-from alsacontrol.config import _modify_config
+from alsacontrol.config import _modify_config, _parse_config, Config
+
+
+config_path = '/tmp/alsacontrol-test-config-parsing'
 
 
 class ConfigTest(unittest.TestCase):
@@ -41,5 +45,65 @@ class ConfigTest(unittest.TestCase):
         self.assertEqual(contents, """a=1\n # test=3\n  abc=123\ntest=1234""")
 
 
+class ParseConfigTest(unittest.TestCase):
+    def tearDown(self):
+        if os.path.exists(config_path):
+            os.remove(config_path)
+
+    def test_types(self):
+        config = _parse_config(
+            '# output_channels=4\n'
+            '\n'
+            'output_channels=6\n'
+            '  input_use_dsnoop = False\n'
+            'input_calibrated_volume=0.5\n'
+            'daemon_idle_timeout=30\n'
+            'app_slots=mpv firefox\n',
+            'config'
+        )
+        self.assertEqual(config, {
+            'output_channels': 6,
+            'input_use_dsnoop': False,
+            'input_calibrated_volume': 0.5,
+            'daemon_idle_timeout': 30,
+            'app_slots': 'mpv firefox'
+        })
+
+    def test_malformed(self):
+        with self.assertLogs(level='ERROR') as logs:
+            config = _parse_config(
+                'output_channels=2.5\n'
+                'output_use_dmix=yes\n'
+                'foo=1\n'
+                'output_plugin\n'
+                'pcm_output=hw:CARD=Foo\n',
+                'config'
+            )
+        self.assertEqual(config, {'pcm_output': 'hw:CARD=Foo'})
+        self.assertEqual(len(logs.output), 4)
+        self.assertIn('config:1:', logs.output[0])
+        self.assertIn('config:4:', logs.output[3])
+
+    def test_config(self):
+        config = Config(config_path)
+        snapshot = config.snapshot()
+        self.assertEqual(snapshot['output_channels'], 2)
+        with self.assertRaises(TypeError):
+            snapshot['output_channels'] = 4
+
+        self.assertTrue(config.set('output_channels', 4))
+        self.assertIsNone(config.set('output_channels', 'four'))
+        self.assertEqual(config.get('output_channels'), 4)
+        # older snapshots don't change
+        self.assertEqual(snapshot['output_channels'], 2)
+
+        with open(config_path, 'a') as config_file:
+            config_file.write('# a comment\n\noutput_use_dmix=False\n')
+        # as if it was modified a bit later
+        os.utime(config_path, ns=(0, 0))
+        self.assertFalse(config.get('output_use_dmix'))
+        self.assertEqual(config.get('output_channels'), 4)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,240 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import os
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from alsacontrol import daemon
+from alsacontrol.alsa import OUTPUT_VOLUME
+from alsacontrol.config import get_config
+from alsacontrol.daemon import load_state, save_state
+from alsacontrol.notifications import Notifications
+from alsacontrol.resources import get_resource_tracker
+from alsacontrol.sharedlevels import SharedLevelsWriter
+from fakes import fake_config_path
+from simulator import Simulation, SimulatedCard
+
+
+state_path = '/tmp/alsacontrol-test-state/daemon.json'
+
+
+class DaemonStateTest(unittest.TestCase):
+    def tearDown(self):
+        if os.path.exists(state_path):
+            os.remove(state_path)
+
+    def test_save_and_load(self):
+        self.assertEqual(load_state(state_path), {})
+        save_state({'perceived_volume': 0.123456}, state_path)
+        self.assertEqual(
+            load_state(state_path),
+            {'perceived_volume': 0.123456}
+        )
+
+    def test_broken(self):
+        save_state({}, state_path)
+        with open(state_path, 'w') as state_file:
+            state_file.write('{')
+        self.assertEqual(load_state(state_path), {})
+
+
+class FakeRemoteServer:
+    """Doesn't listen on any port."""
+    def __init__(self, *args):
+        self.running = False
+
+    def start(self):
+        self.running = True
+        return True
+
+    def stop(self):
+        self.running = False
+
+    def has_level_subscribers(self):
+        return False
+
+    def push(self, *args):
+        pass
+
+
+class DaemonTestCase(unittest.TestCase):
+    """Runs a daemon on simulated cards without touching the system."""
+    # config to start the daemon with
+    settings = {}
+
+    def setUp(self):
+        self.simulation = Simulation([SimulatedCard('Generic')])
+        self.simulation.patch()
+        get_config().set('pcm_output', 'hw:CARD=Generic')
+        for key, value in self.settings.items():
+            get_config().set(key, value)
+        self.simulation.volumes[OUTPUT_VOLUME] = 50
+
+        self.now = 1000
+        self.saved = []
+        self.quit_calls = 0
+        self.asoundrc_calls = 0
+        self.patches = [
+            patch.object(daemon, 'load_state', lambda: {}),
+            patch.object(daemon, 'save_state', self.saved.append),
+            patch.object(daemon, 'time', SimpleNamespace(
+                monotonic=lambda: self.now
+            )),
+            patch.object(
+                daemon,
+                'SharedLevelsWriter',
+                lambda: SharedLevelsWriter('/tmp/alsacontrol-test-levels')
+            ),
+            patch.object(daemon, 'setup_asoundrc', self.setup_asoundrc),
+            patch.object(daemon, 'RemoteServer', FakeRemoteServer)
+        ]
+        for p in self.patches:
+            p.__enter__()
+
+        self.daemon = daemon.Daemon(Notifications(), self.quit_callback)
+
+    def setup_asoundrc(self):
+        self.asoundrc_calls += 1
+
+    def quit_callback(self):
+        self.quit_calls += 1
+
+    def tearDown(self):
+        if self.quit_calls == 0:
+            self.daemon.quit()
+        for p in self.patches:
+            p.__exit__(None, None, None)
+        self.simulation.restore()
+        if os.path.exists(fake_config_path):
+            os.remove(fake_config_path)
+        config = get_config()
+        config.create_config_file()
+        config.load_config()
+
+
+class DaemonIdleTest(DaemonTestCase):
+    def test_recent_activity(self):
+        self.now += 5
+        self.assertTrue(self.daemon._check_idle(10))
+        self.daemon.toggle_muted(lambda: None, None)
+        self.now += 9
+        self.assertTrue(self.daemon._check_idle(10))
+        self.assertEqual(self.quit_calls, 0)
+
+    def test_level_subscribers(self):
+        self.daemon._level_subscribers['widget'] = 10
+        self.now += 60
+        self.assertTrue(self.daemon._check_idle(10))
+        # counts as activity until the subscriber is gone
+        del self.daemon._level_subscribers['widget']
+        self.now += 5
+        self.assertTrue(self.daemon._check_idle(10))
+        self.assertEqual(self.quit_calls, 0)
+
+    def test_shared_levels(self):
+        self.daemon._level_subscribers[daemon.SHARED_LEVELS] = 10
+        self.now += 11
+        self.assertFalse(self.daemon._check_idle(10))
+        self.assertEqual(self.quit_calls, 1)
+
+    def test_quit_when_idle(self):
+        self.daemon.perceived_volume = 0.42
+        self.now += 11
+        self.assertFalse(self.daemon._check_idle(10))
+        self.assertEqual(self.quit_calls, 1)
+        self.assertEqual(self.saved, [{'perceived_volume': 0.42}])
+
+
+class DaemonIdleTimeoutTest(DaemonTestCase):
+    settings = {'daemon_idle_timeout': 10}
+
+    def test_idle_timeout(self):
+        self.assertIsNotNone(self.daemon._idle_timeout)
+        self.assertEqual(
+            get_resource_tracker().get_open('glib source').get('_check_idle'),
+            1
+        )
+        self.daemon.quit()
+        self.quit_calls += 1
+        self.assertIsNone(self.daemon._idle_timeout)
+        self.assertNotIn(
+            '_check_idle',
+            get_resource_tracker().get_open('glib source')
+        )
+
+
+class DaemonRemoteIdleTest(DaemonTestCase):
+    settings = {'daemon_idle_timeout': 10, 'remote_port': 4713}
+
+    def test_no_idle_exit(self):
+        # D-Bus can't start it again for tcp clients, so it never quits,
+        # even without any client connected
+        self.assertTrue(self.daemon._remote.running)
+        self.assertIsNone(self.daemon._idle_timeout)
+        self.assertNotIn(
+            '_check_idle',
+            get_resource_tracker().get_open('glib source')
+        )
+
+
+class DaemonOutputTest(DaemonTestCase):
+    def test_extra_output_added_and_removed(self):
+        get_config().set('pcm_output_extra', 'hw:CARD=HDMI')
+        hdmi = SimulatedCard('HDMI')
+        self.simulation.simulated_cards.append(hdmi)
+        self.daemon._check_output()
+        self.assertEqual(self.asoundrc_calls, 1)
+
+        # nothing changed
+        self.daemon._check_output()
+        self.assertEqual(self.asoundrc_calls, 1)
+
+        self.simulation.simulated_cards.remove(hdmi)
+        self.daemon._check_output()
+        self.assertEqual(self.asoundrc_calls, 2)
+
+    def test_only_polled_if_needed(self):
+        calls = []
+        list_cards = self.daemon._cards_tracker._list_cards
+
+        def count_calls():
+            calls.append(None)
+            return list_cards()
+
+        self.daemon._cards_tracker._list_cards = count_calls
+        self.daemon._check_output()
+        self.assertEqual(len(calls), 0)
+
+        get_config().set('output_fallbacks', 'HDMI')
+        self.daemon._check_output()
+        self.assertEqual(len(calls), 1)
+
+    def test_other_card_added(self):
+        get_config().set('pcm_output_extra', 'hw:CARD=HDMI')
+        self.simulation.simulated_cards.append(SimulatedCard('USB'))
+        self.daemon._check_output()
+        self.assertEqual(self.asoundrc_calls, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import os
+import unittest
+from unittest.mock import patch
+
+from alsacontrol import profiles
+from alsacontrol.profiles import ProfileStore
+from alsacontrol.failover import apply_failover
+from alsacontrol.config import get_config
+from simulator import Simulation, SimulatedCard
+from fakes import fake_config_path
+
+
+profiles_path = '/tmp/alsacontrol-test-profiles-failover.json'
+
+
+class FailoverTest(unittest.TestCase):
+    def setUp(self):
+        self.simulation = Simulation([
+            SimulatedCard('USB'),
+            SimulatedCard('HDMI'),
+            SimulatedCard('Speakers')
+        ])
+        self.simulation.patch()
+
+        self.renders = 0
+
+        def setup_asoundrc():
+            self.renders += 1
+
+        self.patches = [
+            patch.object(profiles, 'setup_asoundrc', setup_asoundrc),
+            patch.object(profiles, '_store', ProfileStore(profiles_path))
+        ]
+        for p in self.patches:
+            p.__enter__()
+
+        get_config().set_many({
+            'pcm_output': 'hw:CARD=USB',
+            'output_fallbacks': 'HDMI Speakers'
+        })
+
+    def tearDown(self):
+        for p in self.patches:
+            p.__exit__(None, None, None)
+        self.simulation.restore()
+        for path in [profiles_path, fake_config_path]:
+            if os.path.exists(path):
+                os.remove(path)
+        config = get_config()
+        config.create_config_file()
+        config.load_config()
+
+    def test_failover(self):
+        config = get_config()
+        self.assertIsNone(apply_failover({'USB', 'HDMI', 'Speakers'}))
+        self.assertEqual(self.renders, 0)
+
+        self.assertEqual(apply_failover({'HDMI', 'Speakers'}), 'HDMI')
+        self.assertEqual(config.get('pcm_output'), 'hw:CARD=HDMI')
+        self.assertEqual(config.get('output_preferred'), 'USB')
+        self.assertEqual(self.renders, 1)
+
+        # the fallback is removed as well
+        self.assertEqual(apply_failover({'Speakers'}), 'Speakers')
+        self.assertEqual(config.get('output_preferred'), 'USB')
+
+        # and the preferred card comes back
+        self.assertEqual(apply_failover({'USB', 'Speakers'}), 'USB')
+        self.assertEqual(config.get('pcm_output'), 'hw:CARD=USB')
+        self.assertEqual(config.get('output_preferred'), '')
+        self.assertEqual(self.renders, 3)
+
+    def test_no_fallback(self):
+        self.assertIsNone(apply_failover({'Other'}))
+        self.assertEqual(get_config().get('pcm_output'), 'hw:CARD=USB')
+        self.assertEqual(self.renders, 0)
+
+    def test_jack(self):
+        # jack is not among the alsa cards, but it isn't missing either
+        get_config().set('pcm_output', 'jack')
+        self.assertIsNone(apply_failover({'HDMI', 'Speakers'}))
+        self.assertEqual(get_config().get('pcm_output'), 'jack')
+        self.assertEqual(self.renders, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -21,6 +21,7 @@
 
 import os
 import sys
+import time
 import unittest
 from unittest.mock import patch
 from importlib.util import spec_from_loader, module_from_spec
@@ -44,6 +45,14 @@ def gtk_iteration():
         Gtk.main_iteration()
 
 
+def wait_until(condition, timeout=1):
+    """Iterate until the condition is met, for example for the worker."""
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+        gtk_iteration()
+
+
 def launch(argv=None, bin_path='bin/alsacontrol-gtk'):
     """Start alsacontrol-gtk with the command line argument array argv."""
     print('\nLaunching UI')
@@ -203,6 +212,31 @@ class Integration(unittest.TestCase):
             in self.window.input_rows
         ], ['FakeCard1', 'FakeCard2', 'jack'])
 
+    def test_hotplug(self):
+        rows = {
+            input_row.card: input_row
+            for input_row in self.window.input_rows
+        }
+        notebook = self.window.get('tabs')
+        notebook.set_current_page(1)
+
+        with patch.object(alsaaudio, 'cards', lambda: ['USB', 'FakeCard1']):
+            self.window.refresh_cards()
+            self.assertEqual(
+                [input_row.card for input_row in self.window.input_rows],
+                ['USB', 'FakeCard1', 'jack']
+            )
+            model = self.window.card_selection.get_model()
+            self.assertEqual(
+                [row[1] for row in model],
+                ['USB', 'FakeCard1', 'jack']
+            )
+
+        # the monitor of the unaffected card kept running
+        self.assertIs(self.window.input_rows[1], rows['FakeCard1'])
+        self.assertTrue(rows['FakeCard1']._input_level_monitor.running)
+        self.assertIsNone(rows['FakeCard2'].get_widget())
+
     def test_go_to_input_page(self):
 
         # should start at the output page, no monitoring should be active now
@@ -216,7 +250,10 @@ class Integration(unittest.TestCase):
 
         notebook.set_current_page(1)
         # at least one should be monitoring now. The second card is
-        # configured to raise an error for this test.
+        # configured to raise an error for this test, which the capture
+        # worker reports a bit later.
+        monitor = self.window.input_rows[1]._input_level_monitor
+        wait_until(lambda: not monitor.valid)
         self.assertEqual([
             input_row._input_level_monitor.running
             for input_row
@@ -231,6 +268,29 @@ class Integration(unittest.TestCase):
             in self.window.input_rows
         ], [False, False, False])
 
+    def test_input_monitoring_rate(self):
+        cards = alsaaudio.cards()
+        self.window.on_input_card_selected(cards[0])
+        notebook = self.window.get('tabs')
+        notebook.set_current_page(1)
+
+        monitors = [
+            input_row._input_level_monitor
+            for input_row
+            in self.window.input_rows
+        ]
+        # the unselected jack input is only refreshed slowly
+        self.assertTrue(monitors[2].running)
+        self.assertEqual(monitors[2].rate, 2)
+        if self.window.window.is_active():
+            self.assertEqual(monitors[0].rate, 60)
+        else:
+            self.assertEqual(monitors[0].rate, 2)
+
+        notebook.set_current_page(0)
+        self.assertFalse(monitors[0].running)
+        self.assertIsNone(monitors[0].rate)
+
 
 if __name__ == "__main__":
     unittest.main()
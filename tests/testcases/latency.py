@@ -0,0 +1,161 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import os
+import shutil
+import unittest
+from unittest.mock import patch
+
+import alsaaudio
+
+from alsacontrol import capabilities
+from alsacontrol.capabilities import CapabilityIndex
+from alsacontrol.latency import probe_profile, PROFILES
+from fakes import UseFakes, FakePCM
+
+
+index_path = '/tmp/alsacontrol-test-latency/cards.json'
+proc_path = '/tmp/alsacontrol-test-latency/proc'
+
+
+class ProbedPCM(FakePCM):
+    """Hardware that can only do 44100Hz and periods of 256 frames."""
+    opened_with = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        ProbedPCM.opened_with = kwargs
+
+    def info(self):
+        return {'rate': 44100, 'period_size': 256, 'buffer_size': 1024}
+
+
+class BusyPCM(ProbedPCM):
+    def __init__(self, *args, **kwargs):
+        raise alsaaudio.ALSAAudioError('Device or resource busy')
+
+
+class LatencyTest(unittest.TestCase):
+    def setUp(self):
+        self.fakes = UseFakes()
+        self.fakes.patch()
+        # the identity of a card is checked before probed values are used
+        os.makedirs(os.path.join(proc_path, 'card0', 'pcm0p'))
+        os.symlink(
+            os.path.join(proc_path, 'card0'),
+            os.path.join(proc_path, 'FakeCard1')
+        )
+        self.index_patch = patch.object(
+            capabilities,
+            '_index',
+            CapabilityIndex(index_path, proc_path)
+        )
+        self.index_patch.start()
+        ProbedPCM.opened_with = None
+
+    def tearDown(self):
+        self.index_patch.stop()
+        self.fakes.restore()
+        shutil.rmtree('/tmp/alsacontrol-test-latency', ignore_errors=True)
+
+    def test_probe(self):
+        profile = PROFILES['balanced']
+        with patch.object(alsaaudio, 'PCM', ProbedPCM):
+            probed = probe_profile(
+                'hw:CARD=FakeCard1',
+                alsaaudio.PCM_PLAYBACK,
+                profile
+            )
+        # opened with the settings of the profile
+        self.assertEqual(ProbedPCM.opened_with['rate'], 48000)
+        self.assertEqual(ProbedPCM.opened_with['periodsize'], 512)
+        self.assertEqual(ProbedPCM.opened_with['periods'], 4)
+        self.assertEqual(
+            ProbedPCM.opened_with['format'],
+            alsaaudio.PCM_FORMAT_S16_LE
+        )
+
+        # and adjusted to what the hardware uses
+        self.assertEqual(probed['rate'], 44100)
+        self.assertEqual(probed['format'], 'S16_LE')
+        self.assertEqual(probed['period_size'], 256)
+        self.assertEqual(probed['buffer_size'], 1024)
+        # not modified
+        self.assertEqual(profile['rate'], 48000)
+
+    def test_busy(self):
+        profile = PROFILES['low-latency']
+        with patch.object(alsaaudio, 'PCM', BusyPCM):
+            probed = probe_profile(
+                'hw:CARD=FakeCard1',
+                alsaaudio.PCM_CAPTURE,
+                profile
+            )
+        self.assertEqual(probed, profile)
+
+    def test_keep_probed_when_busy(self):
+        profile = PROFILES['low-latency']
+        with patch.object(alsaaudio, 'PCM', ProbedPCM):
+            probed = probe_profile(
+                'hw:CARD=FakeCard1',
+                alsaaudio.PCM_PLAYBACK,
+                profile
+            )
+        self.assertEqual(probed['rate'], 44100)
+
+        # the next process finds the device in use by its own dmix
+        capabilities._index = CapabilityIndex(index_path, proc_path)
+        with patch.object(alsaaudio, 'PCM', BusyPCM):
+            self.assertEqual(
+                probe_profile(
+                    'hw:CARD=FakeCard1',
+                    alsaaudio.PCM_PLAYBACK,
+                    profile
+                ),
+                probed
+            )
+            # but capture wasn't probed yet
+            self.assertEqual(
+                probe_profile(
+                    'hw:CARD=FakeCard1',
+                    alsaaudio.PCM_CAPTURE,
+                    profile
+                ),
+                profile
+            )
+
+    def test_old_pyalsaaudio(self):
+        # FakePCM doesn't have info, like pyalsaaudio before 0.10
+        profile = PROFILES['balanced']
+        self.assertEqual(
+            probe_profile('hw:CARD=FakeCard1', alsaaudio.PCM_CAPTURE, profile),
+            profile
+        )
+
+    def test_default_not_probed(self):
+        self.assertEqual(
+            probe_profile('hw:CARD=FakeCard2', alsaaudio.PCM_CAPTURE, {}),
+            {}
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import unittest
+
+import numpy as np
+
+from alsacontrol.levels import LevelsMonitor, clamp_rate, MAX_RATE, \
+    MIN_RATE, get_peak
+from fakes import UseFakes
+
+
+class LevelsTest(unittest.TestCase):
+    def setUp(self):
+        self.fakes = UseFakes()
+        self.fakes.patch()
+
+    def tearDown(self):
+        self.fakes.restore()
+
+    def test_read_levels(self):
+        monitor = LevelsMonitor()
+        monitor.update_cards(['FakeCard1', 'FakeCard2'])
+        # FakeCard2 is configured to raise errors when reading
+        levels = monitor.read_levels()
+        self.assertEqual(list(levels.keys()), ['FakeCard1'])
+        peak, rms = levels['FakeCard1']
+        self.assertAlmostEqual(peak, 1 / 2 ** 15)
+        # 5 of the 6 fake samples are 1 or -1
+        self.assertAlmostEqual(rms, (5 / 6) ** (1 / 2) / 2 ** 15)
+        self.assertFalse(monitor.meters['FakeCard2'].valid)
+        # nothing wrong with the fake input
+        self.assertEqual(monitor.pop_changes(), [])
+        monitor.close()
+
+    def test_update_cards(self):
+        monitor = LevelsMonitor()
+        monitor.update_cards(['FakeCard1', 'jack'])
+        meter = monitor.meters['FakeCard1']
+        monitor.update_cards(['FakeCard1'])
+        self.assertEqual(list(monitor.meters.keys()), ['FakeCard1'])
+        # untouched cards keep their pcm
+        self.assertIs(monitor.meters['FakeCard1'], meter)
+        monitor.close()
+        self.assertEqual(monitor.meters, {})
+        self.assertIsNone(meter.pcm)
+
+    def test_clamp_rate(self):
+        self.assertEqual(clamp_rate(0), MIN_RATE)
+        self.assertEqual(clamp_rate(1000), MAX_RATE)
+        self.assertEqual(clamp_rate(10), 10)
+
+    def test_full_scale_peak(self):
+        samples = np.array([0, -32768, 100], dtype=np.int16)
+        self.assertEqual(get_peak(samples), 1)
+        samples = np.array([32767, -1], dtype=np.int16)
+        self.assertAlmostEqual(get_peak(samples), 32767 / 2 ** 15)
+
+
+if __name__ == "__main__":
+    unittest.main()
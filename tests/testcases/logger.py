@@ -0,0 +1,111 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import json
+import queue
+import logging
+import unittest
+from logging.handlers import QueueListener
+from unittest.mock import patch
+
+from alsacontrol import logger as logger_module
+from alsacontrol.logger import Formatter, JsonFormatter, RepeatFilter, \
+    RecordQueueHandler, update_verbosity
+
+
+def get_record(level, message):
+    return logging.LogRecord(
+        'test', level, '/foo/bar.py', 12, message, (), None
+    )
+
+
+class LoggerTest(unittest.TestCase):
+    def tearDown(self):
+        update_verbosity(False)
+
+    def test_formatter(self):
+        formatter = Formatter()
+        update_verbosity(False)
+        self.assertEqual(formatter.format(get_record(logging.INFO, 'a')), 'a')
+        self.assertEqual(
+            formatter.format(get_record(logging.ERROR, 'b')),
+            '\033[31mERROR\033[0m: b'
+        )
+
+        update_verbosity(True)
+        self.assertEqual(
+            formatter.format(get_record(logging.INFO, 'c')),
+            '\033[32mINFO\033[0m: bar.py, line 12, c'
+        )
+        # levels without color
+        self.assertIn('d', formatter.format(get_record(25, 'd')))
+
+    def test_json_formatter(self):
+        line = JsonFormatter().format(get_record(logging.WARNING, 'e'))
+        entry = json.loads(line)
+        self.assertEqual(entry['level'], 'WARNING')
+        self.assertEqual(entry['message'], 'e')
+        self.assertEqual(entry['file'], 'bar.py')
+        self.assertEqual(entry['line'], 12)
+        self.assertNotIn('\n', line)
+
+    def test_exception_through_queue(self):
+        lines = []
+
+        class ListHandler(logging.Handler):
+            def emit(self, record):
+                lines.append(self.format(record))
+
+        list_handler = ListHandler()
+        list_handler.setFormatter(JsonFormatter())
+        record_queue = queue.SimpleQueue()
+        listener = QueueListener(record_queue, list_handler)
+        test_logger = logging.getLogger('test_exception_through_queue')
+        test_logger.propagate = False
+        test_logger.addHandler(RecordQueueHandler(record_queue))
+
+        listener.start()
+        try:
+            raise ValueError('broken')
+        except ValueError:
+            test_logger.exception('Failed with %s', 'f')
+        listener.stop()
+
+        entry = json.loads(lines[0])
+        self.assertEqual(entry['message'], 'Failed with f')
+        self.assertIn('ValueError: broken', entry['exception'])
+
+    def test_repeat_filter(self):
+        repeat_filter = RepeatFilter()
+        self.assertTrue(repeat_filter.filter(get_record(logging.DEBUG, 'a')))
+        self.assertTrue(repeat_filter.filter(get_record(logging.DEBUG, 'a')))
+        self.assertTrue(repeat_filter.filter(get_record(logging.ERROR, 'a')))
+        self.assertFalse(repeat_filter.filter(get_record(logging.ERROR, 'a')))
+        self.assertTrue(repeat_filter.filter(get_record(logging.ERROR, 'b')))
+
+        with patch.object(logger_module, 'REPEAT_INTERVAL', 0):
+            record = get_record(logging.ERROR, 'a')
+            self.assertTrue(repeat_filter.filter(record))
+        self.assertEqual(record.getMessage(), 'a (repeated 1 times)')
+
+
+if __name__ == "__main__":
+    unittest.main()
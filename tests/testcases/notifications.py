@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import os
+import sys
+import subprocess
+import unittest
+
+from alsacontrol.notifications import get_notifications, Notifications, \
+    DesktopNotifications
+
+
+class FakeNotificationServer:
+    """Answers only when told to."""
+    def __init__(self):
+        self.calls = []
+
+    def Notify(self, *args, reply_handler, error_handler):
+        self.calls.append((args, reply_handler, error_handler))
+
+
+class NotificationsTest(unittest.TestCase):
+    def test_none(self):
+        notifications = get_notifications('none')
+        self.assertIs(type(notifications), Notifications)
+        # doesn't fail without a desktop
+        notifications.show('50%', 'audio-volume-medium', 50, short=True)
+
+    def test_plugin(self):
+        notifications = get_notifications(
+            'alsacontrol.notifications.Notifications'
+        )
+        self.assertIs(type(notifications), Notifications)
+
+    def test_unknown(self):
+        for backend in ['foo', 'foo.Bar', 'alsacontrol.notifications.Foo']:
+            self.assertIs(type(get_notifications(backend)), Notifications)
+
+    def test_desktop(self):
+        server = FakeNotificationServer()
+        notifications = DesktopNotifications()
+        notifications._interface = server
+
+        notifications.show('10%', 'audio-volume-low', 10, short=True)
+        # the server didn't answer yet, only the latest is sent afterwards
+        notifications.show('20%', 'audio-volume-low', 20, short=True)
+        notifications.show('30%', 'audio-volume-low', 30, short=True)
+        self.assertEqual(len(server.calls), 1)
+        args, reply_handler, _ = server.calls[0]
+        self.assertEqual(args[0], 'ALSA-Control')
+        self.assertEqual(args[1], 0)
+        self.assertEqual(args[4], '10%')
+        self.assertEqual(args[6], {'value': 10})
+
+        reply_handler(5)
+        self.assertEqual(len(server.calls), 2)
+        args, _, error_handler = server.calls[1]
+        # replaces the previous one
+        self.assertEqual(args[1], 5)
+        self.assertEqual(args[4], '30%')
+
+        # errors don't block following notifications
+        error_handler(Exception('server is gone'))
+        notifications.show('40%', 'audio-volume-medium', 40)
+        self.assertEqual(len(server.calls), 3)
+
+    def test_headless_imports(self):
+        # neither GTK, libnotify nor numpy are needed to run the daemon
+        environment = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        modules = subprocess.check_output([
+            sys.executable, '-c',
+            'import sys; import alsacontrol.daemon; print(list(sys.modules))'
+        ], env=environment).decode()
+        self.assertNotIn('gi.repository.Gtk', modules)
+        self.assertNotIn('gi.repository.Notify', modules)
+        self.assertNotIn('numpy', modules)
+
+
+if __name__ == "__main__":
+    unittest.main()
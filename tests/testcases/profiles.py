@@ -0,0 +1,127 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import os
+import unittest
+from unittest.mock import patch
+
+from alsacontrol import profiles
+from alsacontrol.profiles import switch_output, ProfileStore
+from alsacontrol.alsa import OUTPUT_VOLUME, OUTPUT_MUTE
+from alsacontrol.config import get_config
+from simulator import Simulation, SimulatedCard
+from fakes import fake_config_path
+
+
+profiles_path = '/tmp/alsacontrol-test-profiles-switching.json'
+
+
+class ProfilesTest(unittest.TestCase):
+    def setUp(self):
+        self.simulation = Simulation([
+            SimulatedCard('Speakers'),
+            SimulatedCard('Headphones')
+        ])
+        self.simulation.patch()
+        self.simulation.volumes[OUTPUT_VOLUME] = 100
+
+        self.renders = 0
+
+        def setup_asoundrc():
+            self.renders += 1
+
+        self.patches = [
+            patch.object(profiles, 'setup_asoundrc', setup_asoundrc),
+            patch.object(profiles, '_store', ProfileStore(profiles_path))
+        ]
+        for p in self.patches:
+            p.__enter__()
+
+        get_config().set('pcm_output', 'hw:CARD=Speakers')
+
+    def tearDown(self):
+        for p in self.patches:
+            p.__exit__(None, None, None)
+        self.simulation.restore()
+        for path in [profiles_path, fake_config_path]:
+            if os.path.exists(path):
+                os.remove(path)
+        config = get_config()
+        config.create_config_file()
+        config.load_config()
+
+    def test_switch(self):
+        config = get_config()
+        config.set_many({'output_channels': 4, 'output_use_dmix': True})
+
+        # headphones are new and start with the current settings
+        switch_output('Headphones')
+        self.assertEqual(config.get('pcm_output'), 'hw:CARD=Headphones')
+        self.assertEqual(config.get('output_channels'), 4)
+        self.assertEqual(self.renders, 1)
+
+        config.set_many({
+            'output_channels': 2,
+            'output_use_dmix': False,
+            'output_plugin': 'plughw'
+        })
+        self.simulation.volumes[OUTPUT_VOLUME] = 50
+        self.simulation.mutes[OUTPUT_MUTE] = True
+
+        switch_output('Speakers')
+        self.assertEqual(config.get('pcm_output'), 'hw:CARD=Speakers')
+        self.assertEqual(config.get('output_channels'), 4)
+        self.assertTrue(config.get('output_use_dmix'))
+        self.assertEqual(self.simulation.volumes[OUTPUT_VOLUME], 100)
+        self.assertFalse(self.simulation.mutes[OUTPUT_MUTE])
+        self.assertEqual(self.renders, 2)
+
+        switch_output('Headphones')
+        self.assertEqual(config.get('pcm_output'), 'plughw:CARD=Headphones')
+        self.assertFalse(config.get('output_use_dmix'))
+        self.assertEqual(self.simulation.volumes[OUTPUT_VOLUME], 50)
+        self.assertTrue(self.simulation.mutes[OUTPUT_MUTE])
+
+        # survives restarts
+        store = ProfileStore(profiles_path)
+        self.assertEqual(store.get('Speakers')['output_channels'], 4)
+
+    def test_set_many(self):
+        config = get_config()
+        self.assertTrue(config.set_many({
+            'output_channels': 6,
+            'output_plugin': 'plughw'
+        }))
+        self.assertFalse(config.set_many({'output_channels': 6}))
+        # nothing is written if one of them is invalid
+        self.assertIsNone(config.set_many({
+            'output_channels': 2,
+            'output_use_dmix': 'maybe'
+        }))
+        self.assertEqual(config.get('output_channels'), 6)
+        with open(fake_config_path, 'r') as config_file:
+            contents = config_file.read()
+        self.assertIn('output_channels=6\n', contents)
+        self.assertIn('output_plugin=plughw\n', contents)
+
+
+if __name__ == "__main__":
+    unittest.main()
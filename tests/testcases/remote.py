@@ -0,0 +1,350 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import os
+import stat
+import asyncio
+import unittest
+import concurrent.futures
+from unittest.mock import patch
+
+from gi.repository import GLib
+
+from alsacontrol import daemon, profiles
+from alsacontrol.alsa import OUTPUT_VOLUME
+from alsacontrol.config import get_config
+from alsacontrol.notifications import Notifications
+from alsacontrol.remote import RemoteServer, RemoteClient, get_token, \
+    run_in_main_loop, SENDER_PREFIX
+from alsacontrol.sharedlevels import SharedLevelsWriter
+from fakes import fake_config_path
+from simulator import Simulation, SimulatedCard
+
+
+token_path = '/tmp/alsacontrol-test-remote/token'
+
+
+def call_directly(function, *args):
+    """Run the handler in the thread of the server."""
+    future = concurrent.futures.Future()
+    try:
+        future.set_result(function(*args))
+    except Exception as error:
+        future.set_exception(error)
+    return future
+
+
+class FakeHandler:
+    """Remembers the commands that remote clients sent."""
+    def __init__(self):
+        self.volume = 0.5
+        self.calls = []
+
+    def remote_get_state(self, sender):
+        return {'volume': self.volume}
+
+    def remote_change_volume(self, sender, volume):
+        self.calls.append((sender, 'change_volume', volume))
+        self.volume += volume
+
+    def remote_toggle_muted(self, sender):
+        self.calls.append((sender, 'toggle_muted'))
+
+    def remote_select_output(self, sender, card):
+        if card != 'Generic':
+            raise ValueError(f'Unknown card "{card}"')
+        self.calls.append((sender, 'select_output', card))
+
+    def remote_subscribe_levels(self, sender, rate):
+        self.calls.append((sender, 'subscribe_levels', rate))
+        return rate
+
+    def remote_unsubscribe_levels(self, sender):
+        self.calls.append((sender, 'unsubscribe_levels'))
+
+
+async def wait_for(condition, timeout=1):
+    """Wait until the condition is true."""
+    for _ in range(int(timeout * 100)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise TimeoutError()
+
+
+class TokenTest(unittest.TestCase):
+    def tearDown(self):
+        if os.path.exists(token_path):
+            os.remove(token_path)
+
+    def test_get_token(self):
+        token = get_token(token_path)
+        self.assertGreaterEqual(len(token), 32)
+        self.assertEqual(get_token(token_path), token)
+        mode = stat.S_IMODE(os.stat(token_path).st_mode)
+        self.assertEqual(mode, 0o600)
+
+
+class RemoteServerTest(unittest.TestCase):
+    def setUp(self):
+        self.handler = FakeHandler()
+        self.server = RemoteServer(
+            self.handler, '127.0.0.1', 0, 'secret', call_directly
+        )
+        self.assertTrue(self.server.start())
+
+    def tearDown(self):
+        self.server.stop()
+
+    def get_client(self, token='secret', on_event=None):
+        return RemoteClient('127.0.0.1', self.server.port, token, on_event)
+
+    def test_wrong_token(self):
+        async def connect():
+            with self.assertRaises(ConnectionError):
+                await self.get_client('wrong').connect()
+
+            # no token at all
+            reader, writer = await asyncio.open_connection(
+                '127.0.0.1', self.server.port
+            )
+            writer.write(b'{"command":"toggle_muted"}\n')
+            self.assertIn(b'error', await reader.readline())
+            self.assertEqual(await reader.readline(), b'')
+            writer.close()
+
+        asyncio.run(connect())
+        self.assertEqual(self.handler.calls, [])
+
+    def test_commands(self):
+        async def send_commands():
+            client = self.get_client()
+            await client.connect()
+            self.assertEqual(client.state['volume'], 0.5)
+            self.assertIsNone(await client.request('change_volume', 0.1))
+            await client.request('toggle_muted')
+            await client.request('select_output', 'Generic')
+            with self.assertRaises(ValueError):
+                await client.request('select_output', 'Foo')
+            with self.assertRaises(ValueError):
+                await client.request('quit')
+            with self.assertRaises(ValueError):
+                # wrong amount of arguments
+                await client.request('change_volume')
+            await client.close()
+
+        asyncio.run(send_commands())
+        sender = f'{SENDER_PREFIX}1'
+        self.assertEqual(self.handler.calls, [
+            (sender, 'change_volume', 0.1),
+            (sender, 'toggle_muted'),
+            (sender, 'select_output', 'Generic')
+        ])
+
+    def test_persistent_connection(self):
+        async def send_commands():
+            client = self.get_client()
+            for _ in range(10):
+                await client.request('change_volume', 0.01)
+            await client.close()
+            # reconnects
+            await client.request('change_volume', 0.01)
+            await client.close()
+
+        asyncio.run(send_commands())
+        senders = {call[0] for call in self.handler.calls}
+        self.assertEqual(len(self.handler.calls), 11)
+        self.assertEqual(len(senders), 2)
+
+    def test_push(self):
+        async def receive():
+            events = ([], [])
+            clients = [
+                self.get_client(on_event=events[0].append),
+                self.get_client(on_event=events[1].append)
+            ]
+            for client in clients:
+                await client.connect()
+            self.assertEqual(
+                await clients[0].request('subscribe_levels', 20),
+                20
+            )
+            self.assertTrue(self.server.has_level_subscribers())
+
+            self.server.push({'event': 'volume', 'volume': 0.2})
+            self.server.push({'event': 'levels', 'levels': {'a': 1}}, True)
+            await wait_for(lambda: len(events[0]) == 2)
+            await wait_for(lambda: len(events[1]) == 1)
+            self.assertEqual(events[0][1]['levels'], {'a': 1})
+            self.assertEqual(events[1][0]['volume'], 0.2)
+
+            await clients[0].close()
+            await clients[1].close()
+
+            # disconnected clients don't want levels anymore
+            await wait_for(lambda: not self.server.has_level_subscribers())
+
+        asyncio.run(receive())
+        self.assertEqual(
+            self.handler.calls[-1],
+            (f'{SENDER_PREFIX}1', 'unsubscribe_levels')
+        )
+
+    def test_malformed(self):
+        async def send_garbage():
+            client = self.get_client()
+            await client.connect()
+            client._writer.write(b'{"id": 5, "command": 3}\n')
+            client._writer.write(b'[]\n')
+            client._writer.write(b'x' * 10000 + b'\n')
+            await client._receiver
+
+        asyncio.run(send_garbage())
+        self.assertEqual(self.handler.calls, [])
+
+
+class CountingNotifications(Notifications):
+    """Remembers the notifications that would have been shown."""
+    def __init__(self):
+        self.shown = []
+
+    def show(self, *args, **kwargs):
+        self.shown.append(args[0])
+
+
+class RemoteDaemonTest(unittest.TestCase):
+    def setUp(self):
+        self.simulation = Simulation([
+            SimulatedCard('Generic'),
+            SimulatedCard('HDMI')
+        ])
+        self.simulation.patch()
+        get_config().set('pcm_output', 'hw:CARD=Generic')
+        get_config().set('output_use_softvol', True)
+        self.simulation.volumes[OUTPUT_VOLUME] = 50
+
+        self.patches = [
+            patch.object(daemon, 'load_state', lambda: {}),
+            patch.object(daemon, 'save_state', lambda state: None),
+            patch.object(profiles, 'setup_asoundrc', lambda: None),
+            patch.object(
+                daemon,
+                'SharedLevelsWriter',
+                lambda: SharedLevelsWriter('/tmp/alsacontrol-test-levels')
+            )
+        ]
+        for p in self.patches:
+            p.__enter__()
+
+        self.notifications = CountingNotifications()
+        self.daemon = daemon.Daemon(self.notifications, lambda: None)
+        # the port is chosen by the system
+        self.daemon._remote = RemoteServer(
+            self.daemon, '127.0.0.1', 0, 'secret', run_in_main_loop
+        )
+        self.assertTrue(self.daemon._remote.start())
+
+    def tearDown(self):
+        self.daemon.quit()
+        for p in self.patches:
+            p.__exit__(None, None, None)
+        self.simulation.restore()
+        if os.path.exists(fake_config_path):
+            os.remove(fake_config_path)
+        config = get_config()
+        config.create_config_file()
+        config.load_config()
+
+    def run_with_main_loop(self, coroutine):
+        """Iterate the GLib main loop while the client is running."""
+        async def main_loop():
+            context = GLib.MainContext.default()
+            while True:
+                while context.iteration(False):
+                    pass
+                await asyncio.sleep(0.001)
+
+        async def run():
+            iterating = asyncio.ensure_future(main_loop())
+            try:
+                await coroutine
+            finally:
+                iterating.cancel()
+
+        asyncio.run(run())
+
+    def test_remote_control(self):
+        events = []
+        client = RemoteClient(
+            '127.0.0.1', self.daemon._remote.port, 'secret', events.append
+        )
+
+        def get_events(name):
+            return [event for event in events if event['event'] == name]
+
+        async def control():
+            await client.connect()
+            self.assertEqual(client.state['output'], 'Generic')
+            self.assertIn('HDMI', client.state['cards'])
+            volume = client.state['volume']
+
+            await client.request('change_volume', 0.1)
+            await wait_for(lambda: len(get_events('volume')) == 1)
+            self.assertAlmostEqual(
+                get_events('volume')[0]['volume'],
+                volume + 0.1
+            )
+
+            await client.request('toggle_muted')
+            await wait_for(lambda: len(get_events('volume')) == 2)
+            self.assertTrue(get_events('volume')[1]['muted'])
+
+            with self.assertRaises(ValueError):
+                await client.request('change_volume', 'loud')
+
+            await client.request('select_output', 'HDMI')
+            self.assertEqual(get_events('output')[0]['output'], 'HDMI')
+
+            await client.request('subscribe_levels', 30)
+            self.assertIn(
+                f'{SENDER_PREFIX}1',
+                self.daemon._level_subscribers
+            )
+
+            def emit_levels():
+                # the first reads of the simulated cards might be empty
+                self.daemon._emit_levels()
+                return len(get_events('levels')) > 0
+
+            await wait_for(emit_levels)
+
+            await client.close()
+            await wait_for(lambda: len(self.daemon._level_subscribers) == 0)
+
+        self.run_with_main_loop(control())
+        self.assertEqual(
+            get_config().get('pcm_output'),
+            'hw:CARD=HDMI'
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
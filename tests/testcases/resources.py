@@ -0,0 +1,147 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import unittest
+from unittest.mock import patch
+
+import alsaaudio
+from gi.repository import GLib
+
+from alsacontrol.resources import ResourceTracker, get_resource_tracker
+from alsacontrol.alsa import play_silence, record_to_nowhere, \
+    get_mixer_volume, OUTPUT_VOLUME
+from alsacontrol.levels import LevelsMonitor
+from alsacontrol.config import get_config
+from simulator import Simulation, SimulatedCard
+
+
+class ResourceTrackerTest(unittest.TestCase):
+    def test_counts(self):
+        tracker = ResourceTracker()
+        tracker.opened('pcm', 'a')
+        tracker.opened('pcm', 'a')
+        tracker.opened('mixer', 'b')
+        self.assertEqual(tracker.get_open('pcm'), {'a': 2})
+        tracker.closed('pcm', 'a')
+        tracker.closed('pcm', 'a')
+        tracker.closed('mixer', 'b')
+        self.assertEqual(tracker.get_open(), {})
+        self.assertTrue(tracker.report())
+
+    def test_close_unknown(self):
+        tracker = ResourceTracker()
+        tracker.closed('pcm', 'a')
+        self.assertEqual(tracker.get_open('pcm'), {})
+        tracker.opened('pcm', 'a')
+        self.assertEqual(tracker.get_open('pcm'), {'a': 1})
+
+    def test_glib_sources(self):
+        tracker = ResourceTracker()
+        sources = {}
+
+        def timeout_add(interval, callback, *args):
+            source_id = len(sources) + 1
+            sources[source_id] = lambda: callback(*args)
+            return source_id
+
+        calls = []
+
+        def check(value):
+            calls.append(value)
+            return len(calls) < 2
+
+        with patch.object(GLib, 'timeout_add', timeout_add), \
+                patch.object(GLib, 'timeout_add_seconds', timeout_add), \
+                patch.object(GLib, 'source_remove', sources.pop):
+            first = tracker.timeout_add(500, check, 'a')
+            second = tracker.timeout_add(60, tracker.report, seconds=True)
+            self.assertEqual(
+                tracker.get_open('glib source'),
+                {'check': 1, 'report': 1}
+            )
+
+            # stops itself
+            self.assertTrue(sources[first]())
+            self.assertFalse(sources[first]())
+            self.assertEqual(calls, ['a', 'a'])
+            self.assertEqual(tracker.get_open('glib source'), {'report': 1})
+
+            tracker.source_remove(second)
+            self.assertEqual(tracker.get_open(), {})
+            self.assertNotIn(second, sources)
+
+
+class ClosingTest(unittest.TestCase):
+    def setUp(self):
+        self.simulation = Simulation([
+            SimulatedCard('Stable'),
+            SimulatedCard('Flaky', error_probability=1)
+        ])
+        self.simulation.patch()
+        self.pcm_input = get_config().get('pcm_input')
+        self.pcm_output = get_config().get('pcm_output')
+        get_config().set('pcm_input', 'hw:CARD=Stable')
+        get_config().set('pcm_output', 'hw:CARD=Flaky')
+
+    def tearDown(self):
+        self.simulation.restore()
+        get_config().set('pcm_input', self.pcm_input)
+        get_config().set('pcm_output', self.pcm_output)
+
+    def assert_all_closed(self):
+        self.assertEqual(len(self.simulation.open_pcms), 0)
+        self.assertEqual(get_resource_tracker().get_open(), {})
+
+    def test_mixers_visible(self):
+        # the output can't be written to but is closed anyway
+        play_silence()
+        record_to_nowhere()
+        self.assertGreater(self.simulation.errors, 0)
+        self.assert_all_closed()
+
+    def test_mixer(self):
+        get_config().set('output_use_softvol', True)
+        self.assertEqual(
+            get_mixer_volume(OUTPUT_VOLUME, alsaaudio.PCM_PLAYBACK),
+            0.5
+        )
+        self.assert_all_closed()
+
+    def test_levels_monitor(self):
+        monitor = LevelsMonitor()
+        monitor.update_cards(['Stable', 'Flaky'])
+        self.assertEqual(
+            get_resource_tracker().get_open('pcm'),
+            {'sysdefault:CARD=Stable': 1, 'sysdefault:CARD=Flaky': 1}
+        )
+        # reading fails and closes Flaky
+        monitor.read_levels()
+        self.assertEqual(
+            get_resource_tracker().get_open('pcm'),
+            {'sysdefault:CARD=Stable': 1}
+        )
+        monitor.update_cards(['Flaky'])
+        monitor.close()
+        self.assert_all_closed()
+
+
+if __name__ == "__main__":
+    unittest.main()
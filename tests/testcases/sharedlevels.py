@@ -0,0 +1,143 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import os
+import struct
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from alsacontrol import sharedlevels
+from alsacontrol.sharedlevels import SharedLevelsWriter, \
+    SharedLevelsReader, SharedLevels, SEQUENCE_OFFSET, HEADER, ENTRY
+
+
+class RecordingStruct:
+    """Remembers what would be written instead of writing it."""
+    def __init__(self, struct_, writes):
+        self._struct = struct_
+        self._writes = writes
+        self.size = struct_.size
+
+    def pack_into(self, buffer, offset, *values):
+        self._writes.append((offset, self._struct.pack(*values)))
+
+    def unpack_from(self, buffer, offset=0):
+        return self._struct.unpack_from(buffer, offset)
+
+
+shared_levels_path = '/tmp/alsacontrol-test/levels'
+
+
+class SharedLevelsTest(unittest.TestCase):
+    def tearDown(self):
+        if os.path.exists(shared_levels_path):
+            os.remove(shared_levels_path)
+
+    def test_not_exported(self):
+        reader = SharedLevelsReader(shared_levels_path)
+        self.assertIsNone(reader.read())
+
+    def test_read_written(self):
+        writer = SharedLevelsWriter(shared_levels_path)
+        reader = SharedLevelsReader(shared_levels_path)
+        writer.set_volume(0.5, True)
+        writer.set_levels({'FakeCard1': (0.25, 0.125), 'jack': (1, 0.5)})
+
+        shared = reader.read()
+        self.assertEqual(shared.volume, 0.5)
+        self.assertTrue(shared.muted)
+        self.assertEqual(shared.levels, {
+            'FakeCard1': (0.25, 0.125),
+            'jack': (1, 0.5)
+        })
+
+        # the reader sees new values without remapping
+        writer.set_levels({})
+        self.assertEqual(reader.read().levels, {})
+
+        writer.close()
+        reader.close()
+
+    def test_writer_busy(self):
+        writer = SharedLevelsWriter(shared_levels_path)
+        reader = SharedLevelsReader(shared_levels_path)
+        # pretend the writer is in the middle of writing
+        sequence = writer._sequence + 1
+        struct.pack_into('<I', writer._mmap, SEQUENCE_OFFSET, sequence)
+        self.assertIsNone(reader.read())
+
+        # a restarted writer continues with an even number
+        writer.close()
+        writer = SharedLevelsWriter(shared_levels_path)
+        self.assertEqual(writer._sequence % 2, 0)
+        self.assertIsNotNone(reader.read())
+        writer.close()
+
+    def test_torn_writes(self):
+        # replay a write byte by byte, as another cpu might see it. A
+        # reader must never mix the old and the new state
+        writer = SharedLevelsWriter(shared_levels_path)
+        writer.set_volume(0.25, False)
+        writer.set_levels({'FakeCard1': (0.5, 0.25)})
+        old = SharedLevels(0.25, False, {'FakeCard1': (0.5, 0.25)})
+        new = SharedLevels(0.75, True, {'FakeCard1': (0.5, 0.25)})
+        memory = bytearray(writer._mmap)
+
+        writes = []
+        patches = [
+            patch.object(sharedlevels, 'HEADER', RecordingStruct(
+                HEADER, writes
+            )),
+            patch.object(sharedlevels, 'ENTRY', RecordingStruct(
+                ENTRY, writes
+            )),
+            patch.object(sharedlevels, 'struct', SimpleNamespace(
+                pack_into=lambda fmt, buffer, offset, *values:
+                writes.append((offset, struct.pack(fmt, *values)))
+            ))
+        ]
+        for p in patches:
+            p.__enter__()
+        writer.set_volume(0.75, True)
+        for p in patches:
+            p.__exit__(None, None, None)
+
+        reader = SharedLevelsReader(shared_levels_path)
+        reader._mmap = bytes(memory)
+        seen = [reader.read()]
+        for offset, data in writes:
+            for i, byte in enumerate(data):
+                memory[offset + i] = byte
+                reader._mmap = bytes(memory)
+                shared = reader.read()
+                if shared is not None:
+                    self.assertIn(shared, [old, new])
+                    seen.append(shared)
+
+        self.assertEqual(seen[0], old)
+        self.assertEqual(seen[-1], new)
+        reader._mmap = None
+        writer.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
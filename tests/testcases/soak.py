@@ -0,0 +1,336 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Run alsacontrol against the simulation for a while.
+
+Set ALSACONTROL_SOAK_SECONDS to soak for longer than a few seconds, for
+example for hours on a machine without sound hardware.
+"""
+
+
+import os
+import time
+import threading
+import unittest
+import tracemalloc
+from unittest.mock import patch
+
+from gi.repository import GLib
+
+from alsacontrol import daemon
+from alsacontrol.alsa import OUTPUT_VOLUME
+from alsacontrol.notifications import Notifications
+from alsacontrol.resources import get_resource_tracker
+from alsacontrol.sharedlevels import SharedLevelsWriter
+from alsacontrol.cardstracker import CardsTracker
+from alsacontrol.captureworker import CaptureWorker
+from alsacontrol.levels import LevelsMonitor
+from alsacontrol.config import get_config
+from fakes import fake_config_path
+from simulator import Simulation, SimulatedCard
+
+
+SOAK_SECONDS = float(os.environ.get('ALSACONTROL_SOAK_SECONDS', 3))
+
+# bytes that may be allocated and not freed anymore during the second
+# half of the soak, for caches that warm up and logging
+MAX_MEMORY_GROWTH = 256 * 1024
+
+
+def get_churning_cards():
+    """A stable card, one that comes and goes and a broken one."""
+    return [
+        SimulatedCard('jack', amplitude=0),
+        SimulatedCard('Stable', frequency=440),
+        SimulatedCard(
+            'Hotplugged',
+            present=[(0, 0.3), (0.5, 0.9)],
+            frequency=1000,
+            xrun_probability=0.01
+        ),
+        SimulatedCard(
+            'Flaky',
+            frequency=50,
+            amplitude=1,
+            error_probability=0.02,
+            xrun_probability=0.05
+        )
+    ]
+
+
+class Soak:
+    """Measure memory and the duration of iterations of a loop."""
+    def __init__(self):
+        self.durations = []
+        self.halfway_memory = None
+
+    def run(self, iteration, seconds=SOAK_SECONDS):
+        """Call iteration repeatedly for that many seconds."""
+        tracemalloc.start()
+        start = time.monotonic()
+        while time.monotonic() - start < seconds:
+            before = time.monotonic()
+            iteration()
+            self.durations.append(time.monotonic() - before)
+            if (
+                    self.halfway_memory is None and
+                    time.monotonic() - start > seconds / 2
+            ):
+                self.halfway_memory = tracemalloc.get_traced_memory()[0]
+        self.memory_growth = (
+            tracemalloc.get_traced_memory()[0] - self.halfway_memory
+        )
+        tracemalloc.stop()
+
+    def get_slowdown(self):
+        """How much slower the last quarter of iterations was."""
+        quarter = max(1, len(self.durations) // 4)
+        first = sum(self.durations[:quarter]) / quarter
+        last = sum(self.durations[-quarter:]) / quarter
+        return last / max(first, 1e-4)
+
+
+class SimulationTest(unittest.TestCase):
+    def setUp(self):
+        self.simulation = Simulation(get_churning_cards())
+        self.simulation.patch()
+
+    def tearDown(self):
+        self.simulation.restore()
+        if os.path.exists(fake_config_path):
+            os.remove(fake_config_path)
+        config = get_config()
+        config.create_config_file()
+        config.load_config()
+
+    def test_schedule(self):
+        self.assertIn('Hotplugged', self.simulation.cards())
+        time.sleep(0.35)
+        self.assertNotIn('Hotplugged', self.simulation.cards())
+        self.assertIn('Stable', self.simulation.cards())
+
+    def test_realtime(self):
+        import alsaaudio
+        pcm = alsaaudio.PCM(
+            type=alsaaudio.PCM_CAPTURE,
+            device='sysdefault:CARD=Stable',
+            mode=alsaaudio.PCM_NONBLOCK
+        )
+        self.assertEqual(pcm.read(), (0, b''))
+        time.sleep(0.01)
+        length, data = pcm.read()
+        self.assertEqual(length, 32)
+        self.assertEqual(len(data), 32 * 2 * 2)
+
+        # not reading for too long overruns the buffer
+        time.sleep(0.1)
+        self.assertEqual(pcm.read()[0], -32)
+        self.assertEqual(self.simulation.xruns, 1)
+
+        self.assertEqual(len(self.simulation.open_pcms), 1)
+        pcm.close()
+        self.assertEqual(len(self.simulation.open_pcms), 0)
+
+    def test_missing_card(self):
+        import alsaaudio
+        time.sleep(0.35)
+        with self.assertRaises(alsaaudio.ALSAAudioError):
+            alsaaudio.PCM(
+                type=alsaaudio.PCM_CAPTURE,
+                device='sysdefault:CARD=Hotplugged'
+            )
+
+    def test_mixer_state(self):
+        import alsaaudio
+        get_config().set('output_use_softvol', True)
+        alsaaudio.Mixer('alsacontrol-output-volume').setvolume(20)
+        self.assertEqual(
+            alsaaudio.Mixer('alsacontrol-output-volume').getvolume(0),
+            [20, 20]
+        )
+
+
+class SoakTest(unittest.TestCase):
+    def setUp(self):
+        self.simulation = Simulation(get_churning_cards())
+        self.simulation.patch()
+        self.soak = Soak()
+
+    def tearDown(self):
+        self.simulation.restore()
+
+    def check_soak(self):
+        """Assert that nothing leaked and nothing became slow."""
+        self.assertEqual(len(self.simulation.open_pcms), 0)
+        self.assertEqual(get_resource_tracker().get_open('pcm'), {})
+        self.assertLess(self.soak.memory_growth, MAX_MEMORY_GROWTH)
+        self.assertLess(self.soak.get_slowdown(), 3)
+
+    def test_cards_tracker(self):
+        tracker = CardsTracker()
+        changes = []
+
+        def iteration():
+            changes.append(tracker.log_new_pcms())
+            self.assertIn('Stable', tracker.cards)
+            time.sleep(1 / 100)
+
+        self.soak.run(iteration)
+        # the hotplugged card came and went multiple times
+        self.assertGreater(changes.count(True), 2)
+        self.check_soak()
+
+    def test_levels_monitor(self):
+        tracker = CardsTracker()
+        monitor = LevelsMonitor()
+        levels = {}
+
+        def iteration():
+            tracker.log_new_pcms()
+            # like the daemon, retry cards whose meters broke
+            monitor.update_cards([
+                card for card in tracker.cards
+                if card in monitor.meters and monitor.meters[card].valid
+                or card not in monitor.meters
+            ])
+            levels.update(monitor.read_levels())
+            monitor.pop_changes()
+            time.sleep(1 / 60)
+
+        self.soak.run(iteration)
+        monitor.close()
+
+        self.assertAlmostEqual(levels['Stable'][0], 0.5, delta=0.01)
+        self.assertIn('Hotplugged', levels)
+        self.assertGreater(self.simulation.errors, 0)
+        self.check_soak()
+
+    def test_capture_worker(self):
+        notified = threading.Event()
+        worker = CaptureWorker(notified.set)
+        worker.start()
+        results = {}
+
+        def iteration():
+            for card in self.simulation.cards():
+                # invalid cards were closed by the worker, open them again
+                worker.monitor(card, 60)
+            if notified.wait(0.1):
+                notified.clear()
+                results.update(worker.collect())
+
+        self.soak.run(iteration)
+        worker.quit()
+        worker.join(1)
+
+        self.assertFalse(worker.is_alive())
+        self.assertTrue(results['Stable'][1])
+        self.assertGreater(self.simulation.reads, 0)
+        self.check_soak()
+
+
+class CountingNotifications(Notifications):
+    """Remembers how many notifications would have been shown."""
+    def __init__(self):
+        self.shown = 0
+
+    def show(self, *args, **kwargs):
+        self.shown += 1
+
+
+class DaemonSoakTest(unittest.TestCase):
+    def setUp(self):
+        self.simulation = Simulation(
+            [SimulatedCard('Stable')],
+            # slow enough to notice if each request touches the mixer
+            mixer_latency=0.001
+        )
+        self.simulation.patch()
+        get_config().set('pcm_output', 'hw:CARD=Stable')
+        get_config().set('output_use_softvol', True)
+        self.simulation.volumes[OUTPUT_VOLUME] = 50
+
+        self.patches = [
+            patch.object(daemon, 'load_state', lambda: {}),
+            patch.object(daemon, 'save_state', lambda state: None),
+            patch.object(
+                daemon,
+                'SharedLevelsWriter',
+                lambda: SharedLevelsWriter('/tmp/alsacontrol-test-levels')
+            )
+        ]
+        for p in self.patches:
+            p.__enter__()
+
+        self.notifications = CountingNotifications()
+        self.daemon = daemon.Daemon(self.notifications, lambda: None)
+        self.soak = Soak()
+
+    def tearDown(self):
+        self.daemon.quit()
+        for p in self.patches:
+            p.__exit__(None, None, None)
+        self.simulation.restore()
+        if os.path.exists(fake_config_path):
+            os.remove(fake_config_path)
+        config = get_config()
+        config.create_config_file()
+        config.load_config()
+
+    def test_volume_bursts(self):
+        context = GLib.MainContext.default()
+        bursts = []
+
+        def iteration():
+            # like holding down a volume key with a fast repeat rate
+            step = 0.001 if len(bursts) % 2 == 0 else -0.001
+            mixer_writes = self.simulation.mixer_writes
+            shown = self.notifications.shown
+            for _ in range(100):
+                self.daemon.change_volume(
+                    step,
+                    reply_handler=lambda: None,
+                    error_handler=lambda error: None
+                )
+            while context.iteration(False):
+                pass
+            bursts.append((
+                self.simulation.mixer_writes - mixer_writes,
+                self.notifications.shown - shown
+            ))
+
+        self.soak.run(iteration)
+
+        # each burst was applied at once
+        self.assertEqual(set(bursts), {(1, 1)})
+        # and going up and down ends up where it started
+        expected = 0.25 if len(bursts) % 2 == 0 else 0.35
+        self.assertAlmostEqual(
+            self.daemon.perceived_volume,
+            expected,
+            delta=0.001
+        )
+        self.assertLess(self.soak.memory_growth, MAX_MEMORY_GROWTH)
+        self.assertLess(self.soak.get_slowdown(), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# ALSA-Control - ALSA configuration interface
+# Copyright (C) 2020 sezanzeb <proxima@hip70890b.de>
+#
+# This file is part of ALSA-Control.
+#
+# ALSA-Control is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ALSA-Control is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ALSA-Control.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import unittest
+
+import numpy as np
+
+from alsacontrol.spectrum import Spectrum, get_band_starts, FFT_SIZE
+
+
+def get_sine(frequency, frames, rate=44100, channels=2):
+    """Get interleaved int16 samples of a full scale sine."""
+    time = np.arange(frames) / rate
+    sine = np.sin(2 * np.pi * frequency * time) * (2 ** 15 - 1)
+    return np.repeat(sine.astype(np.int16), channels)
+
+
+class SpectrumTest(unittest.TestCase):
+    def test_get_band_starts(self):
+        starts = get_band_starts(32, FFT_SIZE, 44100)
+        self.assertLessEqual(len(starts), 32)
+        self.assertGreaterEqual(starts[0], 1)
+        self.assertTrue(np.all(np.diff(starts) > 0))
+        self.assertLess(starts[-1], FFT_SIZE // 2 + 1)
+
+    def test_hop(self):
+        spectrum = Spectrum(hop_size=1024)
+        spectrum.feed(get_sine(1000, 1000))
+        self.assertFalse(spectrum.compute())
+        spectrum.feed(get_sine(1000, 100))
+        self.assertTrue(spectrum.compute())
+        # needs new frames again
+        self.assertFalse(spectrum.compute())
+
+    def test_sine(self):
+        spectrum = Spectrum()
+        spectrum.feed(get_sine(1000, FFT_SIZE))
+        spectrum.compute()
+        loudest = np.argmax(spectrum.bands)
+        self.assertGreater(spectrum.bands[loudest], 0.95)
+        # far away bands are quiet
+        self.assertLess(spectrum.bands[0], 0.1)
+        self.assertLess(spectrum.bands[-1], 0.1)
+
+        # moves up with the frequency
+        spectrum.feed(get_sine(5000, FFT_SIZE))
+        spectrum.compute()
+        self.assertGreater(np.argmax(spectrum.bands), loudest)
+
+    def test_silence(self):
+        spectrum = Spectrum()
+        spectrum.feed(np.zeros(FFT_SIZE * 2, dtype=np.int16))
+        spectrum.compute()
+        self.assertTrue(np.all(spectrum.bands == 0))
+
+
+if __name__ == "__main__":
+    unittest.main()